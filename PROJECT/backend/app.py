@@ -1,7 +1,7 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from config import Config
-from routes import health_assessment, hospital_finder, recommendations
+from routes import admin, health_assessment, hospital_finder, recommendations
 from utils.logger import setup_logger
 import traceback
 
@@ -16,6 +16,15 @@ logger = setup_logger(__name__)
 app.register_blueprint(health_assessment.bp)
 app.register_blueprint(hospital_finder.bp)
 app.register_blueprint(recommendations.bp)
+app.register_blueprint(admin.bp)
+
+def warmup():
+    """Load models and run dummy predictions so the first request is fast."""
+    health_assessment.prediction_service.warmup()
+    recommendations.prediction_service.warmup()
+
+if Config.WARMUP_ON_START:
+    warmup()
 
 @app.errorhandler(400)
 def bad_request(error):
@@ -29,7 +38,12 @@ def internal_error(error):
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({"status": "healthy", "version": "1.0.0"}), 200
+    return jsonify({
+        "status": "healthy",
+        "version": "1.0.0",
+        # Never loads the model, so the probe stays cheap before first use
+        "model_version": health_assessment.prediction_service.predictor.loaded_version
+    }), 200
 
 if __name__ == '__main__':
     app.run(debug=app.config['DEBUG'], host='0.0.0.0', port=5000)
\ No newline at end of file
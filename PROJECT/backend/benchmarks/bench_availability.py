@@ -0,0 +1,93 @@
+"""
+Cost of live availability updates, and their effect on concurrent searches.
+
+Applies bed/ICU availability reports to a large hospital dataset, each
+call swapping in a new copy-on-write snapshot, and reports:
+
+- update: latency of update_availability() per batch size
+- search: find_hospitals latency from reader threads, alone and while
+  a writer applies single-hospital reports at --rate per minute
+
+Usage:
+    python benchmarks/bench_availability.py [--hospitals 100000] [--rate 6000]
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from common import make_hospitals, make_locations, percentiles, time_call
+from services.geolocation_service import GeoLocationService
+from services.hospital_data import HospitalTable
+
+BATCH_SIZES = (1, 100, 1000, 10000)
+
+
+def reports(rng, hospitals, count):
+    return [{"id": int(hospital_id), "beds_available": int(rng.integers(0, 200)),
+             "icu_beds_available": int(rng.integers(0, 20))}
+            for hospital_id in rng.integers(0, hospitals, count)]
+
+
+def search_latency(service, locations, readers):
+    samples = []
+
+    def read():
+        samples.extend(time_call(service.find_hospitals, lat, lon, 15, None, 'high')
+                       for lat, lon in locations)
+
+    threads = [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hospitals', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=6000, help='updates per minute')
+    args = parser.parse_args()
+
+    service = GeoLocationService(HospitalTable.from_records(make_hospitals(args.hospitals)),
+                                 cache_size=0)
+    service.snapshot.indexed()
+    rng = np.random.default_rng(7)
+    locations = make_locations(args.requests)
+
+    print(f"{args.hospitals} hospitals, {args.readers} reader threads\n")
+    print(f"{'':<28} {'p50 us':>10} {'p99 us':>10}")
+    for batch_size in BATCH_SIZES:
+        batches = [reports(rng, args.hospitals, batch_size) for _ in range(50)]
+        p50, p99 = percentiles([time_call(service.update_availability, batch) for batch in batches])
+        print(f"{f'update, batch {batch_size}':<28} {p50:10.1f} {p99:10.1f}")
+
+    p50, p99 = search_latency(service, locations, args.readers)
+    print(f"{'search, no updates':<28} {p50:10.1f} {p99:10.1f}")
+
+    done = threading.Event()
+    applied = []
+
+    def write():
+        interval = 60 / args.rate
+        while not done.wait(interval):
+            service.update_availability(reports(rng, args.hospitals, 1))
+            applied.append(1)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    start = time.perf_counter()
+    p50, p99 = search_latency(service, locations, args.readers)
+    elapsed = time.perf_counter() - start
+    done.set()
+    writer.join()
+    print(f"{f'search, {len(applied) / elapsed * 60:.0f} updates/min':<28} {p50:10.1f} {p99:10.1f}")
+
+
+if __name__ == '__main__':
+    main()
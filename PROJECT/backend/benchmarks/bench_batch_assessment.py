@@ -0,0 +1,42 @@
+"""
+Per-patient cost of predict_risk in a loop vs predict_risk_batch.
+
+Usage:
+    python benchmarks/bench_batch_assessment.py [--sizes 1000 10000]
+"""
+
+import argparse
+import tempfile
+
+from common import make_patients, time_call, train_predictor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--loop-sample', type=int, default=200,
+                        help='patients timed through the per-request loop')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        predictor = train_predictor(model_dir)
+
+        sample = make_patients(args.loop_sample)
+        loop_seconds = time_call(
+            lambda: [predictor.predict_risk(patient) for patient in sample]
+        )
+        loop_per_patient = loop_seconds / len(sample) * 1e6
+        print(f"{'batch size':>10} {'loop us/patient':>16} "
+              f"{'batch us/patient':>17} {'speedup':>8}")
+
+        for size in args.sizes:
+            patients = make_patients(size)
+            batch_seconds = time_call(predictor.predict_risk_batch, patients)
+            batch_per_patient = batch_seconds / size * 1e6
+            print(f"{size:>10} {loop_per_patient:>16.1f} "
+                  f"{batch_per_patient:>17.1f} "
+                  f"{loop_per_patient / batch_per_patient:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
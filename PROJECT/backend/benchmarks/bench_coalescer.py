@@ -0,0 +1,72 @@
+"""
+Sustained /assess throughput with and without request coalescing.
+
+Usage:
+    python benchmarks/bench_coalescer.py [--threads 32] [--requests 20]
+        [--window-ms 2] [--backend sklearn]
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+
+from common import make_patients, train_predictor
+from models.risk_predictor import RiskPredictor
+from services.request_coalescer import RequestCoalescer
+
+
+def run_load(predict, patients, threads, requests_per_thread):
+    """Return requests/second for threads each issuing requests_per_thread calls."""
+    def worker(offset):
+        for i in range(requests_per_thread):
+            predict(patients[(offset + i) % len(patients)])
+
+    workers = [threading.Thread(target=worker, args=(n * requests_per_thread,))
+               for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * requests_per_thread / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--window-ms', type=float, default=2.0)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--backend', default='sklearn')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        trained = train_predictor(model_dir)
+        predictor = RiskPredictor(
+            model_path=trained.model_path,
+            scaler_path=trained.scaler_path,
+            backend=args.backend
+        )
+        patients = make_patients(1000)
+
+        direct = run_load(predictor.predict_risk, patients,
+                          args.threads, args.requests)
+        coalescer = RequestCoalescer(predictor.predict_risk_batch,
+                                     window_ms=args.window_ms,
+                                     max_batch_size=args.max_batch)
+        coalesced = run_load(coalescer.submit, patients,
+                             args.threads, args.requests)
+
+        metrics = coalescer.get_metrics()
+        print(f"backend={args.backend} threads={args.threads} "
+              f"window={args.window_ms}ms")
+        print(f"direct:    {direct:>9.0f} req/s")
+        print(f"coalesced: {coalesced:>9.0f} req/s "
+              f"(mean batch {metrics['mean_batch_size']:.1f}, "
+              f"mean wait {metrics['mean_queue_wait_ms']:.2f} ms, "
+              f"max wait {metrics['max_queue_wait_ms']:.2f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Trees evaluated per request with early-exit risk-level classification.
+
+For several early-exit block sizes, reports the mean number of trees
+evaluated per patient (overall and per risk level), checks the levels
+against full predict_risk, and times single-row and batch requests. A
+block as large as the forest never exits early and is the baseline.
+
+Usage:
+    python benchmarks/bench_early_exit.py [--patients 2000] [--block-sizes 5 10 20 100]
+"""
+
+import argparse
+import tempfile
+from collections import defaultdict
+
+from common import make_patients, percentiles, time_call, train_predictor
+from models.risk_predictor import RISK_LEVELS, RiskPredictor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--patients', type=int, default=2000)
+    parser.add_argument('--block-sizes', type=int, nargs='+', default=[5, 10, 20, 100])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        trained = train_predictor(model_dir)
+        predictor = RiskPredictor(
+            model_path=trained.model_path,
+            scaler_path=trained.scaler_path,
+            backend='compiled'
+        )
+        patients = make_patients(args.patients)
+        expected = [result['overall_risk_level'] for result in predictor.predict_risk_batch(patients)]
+        single = patients[:min(300, len(patients))]
+        print(f"{predictor.compiled_model.n_trees} trees; {args.patients} patients\n")
+
+        header = f"{'block':>5} {'mean trees':>10} " + " ".join(f"{level:>9}" for level in RISK_LEVELS)
+        print(header + f" {'1-row p50 us':>13} {'batch ms':>9} {'exact':>6}")
+        for block_size in args.block_sizes:
+            predictor.EARLY_EXIT_BLOCK = block_size
+            results = predictor.predict_risk_levels(patients)
+            by_level = defaultdict(list)
+            for result in results:
+                by_level[result['overall_risk_level']].append(result['trees_evaluated'])
+            exact = [result['overall_risk_level'] for result in results] == expected
+            mean_trees = sum(r['trees_evaluated'] for r in results) / len(results)
+
+            single_samples = [time_call(predictor.predict_risk_levels, [p]) for p in single]
+            batch_seconds = time_call(predictor.predict_risk_levels, patients)
+            p50, _ = percentiles(single_samples)
+
+            per_level = " ".join(
+                f"{sum(by_level[level]) / len(by_level[level]):9.1f}" if by_level[level] else f"{'-':>9}"
+                for level in RISK_LEVELS
+            )
+            print(f"{block_size:>5} {mean_trees:10.1f} {per_level} {p50:13.0f} "
+                  f"{batch_seconds * 1000:9.1f} {str(exact):>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Throughput of encrypting stored assessments at rest.
+
+Seals model-scored assessments as SQLiteHistoryStore stores them (one
+packed record per row, bound to its user and timestamp) and reports
+records per second for encrypt and decrypt at several batch sizes:
+
+- fernet: one master-key Fernet token per record, the one-string-at-a-time
+  EncryptionService.encrypt() path
+- envelope: one wrapped data key per batch, AES-GCM per record
+- envelope-pool: the same, with batches of at least the default
+  parallel_threshold split across the thread pool (smaller ones run
+  inline, so the rows below it match envelope)
+
+Batch sizes include a default history page (HISTORY_PAGE_SIZE + 1 rows)
+and a stream chunk.
+
+Usage:
+    python benchmarks/bench_encryption.py [--records 20000] [--workers 4]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from common import make_assessments, train_predictor
+from config import Config
+from services.vitals_series import VitalsRecord
+from utils.encryption import DEFAULT_PARALLEL_THRESHOLD, EncryptionService
+
+BATCH_SIZES = (1, 10, 50, Config.HISTORY_PAGE_SIZE + 1, 500, 1000, 10000)
+
+
+def fields_of(assessments):
+    """(payload, associated data) of each record the history store would seal."""
+    fields = []
+    for index, assessment in enumerate(assessments):
+        created_at = 1760000000.0 + index
+        record = VitalsRecord.from_assessment(assessment, created_at)
+        fields.append((record.to_payload(), f"user{index % 100}|{created_at}|assessments".encode()))
+    return fields
+
+
+def fernet_batch(service, fields):
+    start = time.perf_counter()
+    tokens = [service.cipher.encrypt(payload) for payload, _ in fields]
+    encrypt_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for token in tokens:
+        service.cipher.decrypt(token)
+    return encrypt_seconds, time.perf_counter() - start
+
+
+def envelope_batch(service, fields):
+    start = time.perf_counter()
+    data_key, wrapped = service.generate_data_key()
+    associated = [associated for _, associated in fields]
+    tokens = service.encrypt_batch(data_key, [payload for payload, _ in fields], associated)
+    encrypt_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # A reader unwraps the batch's data key once (uncached here)
+    service.decrypt_batch(service.cipher.decrypt(wrapped), tokens, associated)
+    return encrypt_seconds, time.perf_counter() - start
+
+
+def run(name, service, method, fields, batch_size, total):
+    encrypt_seconds = decrypt_seconds = 0.0
+    done = 0
+    while done < total:
+        batch = [fields[(done + index) % len(fields)] for index in range(min(batch_size, total - done))]
+        encrypt_time, decrypt_time = method(service, batch)
+        encrypt_seconds += encrypt_time
+        decrypt_seconds += decrypt_time
+        done += len(batch)
+    print(f"{name:<14} {batch_size:>7} {total / encrypt_seconds:12.0f} {total / decrypt_seconds:12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        predictor = train_predictor(Path(directory) / 'model')
+        fields = fields_of(make_assessments(predictor, min(args.records, 5000)))
+        key_path = Path(directory) / 'master.key'
+        serial = EncryptionService(key_path, max_workers=1)
+        pooled = EncryptionService(key_path, max_workers=args.workers)
+
+        print(f"{args.records} records, {args.workers} pool workers, "
+              f"parallel_threshold {DEFAULT_PARALLEL_THRESHOLD}\n")
+        print(f"{'method':<14} {'batch':>7} {'encrypt/s':>12} {'decrypt/s':>12}")
+        for batch_size in BATCH_SIZES:
+            run('fernet', serial, fernet_batch, fields, batch_size, args.records)
+            run('envelope', serial, envelope_batch, fields, batch_size, args.records)
+            run('envelope-pool', pooled, envelope_batch, fields, batch_size, args.records)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,52 @@
+"""
+Latency of /nearby searches with and without the geohash cell cache.
+
+Replays clustered traffic (callers scattered a few hundred metres around
+a fixed set of neighbourhoods) against a large hospital dataset and
+reports find_hospitals latency and the cache hit rate at several cell
+precisions.
+
+Usage:
+    python benchmarks/bench_geo_cache.py [--hospitals 100000] [--requests 5000]
+"""
+
+import argparse
+
+import numpy as np
+
+from common import make_hospitals, make_locations, percentiles, time_call
+from services.geolocation_service import GeoLocationService
+from services.hospital_data import HospitalTable
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hospitals', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--neighbourhoods', type=int, default=200)
+    parser.add_argument('--radius', type=float, default=15)
+    args = parser.parse_args()
+
+    table = HospitalTable.from_records(make_hospitals(args.hospitals))
+    rng = np.random.default_rng(4)
+    centers = np.array(make_locations(args.neighbourhoods))
+    requests = (centers[rng.integers(0, len(centers), args.requests)]
+                + rng.normal(0, 0.003, (args.requests, 2))).tolist()
+
+    print(f"{args.hospitals} hospitals, {args.requests} requests around "
+          f"{args.neighbourhoods} neighbourhoods, {args.radius:g} km radius\n")
+    print(f"{'cache':<14} {'p50 us':>10} {'p99 us':>10} {'hit rate':>9}")
+    for name, size, precision in (('none', 0, None), ('precision 5', 10000, 5),
+                                  ('precision 6', 10000, 6), ('precision 7', 10000, 7)):
+        service = GeoLocationService(table, cache_size=size, cache_precision=precision)
+        service.snapshot.indexed('cardiology')
+        samples = [time_call(service.find_hospitals, lat, lon, args.radius, 'cardiology')
+                   for lat, lon in requests]
+        p50, p99 = percentiles(samples)
+        stats = service.get_cache_stats()
+        hit_rate = f"{stats['hit_rate']:9.2f}" if stats else f"{'-':>9}"
+        print(f"{name:<14} {p50:10.1f} {p99:10.1f} {hit_rate}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Hospital search latency against dataset size.
+
+Loads synthetic hospital datasets of 10^3 to 10^6 records (clustered
+around US cities) into GeoLocationService and reports the spatial index
+build time and per-query latency of find_hospitals (15 km radius, with
+and without a specialty filter) and find_emergency_hospitals (5
+nearest). The per-request full scan the service used to do is timed for
+comparison on datasets up to --scan-max hospitals.
+
+Usage:
+    python benchmarks/bench_geolocation.py [--sizes 1000 10000 100000 1000000] [--queries 500]
+"""
+
+import argparse
+import time
+
+from haversine import Unit, haversine
+# Imported up front so build times don't include it
+from sklearn.neighbors import KDTree  # noqa: F401
+
+from common import make_hospitals, make_locations, percentiles, time_call
+from services.geolocation_service import GeoLocationService
+
+
+def full_scan(hospitals, latitude, longitude, radius_km=15):
+    """The old find_hospitals loop: haversine to every hospital."""
+    nearby = []
+    for hospital in hospitals:
+        distance = haversine((latitude, longitude), (hospital['latitude'], hospital['longitude']),
+                             unit=Unit.KILOMETERS)
+        if distance <= radius_km:
+            hospital_copy = hospital.copy()
+            hospital_copy['distance'] = round(distance, 2)
+            nearby.append(hospital_copy)
+    nearby.sort(key=lambda x: (x['distance'], -x['rating']))
+    return nearby[:10]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--scan-max', type=int, default=100000)
+    args = parser.parse_args()
+
+    locations = make_locations(args.queries)
+    print(f"{'hospitals':>10} {'build ms':>9} {'radius p50':>11} {'radius p99':>11} "
+          f"{'special p50':>12} {'nearest p50':>12} {'nearest p99':>12} {'scan p50':>10}")
+    print(f"{'':>10} {'':>9} {'(us)':>11} {'(us)':>11} {'(us)':>12} {'(us)':>12} {'(us)':>12} "
+          f"{'(us)':>10}")
+
+    for size in args.sizes:
+        hospitals = make_hospitals(size)
+        service = GeoLocationService(hospitals)
+        start = time.perf_counter()
+        service.snapshot.indexed()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        radius = percentiles([time_call(service.find_hospitals, lat, lon) for lat, lon in locations])
+        special = percentiles([time_call(service.find_hospitals, lat, lon, 15, 'neurology')
+                               for lat, lon in locations])
+        nearest = percentiles([time_call(service.find_emergency_hospitals, lat, lon)
+                               for lat, lon in locations])
+        scan = '-'
+        if size <= args.scan_max:
+            scan_queries = locations[:max(10, args.queries * 1000 // size)]
+            scan_p50, _ = percentiles([time_call(full_scan, hospitals, lat, lon)
+                                       for lat, lon in scan_queries])
+            scan = f"{scan_p50:.0f}"
+        print(f"{size:>10} {build_ms:9.1f} {radius[0]:11.1f} {radius[1]:11.1f} {special[0]:12.1f} "
+              f"{nearest[0]:12.1f} {nearest[1]:12.1f} {scan:>10}")
+
+
+if __name__ == '__main__':
+    main()
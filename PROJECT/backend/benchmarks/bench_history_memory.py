@@ -0,0 +1,84 @@
+"""
+Bytes per stored assessment: full result dicts versus columnar series.
+
+Stores the same model-scored assessments (each with its request dict,
+as PredictionService keeps them) in the dict of lists the service used
+to hold and in the columnar MemoryHistoryStore, and reports the traced
+Python heap per assessment for each. Also reports SQLite's on-disk bytes
+per assessment with the compact row layout.
+
+Usage:
+    python benchmarks/bench_history_memory.py [--assessments 50000] [--users 1000]
+"""
+
+import argparse
+import gc
+import json
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from common import make_assessments, train_predictor
+from services.history_store import MemoryHistoryStore, SQLiteHistoryStore
+
+
+def traced_bytes(build):
+    """Heap bytes still allocated by whatever build() returns."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--assessments', type=int, default=50000)
+    parser.add_argument('--users', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        predictor = train_predictor(Path(directory) / 'model')
+        assessments_json = json.dumps(make_assessments(predictor, args.assessments))
+        users = [f'user{index % args.users}' for index in range(args.assessments)]
+
+        def dict_history():
+            # Decoded inside the trace, as each request's dicts would be
+            history = {}
+            for user_id, assessment in zip(users, json.loads(assessments_json)):
+                history.setdefault(user_id, []).append(assessment)
+            return history
+
+        def columnar_history():
+            store = MemoryHistoryStore(max_per_user=args.assessments)
+            for user_id, assessment in zip(users, json.loads(assessments_json)):
+                store.add(user_id, assessment)
+            return store
+
+        dict_bytes = traced_bytes(dict_history)
+        columnar_bytes = traced_bytes(columnar_history)
+
+        db_path = Path(directory) / 'history.db'
+        store = SQLiteHistoryStore(db_path, max_per_user=args.assessments)
+        for user_id, assessment in zip(users, json.loads(assessments_json)):
+            store.add(user_id, assessment)
+        store.close()
+        disk_bytes = sum(path.stat().st_size for path in Path(directory).glob('history.db*'))
+        json_bytes = len(assessments_json)
+
+    per = args.assessments
+    print(f"{args.assessments} assessments over {args.users} users\n")
+    print(f"{'layout':<28} {'bytes/assessment':>16}")
+    print(f"{'dict of result dicts':<28} {dict_bytes / per:16.0f}")
+    print(f"{'columnar series':<28} {columnar_bytes / per:16.0f}")
+    print(f"{'SQLite compact rows (disk)':<28} {disk_bytes / per:16.0f}")
+    print(f"{'JSON payload (reference)':<28} {json_bytes / per:16.0f}")
+    print(f"\nColumnar uses {dict_bytes / columnar_bytes:.1f}x less heap than the dicts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Request-path cost of the assessment history stores.
+
+Stores a stream of model-scored assessments spread over many users, then
+reports the per-call add() latency seen by a request, history read
+latency and how long the write-behind queue takes to drain. The plain
+dict the service used to keep is the baseline: it is fast, but grows
+without bound and lives only as long as the process
+(bench_history_memory.py measures what each layout costs in memory).
+
+Usage:
+    python benchmarks/bench_history_store.py [--assessments 100000] [--users 5000]
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from common import make_assessments, percentiles, time_call, train_predictor
+from services.history_store import MemoryHistoryStore, SQLiteHistoryStore
+
+
+class DictHistory:
+    """The unbounded per-process dict PredictionService used to keep."""
+
+    def __init__(self):
+        self.history = {}
+
+    def add(self, user_id, assessment):
+        self.history.setdefault(user_id, []).append(assessment)
+
+    def get(self, user_id, limit=None):
+        return self.history.get(user_id, [])
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def run(name, store, args, assessments):
+    rng = random.Random(0)
+    users = [f'user{index}' for index in range(args.users)]
+
+    add_samples = []
+    start = time.perf_counter()
+    for index in range(args.assessments):
+        user_id = rng.choice(users)
+        assessment = assessments[index % len(assessments)]
+        add_samples.append(time_call(store.add, user_id, assessment))
+    enqueue_seconds = time.perf_counter() - start
+    drain_start = time.perf_counter()
+    store.flush()
+    drain_ms = (time.perf_counter() - drain_start) * 1000
+
+    get_samples = [time_call(store.get, rng.choice(users)) for _ in range(args.reads)]
+    add_p50, add_p99 = percentiles(add_samples)
+    get_p50, get_p99 = percentiles(get_samples)
+    print(f"{name:<8} {add_p50:9.1f} {add_p99:9.1f} {get_p50:9.1f} {get_p99:9.1f} "
+          f"{args.assessments / enqueue_seconds:10.0f} {drain_ms:9.1f}")
+    store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--assessments', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--reads', type=int, default=2000)
+    parser.add_argument('--max-per-user', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        predictor = train_predictor(Path(directory) / 'model')
+        assessments = make_assessments(predictor, min(args.assessments, 5000))
+
+        print(f"{args.assessments} assessments over {args.users} users\n")
+        print(f"{'store':<8} {'add p50':>9} {'add p99':>9} {'get p50':>9} {'get p99':>9} "
+              f"{'adds/s':>10} {'drain ms':>9}")
+        print(f"{'':<8} {'(us)':>9} {'(us)':>9} {'(us)':>9} {'(us)':>9}")
+
+        db_path = Path(directory) / 'history.db'
+        run('sqlite', SQLiteHistoryStore(db_path, max_per_user=args.max_per_user), args, assessments)
+        size_mb = sum(path.stat().st_size for path in Path(directory).glob('history.db*')) / 1e6
+    run('memory', MemoryHistoryStore(max_per_user=args.max_per_user), args, assessments)
+    run('dict', DictHistory(), args, assessments)
+    print(f"\nSQLite database with WAL: {size_mb:.1f} MB on disk")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Per-worker memory and startup cost of model loading.
+
+Compares each forked worker loading its own model for every service
+(the old one-RiskPredictor-per-blueprint layout) with a registry
+populated once in the parent before fork (gunicorn --preload), and with
+each worker memory-mapping the binary (.rfm) export itself. Reports each
+worker's unique set size (USS), i.e. memory not shared with other
+processes. Linux only (reads /proc/<pid>/smaps_rollup).
+
+Usage:
+    python benchmarks/bench_model_loading.py [--workers 4] [--services 2]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import joblib
+
+from common import make_patients, train_predictor
+from models.model_registry import ModelRegistry
+from models.risk_predictor import RiskPredictor
+
+
+def unique_set_size_mb():
+    """Private (unshared) memory of this process, in MB."""
+    private_kb = 0
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                private_kb += int(line.split()[1])
+    return private_kb / 1024
+
+
+def run_workers(workers, work):
+    """Fork workers running work(); return their (USS MB, seconds) reports."""
+    reports = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            start = time.perf_counter()
+            work()
+            elapsed = time.perf_counter() - start
+            os.write(write_fd, f"{unique_set_size_mb()} {elapsed}".encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            uss, elapsed = pipe.read().split()
+        os.waitpid(pid, 0)
+        reports.append((float(uss), float(elapsed)))
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--services', type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        trained = train_predictor(model_dir)
+        paths = (trained.model_path, trained.scaler_path)
+        binary_paths = (trained.model_path.with_suffix('.rfm'), trained.scaler_path)
+        patient = make_patients(1)[0]
+        del trained
+
+        def load_per_service():
+            for _ in range(args.services):
+                model = joblib.load(paths[0])
+                scaler = joblib.load(paths[1])
+                model.predict_proba(scaler.transform([[40, 70, 120, 80, 24, 3, 0, 0, 0]]))
+
+        registry = ModelRegistry()
+        registry.get(*paths)
+
+        def use_registry():
+            for _ in range(args.services):
+                predictor = RiskPredictor(*paths, registry=registry)
+                predictor.predict_risk(patient)
+
+        def map_binary():
+            worker_registry = ModelRegistry()
+            for _ in range(args.services):
+                predictor = RiskPredictor(*binary_paths, registry=worker_registry)
+                predictor.predict_risk(patient)
+
+        print(f"{args.workers} workers x {args.services} services")
+        print(f"pickle {os.path.getsize(paths[0]) / 1024:.0f} KB, "
+              f"binary {os.path.getsize(binary_paths[0]) / 1024:.0f} KB")
+        for name, work in (('load per service', load_per_service),
+                           ('preloaded registry', use_registry),
+                           ('mapped binary', map_binary)):
+            reports = run_workers(args.workers, work)
+            mean_uss = sum(uss for uss, _ in reports) / len(reports)
+            mean_ms = sum(elapsed for _, elapsed in reports) / len(reports) * 1000
+            print(f"{name:<20} worker USS {mean_uss:7.1f} MB   "
+                  f"worker startup {mean_ms:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
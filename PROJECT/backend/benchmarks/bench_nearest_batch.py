@@ -0,0 +1,61 @@
+"""
+Throughput of bulk nearest-hospital search versus one query per origin.
+
+Answers the nearest emergency hospitals for many origins with
+GeoLocationService.find_nearest_batch (one spatial index query per
+chunk) and with a find_emergency_hospitals call per origin, as a client
+posting to /api/hospitals/emergency would. Also times encoding the
+batch results as the NDJSON lines the endpoint streams.
+
+Usage:
+    python benchmarks/bench_nearest_batch.py [--origins 100000] [--hospitals 10000] [--count 5]
+"""
+
+import argparse
+import json
+import time
+
+from common import make_hospitals, make_locations
+from services.geolocation_service import GeoLocationService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--origins', type=int, default=100000)
+    parser.add_argument('--hospitals', type=int, default=10000)
+    parser.add_argument('--count', type=int, default=5)
+    parser.add_argument('--single-sample', type=int, default=5000,
+                        help='origins timed one by one (the rate is extrapolated)')
+    args = parser.parse_args()
+
+    service = GeoLocationService(make_hospitals(args.hospitals), cache_size=0)
+    service.snapshot.indexed('Emergency')
+    origins = make_locations(args.origins)
+    latitudes = [lat for lat, _ in origins]
+    longitudes = [lon for _, lon in origins]
+
+    start = time.perf_counter()
+    for latitude, longitude in origins[:args.single_sample]:
+        service.find_emergency_hospitals(latitude, longitude, args.count)
+    single_rate = min(args.single_sample, args.origins) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    results = list(service.find_nearest_batch(latitudes, longitudes, count=args.count))
+    batch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    streamed = sum(len(json.dumps({"index": index, "hospitals": hospitals})) + 1
+                   for index, hospitals in enumerate(results))
+    encode_seconds = time.perf_counter() - start
+
+    print(f"{args.origins} origins x {args.hospitals} hospitals, {args.count} nearest each\n")
+    print(f"{'method':<22} {'origins/s':>12} {'total s':>9}")
+    print(f"{'one query per origin':<22} {single_rate:12.0f} {args.origins / single_rate:9.2f}")
+    print(f"{'find_nearest_batch':<22} {args.origins / batch_seconds:12.0f} {batch_seconds:9.2f}")
+    print(f"{'+ NDJSON encoding':<22} {args.origins / (batch_seconds + encode_seconds):12.0f} "
+          f"{batch_seconds + encode_seconds:9.2f}")
+    print(f"\nNDJSON response: {streamed / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
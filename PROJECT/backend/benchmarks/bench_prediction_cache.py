@@ -0,0 +1,43 @@
+"""
+Latency of a cache hit vs a full predict_risk call.
+
+Usage:
+    python benchmarks/bench_prediction_cache.py [--requests 500] [--backend sklearn]
+"""
+
+import argparse
+import tempfile
+
+from common import make_patients, percentiles, time_call, train_predictor
+from models.risk_predictor import RiskPredictor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--backend', default='sklearn')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        trained = train_predictor(model_dir)
+        predictor = RiskPredictor(
+            model_path=trained.model_path,
+            scaler_path=trained.scaler_path,
+            backend=args.backend,
+            cache_size=args.requests
+        )
+        patients = make_patients(args.requests)
+
+        misses = [time_call(predictor.predict_risk, p) for p in patients]
+        hits = [time_call(predictor.predict_risk, p) for p in patients]
+
+        print(f"backend={args.backend}")
+        print(f"{'path':<12} {'p50 us':>10} {'p99 us':>10}")
+        for name, samples in (('miss', misses), ('hit', hits)):
+            p50, p99 = percentiles(samples)
+            print(f"{name:<12} {p50:>10.1f} {p99:>10.1f}")
+        print(predictor.cache.get_stats())
+
+
+if __name__ == '__main__':
+    main()
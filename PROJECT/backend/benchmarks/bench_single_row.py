@@ -0,0 +1,59 @@
+"""
+Single-row latency of predict_risk vs the old predict() + predict_proba() path,
+and of predict_risk with the compiled inference backend.
+
+Usage:
+    python benchmarks/bench_single_row.py [--requests 500]
+"""
+
+import argparse
+import tempfile
+
+from common import make_patients, percentiles, time_call, train_predictor
+from models.risk_predictor import RiskPredictor
+
+
+def two_pass_predict(predictor, health_data):
+    """The previous inference path: two full traversals of the forest."""
+    features_scaled = predictor.scaler.transform(
+        [predictor._extract_features(health_data)]
+    )
+    predictor.model.predict(features_scaled)
+    risk_probabilities = predictor.model.predict_proba(features_scaled)
+    return predictor._build_results(predictor._handle, risk_probabilities, [health_data])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        predictor = train_predictor(model_dir)
+        compiled = RiskPredictor(
+            model_path=predictor.model_path,
+            scaler_path=predictor.scaler_path,
+            backend='compiled'
+        )
+        patients = make_patients(args.requests)
+
+        # Warm up thread pools and caches before timing
+        for patient in patients[:20]:
+            predictor.predict_risk(patient)
+            compiled.predict_risk(patient)
+            two_pass_predict(predictor, patient)
+
+        two_pass = [time_call(two_pass_predict, predictor, p) for p in patients]
+        single_pass = [time_call(predictor.predict_risk, p) for p in patients]
+        compiled_pass = [time_call(compiled.predict_risk, p) for p in patients]
+
+        print(f"{'path':<28} {'p50 us':>10} {'p99 us':>10}")
+        for name, samples in (('predict + predict_proba', two_pass),
+                              ('predict_risk', single_pass),
+                              ('predict_risk (compiled)', compiled_pass)):
+            p50, p99 = percentiles(samples)
+            print(f"{name:<28} {p50:>10.0f} {p99:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
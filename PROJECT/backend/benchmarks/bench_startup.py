@@ -0,0 +1,138 @@
+"""
+App startup profile: per-module import time and time to first response.
+
+Imports app.py in fresh interpreters against a freshly trained model and
+reports the slowest top-level imports (from python -X importtime), the
+app import time, and the latency of the first /api/health/assess
+request, both with lazy model loading (the default) and with
+WARMUP_ON_START. Exits non-zero if the lazy-mode medians exceed the
+budgets, so it can gate startup regressions in CI.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--top 10]
+        [--import-budget-ms 1000] [--first-response-budget-ms 4000]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from common import make_patients, train_predictor
+
+BACKEND_DIR = Path(__file__).parent.parent
+PROJECT_PACKAGES = ('app', 'config', 'models', 'routes', 'services', 'utils')
+
+# Runs in a fresh interpreter; prints one JSON line of timings
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+response = client.post('/api/health/assess', json=json.loads(sys.argv[1]))
+first = time.perf_counter()
+client.post('/api/health/assess', json=json.loads(sys.argv[1]))
+second = time.perf_counter()
+print(json.dumps({
+    "status": response.status_code,
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": (first - imported) * 1000,
+    "second_response_ms": (second - first) * 1000,
+}))
+'''
+
+
+def run_child(args, env):
+    """Run python with args in the backend directory; return the process result."""
+    result = subprocess.run(
+        [sys.executable, *args], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return result
+
+
+def import_profile(env):
+    """Return {module: (self_us, cumulative_us)} for one `import app`."""
+    result = run_child(['-X', 'importtime', '-c', 'import app'], env)
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def top_level_imports(profile, top):
+    """Slowest third-party packages and project modules, by cumulative time."""
+    rows = [
+        (name, cumulative) for name, (_, cumulative) in profile.items()
+        if '.' not in name or name.split('.')[0] in PROJECT_PACKAGES
+    ]
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+
+
+def timings(env, patient, runs):
+    """Median import and first/second response times over several runs."""
+    samples = [
+        json.loads(run_child(['-c', CHILD, json.dumps(patient)], env).stdout.splitlines()[-1])
+        for _ in range(runs)
+    ]
+    if any(sample['status'] != 200 for sample in samples):
+        raise RuntimeError(f"/api/health/assess failed: {samples[0]}")
+    return {
+        key: statistics.median(sample[key] for sample in samples)
+        for key in ('import_ms', 'first_response_ms', 'second_response_ms')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--import-budget-ms', type=float, default=1000)
+    parser.add_argument('--first-response-budget-ms', type=float, default=4000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        train_predictor(Path(model_dir) / 'v1')
+        patient = make_patients(1)[0]
+        env = dict(os.environ, MODEL_DIR=model_dir, WARMUP_ON_START='false',
+                   COALESCE_WINDOW_MS='0')
+
+        profile = import_profile(env)
+        print(f"{'module':<32} {'cumulative ms':>14}")
+        for name, cumulative in top_level_imports(profile, args.top):
+            print(f"{name:<32} {cumulative / 1000:14.1f}")
+        print(f"sklearn imported by app: {'sklearn' in profile}")
+        print()
+
+        lazy = timings(env, patient, args.runs)
+        eager = timings(dict(env, WARMUP_ON_START='true'), patient, args.runs)
+
+    print(f"{'mode':<10} {'import ms':>10} {'first response ms':>18} {'second response ms':>19}")
+    for name, result in (('lazy', lazy), ('warmup', eager)):
+        print(f"{name:<10} {result['import_ms']:10.1f} {result['first_response_ms']:18.1f} "
+              f"{result['second_response_ms']:19.1f}")
+
+    failures = []
+    if lazy['import_ms'] > args.import_budget_ms:
+        failures.append(f"import {lazy['import_ms']:.1f} ms > {args.import_budget_ms} ms")
+    if lazy['import_ms'] + lazy['first_response_ms'] > args.first_response_budget_ms:
+        failures.append(
+            f"time to first response {lazy['import_ms'] + lazy['first_response_ms']:.1f} ms "
+            f"> {args.first_response_budget_ms} ms"
+        )
+    if failures:
+        print("\nStartup budget exceeded: " + "; ".join(failures))
+        sys.exit(1)
+    print("\nStartup within budget")
+
+
+if __name__ == '__main__':
+    main()
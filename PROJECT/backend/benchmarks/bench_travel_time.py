@@ -0,0 +1,91 @@
+"""
+Latency and effect of ranking /nearby results by road travel time.
+
+Builds a synthetic city street grid (slow side streets, a fast arterial
+every tenth row and column), scatters hospitals over it and replays
+random requests. Reports find_hospitals latency ranked by distance and
+by travel time at several landmark counts, the share of candidates that
+got an estimate within the budget, and how often the first hospital
+differs from the distance ranking.
+
+Usage:
+    python benchmarks/bench_travel_time.py [--side 300] [--hospitals 400] [--budget-ms 50]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from common import percentiles, time_call
+from config import Config
+from services.geolocation_service import GeoLocationService
+from services.road_graph import RoadGraph
+
+
+def make_city(side, seed=5):
+    """Street grid around NYC, about 110 m blocks; arterials every 10th street."""
+    rng = np.random.default_rng(seed)
+    rows, columns = np.meshgrid(np.arange(side), np.arange(side), indexing='ij')
+    latitudes = (40.60 + rows * 0.001).ravel()
+    longitudes = (-74.10 + columns * 0.0013).ravel()
+    nodes = np.arange(side * side).reshape(side, side)
+    sources = np.concatenate((nodes[:, :-1].ravel(), nodes[:-1, :].ravel()))
+    targets = np.concatenate((nodes[:, 1:].ravel(), nodes[1:, :].ravel()))
+    arterial = np.concatenate(((rows[:, :-1] % 10 == 0).ravel(), (columns[:-1, :] % 10 == 0).ravel()))
+    kph = np.where(arterial, 60.0, rng.uniform(15, 30, len(sources)))
+    seconds = 110 / (kph / 3.6)
+    return (latitudes, longitudes, np.concatenate((sources, targets)),
+            np.concatenate((targets, sources)), np.concatenate((seconds, seconds)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--side', type=int, default=300)
+    parser.add_argument('--hospitals', type=int, default=400)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--radius', type=float, default=5)
+    parser.add_argument('--budget-ms', type=float, default=50)
+    args = parser.parse_args()
+    Config.TRAVEL_TIME_BUDGET_MS = args.budget_ms
+
+    city = make_city(args.side)
+    rng = np.random.default_rng(6)
+    south, west = city[0].min(), city[1].min()
+    north, east = city[0].max(), city[1].max()
+    hospitals = [
+        {"id": index, "name": f"Hospital {index}", "latitude": float(rng.uniform(south, north)),
+         "longitude": float(rng.uniform(west, east)), "specialties": ["Emergency"],
+         "has_icu": True, "rating": 4.0}
+        for index in range(args.hospitals)
+    ]
+    requests = np.column_stack((rng.uniform(south, north, args.requests),
+                                rng.uniform(west, east, args.requests))).tolist()
+    service = GeoLocationService(hospitals, cache_size=0)
+    nearest = [service.find_hospitals(lat, lon, args.radius) for lat, lon in requests]
+
+    print(f"{args.side * args.side} road nodes, {args.hospitals} hospitals, "
+          f"{args.requests} requests, {args.budget_ms:g} ms budget\n")
+    print(f"{'ranking':<22} {'build s':>8} {'p50 us':>10} {'p99 us':>10} {'estimated':>10} {'new first':>10}")
+    samples = [time_call(service.find_hospitals, lat, lon, args.radius) for lat, lon in requests]
+    p50, p99 = percentiles(samples)
+    print(f"{'distance':<22} {'-':>8} {p50:10.1f} {p99:10.1f} {'-':>10} {'-':>10}")
+
+    for landmarks in (4, 8, 16):
+        start = time.perf_counter()
+        service.load_road_graph(RoadGraph(*city, landmarks=landmarks))
+        build = time.perf_counter() - start
+        samples, results = [], []
+        for lat, lon in requests:
+            samples.append(time_call(service.find_hospitals, lat, lon, args.radius,
+                                     None, 'medium', 'travel_time'))
+            results.append(service.find_hospitals(lat, lon, args.radius, ranking='travel_time'))
+        p50, p99 = percentiles(samples)
+        found = [h['travel_time_min'] is not None for result in results for h in result]
+        changed = [a[0]['id'] != b[0]['id'] for a, b in zip(results, nearest) if a]
+        print(f"{f'travel time, {landmarks} ALT':<22} {build:8.2f} {p50:10.1f} "
+              f"{p99:10.1f} {np.mean(found):10.1%} {np.mean(changed):10.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Shared helpers for the backend benchmark scripts."""
+
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.risk_predictor import RiskPredictor
+
+SYMPTOMS = ['chest pain', 'fatigue', 'dizziness', 'headache', 'nausea']
+
+
+def make_training_data(num_samples=2000, seed=0):
+    """Synthetic features (in _extract_features order) and disease labels."""
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(18, 90, num_samples),
+        rng.integers(50, 120, num_samples),
+        rng.integers(90, 180, num_samples),
+        rng.integers(60, 110, num_samples),
+        rng.uniform(17, 40, num_samples),
+        rng.integers(0, 8, num_samples),
+        rng.integers(0, 2, num_samples),
+        rng.integers(0, 5, num_samples),
+        rng.integers(0, 4, num_samples),
+    ]).astype(float)
+    y = np.where(
+        X[:, 2] + rng.normal(0, 10, num_samples) > 150, 'Cardiovascular Disease',
+        np.where(
+            X[:, 4] + rng.normal(0, 2, num_samples) > 32, 'Diabetes',
+            np.where((X[:, 0] > 65) & (X[:, 6] == 1), 'Stroke Risk', 'Healthy')
+        )
+    )
+    return X, y
+
+
+def make_patients(count, seed=1):
+    """Random health-data dicts shaped like /api/health/assess payloads."""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'age': int(rng.integers(18, 90)),
+            'heart_rate': int(rng.integers(50, 120)),
+            'blood_pressure_systolic': int(rng.integers(90, 180)),
+            'blood_pressure_diastolic': int(rng.integers(60, 110)),
+            'bmi': round(float(rng.uniform(17, 40)), 1),
+            'exercise_frequency': int(rng.integers(0, 8)),
+            'smoking': bool(rng.integers(0, 2)),
+            'symptoms': SYMPTOMS[:int(rng.integers(0, 5))],
+            'family_history': ['diabetes'] * int(rng.integers(0, 3)),
+        }
+        for _ in range(count)
+    ]
+
+
+def train_predictor(directory):
+    """Train a RiskPredictor on synthetic data, saving into directory."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    predictor = RiskPredictor(
+        model_path=directory / 'disease_model.pkl',
+        scaler_path=directory / 'scaler.pkl'
+    )
+    X, y = make_training_data()
+    split = int(len(X) * 0.8)
+    predictor.train_model(X[:split], y[:split], X[split:], y[split:])
+    return predictor
+
+
+def make_assessments(predictor, count, seed=1):
+    """Assessment results shaped as PredictionService stores them in history."""
+    patients = make_patients(count, seed)
+    results = predictor.predict_risk_batch(patients)
+    timestamp = datetime.now().isoformat()
+    for patient, result in zip(patients, results):
+        result['timestamp'] = timestamp
+        result['health_inputs'] = patient
+    return results
+
+
+def make_hospitals(count, seed=2):
+    """
+    Hospital records clustered around random "cities" in the continental
+    US, about a third of them emergency hospitals.
+    """
+    rng = np.random.default_rng(seed)
+    cities = np.column_stack((rng.uniform(26, 48, 400), rng.uniform(-123, -71, 400)))
+    centers = cities[rng.integers(0, len(cities), count)]
+    coordinates = centers + rng.normal(0, 0.25, (count, 2))
+    specialties = [['Emergency', 'Cardiology'], ['General Practice'], ['Neurology', 'Trauma']]
+    return [
+        {
+            "id": index,
+            "name": f"Hospital {index}",
+            "latitude": float(latitude),
+            "longitude": float(longitude),
+            "address": f"{index} Main St",
+            "phone": "+1-555-0100",
+            "specialties": specialties[index % 3],
+            "has_icu": bool(index % 2),
+            "rating": round(float(rng.uniform(3, 5)), 1),
+            "distance": None
+        }
+        for index, (latitude, longitude) in enumerate(coordinates.tolist())
+    ]
+
+
+def make_locations(count, seed=3):
+    """Query locations near the make_hospitals() cities."""
+    rng = np.random.default_rng(2)
+    cities = np.column_stack((rng.uniform(26, 48, 400), rng.uniform(-123, -71, 400)))
+    rng = np.random.default_rng(seed)
+    points = cities[rng.integers(0, len(cities), count)] + rng.normal(0, 0.25, (count, 2))
+    return [tuple(point) for point in points.tolist()]
+
+
+def percentiles(samples):
+    """Return (p50, p99) of a list of durations, in microseconds."""
+    values = np.asarray(samples) * 1e6
+    return float(np.percentile(values, 50)), float(np.percentile(values, 99))
+
+
+def time_call(func, *args):
+    """Return the wall-clock duration of a single call, in seconds."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
@@ -17,8 +17,55 @@ class Config:
         'sqlite:///healthcare.db'
     )
     
+    # Assessment history: 'sqlite' (shared by every worker) or 'memory'
+    # (per process, lost on restart). SQLite uses the database above
+    # unless HISTORY_DATABASE_URL names another sqlite:/// file
+    HISTORY_BACKEND = os.getenv('HISTORY_BACKEND', 'sqlite')
+    HISTORY_DATABASE_URL = os.getenv('HISTORY_DATABASE_URL', SQLALCHEMY_DATABASE_URI)
+    HISTORY_MAX_PER_USER = int(os.getenv('HISTORY_MAX_PER_USER', 1000))
+    HISTORY_RETENTION_DAYS = float(os.getenv('HISTORY_RETENTION_DAYS', 365))
+    HISTORY_BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', 500))
+    HISTORY_FLUSH_INTERVAL_MS = float(os.getenv('HISTORY_FLUSH_INTERVAL_MS', 50))
+    HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', 100))
+    HISTORY_MAX_PAGE_SIZE = int(os.getenv('HISTORY_MAX_PAGE_SIZE', 1000))
+    
+    # Trend queries (/api/health/trends) window in days; per-day aggregates
+    # are kept for TREND_MAX_WINDOW_DAYS
+    TREND_WINDOW_DAYS = int(os.getenv('TREND_WINDOW_DAYS', 30))
+    TREND_MAX_WINDOW_DAYS = int(os.getenv('TREND_MAX_WINDOW_DAYS', 90))
+    
+    # Encrypt stored vitals and risk scores at rest. The master key file
+    # is created on first use; losing it makes encrypted history unreadable
+    HISTORY_ENCRYPTION = os.getenv('HISTORY_ENCRYPTION', 'False').lower() in ('true', '1', 'yes')
+    ENCRYPTION_KEY_PATH = os.getenv('ENCRYPTION_KEY_PATH', 'encryption_key.key')
+    ENCRYPTION_WORKERS = int(os.getenv('ENCRYPTION_WORKERS', 0))  # 0: one per CPU
+    # Batches of at least this many rows are split across the workers
+    ENCRYPTION_PARALLEL_THRESHOLD = int(os.getenv('ENCRYPTION_PARALLEL_THRESHOLD', 100))
+    
     # Geolocation
     GEOLOCATION_API_KEY = os.getenv('GEOLOCATION_API_KEY')
+    # Hospital dataset (CSV, Parquet or JSON); unset uses the sample hospitals
+    HOSPITALS_PATH = os.getenv('HOSPITALS_PATH')
+    # Cache of /nearby candidates per geohash cell (0 disables); precision
+    # 6 cells are about 1.2 x 0.6 km
+    GEO_CACHE_SIZE = int(os.getenv('GEO_CACHE_SIZE', 10000))
+    GEO_CACHE_PRECISION = int(os.getenv('GEO_CACHE_PRECISION', 6))
+    # Hospital rows held across all cached cells
+    GEO_CACHE_MAX_ROWS = int(os.getenv('GEO_CACHE_MAX_ROWS', 1000000))
+    # Origins per /api/hospitals/nearest/batch request
+    MAX_NEAREST_BATCH_SIZE = int(os.getenv('MAX_NEAREST_BATCH_SIZE', 100000))
+    # Road network edge list for ranking='travel_time'; unset disables it
+    ROAD_GRAPH_PATH = os.getenv('ROAD_GRAPH_PATH')
+    ROAD_GRAPH_LANDMARKS = int(os.getenv('ROAD_GRAPH_LANDMARKS', 8))
+    # Nearest hospitals routed per travel-time query, and the time allowed
+    TRAVEL_TIME_CANDIDATES = int(os.getenv('TRAVEL_TIME_CANDIDATES', 20))
+    TRAVEL_TIME_BUDGET_MS = float(os.getenv('TRAVEL_TIME_BUDGET_MS', 50))
+    # Live bed/ICU availability feed file (JSON, NDJSON or CSV), polled
+    # every AVAILABILITY_POLL_INTERVAL seconds; unset disables it
+    AVAILABILITY_FEED_PATH = os.getenv('AVAILABILITY_FEED_PATH')
+    AVAILABILITY_POLL_INTERVAL = float(os.getenv('AVAILABILITY_POLL_INTERVAL', 5))
+    # Updates per /api/hospitals/availability request
+    MAX_AVAILABILITY_BATCH_SIZE = int(os.getenv('MAX_AVAILABILITY_BATCH_SIZE', 10000))
     
     # Email notifications
     SMTP_SERVER = os.getenv('SMTP_SERVER')
@@ -29,6 +76,32 @@ class Config:
     # Model paths
     MODEL_PATH = os.getenv('MODEL_PATH', 'models/disease_model.pkl')
     SCALER_PATH = os.getenv('SCALER_PATH', 'models/scaler.pkl')
+    
+    # Versioned model directory (<MODEL_DIR>/<version>/disease_model.pkl);
+    # when set, versions can be hot-swapped without a restart
+    MODEL_DIR = os.getenv('MODEL_DIR')
+    MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', 0))
+    
+    # Load and warm the model at app import instead of on the first
+    # request (use with gunicorn --preload so workers share it)
+    WARMUP_ON_START = os.getenv('WARMUP_ON_START', 'False').lower() in ('true', '1', 'yes')
+    
+    # Admin endpoints are disabled unless a token is configured
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    
+    # Inference backend: 'sklearn' or 'compiled' (flat-array tree evaluator)
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'sklearn')
+    
+    # Prediction result cache (0 disables)
+    PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 10000))
+    PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL', 300))
+    
+    # Batch assessment
+    MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', 10000))
+    
+    # Coalesce concurrent /assess requests into micro-batches (0 disables)
+    COALESCE_WINDOW_MS = float(os.getenv('COALESCE_WINDOW_MS', 0))
+    COALESCE_MAX_BATCH = int(os.getenv('COALESCE_MAX_BATCH', 64))
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -41,4 +114,5 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     DEBUG = True
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    HISTORY_BACKEND = 'memory'
\ No newline at end of file
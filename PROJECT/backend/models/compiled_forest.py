@@ -0,0 +1,205 @@
+import numpy as np
+
+# Slack on early-exit probability bounds, far above float rounding error,
+# so a row is only stopped early when its bucket is certain
+BOUND_EPSILON = 1e-9
+
+
+class CompiledForest:
+    """
+    A trained RandomForestClassifier flattened into contiguous node arrays.
+    
+    The nodes of every tree are concatenated into one set of arrays
+    (feature, threshold, children, leaf value). Leaves point back at
+    themselves, so all trees can be walked in lock-step with NumPy fancy
+    indexing, one tree level per step, with no per-call validation, joblib
+    dispatch or Python-level tree recursion.
+    
+    The arrays are compact: int32 node indices, float32 thresholds and
+    leaf values stored for leaves only. Thresholds are rounded down to
+    the nearest float32, which keeps every split decision identical to
+    sklearn's (it compares float32 inputs against float64 thresholds).
+    """
+    
+    def __init__(self, feature, threshold, children, value, value_index, roots,
+                 max_depth, classes, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        # children[2 * node + go_right] picks the next node with one gather
+        self.children = children
+        # Leaf probabilities; value_index maps a leaf node to its row
+        self.value = value
+        self.value_index = value_index
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.n_classes = value.shape[1]
+        self.n_features_in_ = int(n_features)
+    
+    @classmethod
+    def from_sklearn(cls, model):
+        """Compile a fitted RandomForestClassifier."""
+        features, thresholds, children, values, value_indices, roots = [], [], [], [], [], []
+        offset = 0
+        leaf_offset = 0
+        max_depth = 0
+        
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            children.append(np.stack([
+                np.where(is_leaf, node_ids, tree.children_left),
+                np.where(is_leaf, node_ids, tree.children_right),
+            ], axis=1).ravel() + offset)
+            
+            # Normalize leaf counts/fractions exactly like
+            # DecisionTreeClassifier.predict_proba does
+            value = tree.value[is_leaf, 0, :model.n_classes_]
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+            
+            # Internal nodes never end a walk; they point at row 0
+            value_index = np.zeros(tree.node_count, dtype=np.int64)
+            value_index[is_leaf] = leaf_offset + np.arange(len(value))
+            value_indices.append(value_index)
+            
+            roots.append(offset)
+            offset += tree.node_count
+            leaf_offset += len(value)
+            max_depth = max(max_depth, tree.max_depth)
+        
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=round_down_to_float32(np.concatenate(thresholds)),
+            children=np.concatenate(children).astype(np.int32),
+            value=np.concatenate(values),
+            value_index=np.concatenate(value_indices).astype(np.int32),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+        )
+    
+    @property
+    def left(self):
+        return self.children[0::2]
+    
+    @property
+    def right(self):
+        return self.children[1::2]
+    
+    @property
+    def n_trees(self):
+        return len(self.roots)
+    
+    def apply(self, X, roots=None):
+        """
+        Return the leaf node index reached in every tree, per row.
+        
+        roots restricts the walk to a subset of trees (default: all).
+        """
+        # sklearn trees see float32 inputs; see round_down_to_float32
+        X = np.asarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        # The stored arrays are int32, but NumPy gathers fastest with
+        # intp indices, so the walk keeps its node ids as intp
+        nodes = (self.roots if roots is None else roots).astype(np.intp)
+        
+        if n_rows == 1:
+            # Single-row fast path: every gather works on 1-D arrays
+            x = X[0]
+            for _ in range(self.max_depth):
+                go_right = x[self.feature[nodes]] > self.threshold[nodes]
+                nodes = self.children[2 * nodes + go_right].astype(np.intp)
+            return nodes[np.newaxis]
+        
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[:, np.newaxis]
+        nodes = np.tile(nodes, (n_rows, 1))
+        for _ in range(self.max_depth):
+            go_right = flat_X[row_offsets + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_right].astype(np.intp)
+        return nodes
+    
+    def predict_proba(self, X):
+        """Class probabilities, identical to RandomForestClassifier.predict_proba."""
+        leaf_values = self.value[self.value_index[self.apply(X)]]
+        # Accumulate trees in order, then average, as the forest does
+        return leaf_values.cumsum(axis=1)[:, -1] / self.n_trees
+    
+    def predict(self, X):
+        """Predicted class labels."""
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+    
+    def predict_bucket(self, X, thresholds, block_size=20):
+        """
+        Bucket of each row's top class probability, stopping early.
+        
+        Trees are evaluated in order, block_size at a time. After each
+        block the final top probability is bounded: the remaining trees
+        can add at most one vote each to the leading class, and the
+        leading class always ends with at least an even share. Once both
+        bounds fall in the same bucket the row is done. Buckets match
+        np.searchsorted(thresholds, predict_proba(X).max(axis=1),
+        side='left') exactly.
+        
+        Returns:
+            (buckets, trees_evaluated): one int per row
+        """
+        X = np.asarray(X, dtype=np.float32)
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        n_rows, n_trees = len(X), self.n_trees
+        buckets = np.empty(n_rows, dtype=np.intp)
+        trees_evaluated = np.full(n_rows, n_trees, dtype=np.intp)
+        totals = np.zeros((n_rows, self.n_classes))
+        even_share = n_trees / self.n_classes
+        active = np.arange(n_rows)
+        
+        for start in range(0, n_trees, block_size):
+            stop = min(start + block_size, n_trees)
+            leaf_values = self.value[self.value_index[self.apply(X[active], self.roots[start:stop])]]
+            # Prepend the running totals so trees are still summed one at
+            # a time, in order, exactly as predict_proba sums them
+            totals[active] = np.concatenate(
+                [totals[active][:, np.newaxis], leaf_values], axis=1
+            ).cumsum(axis=1)[:, -1]
+            if stop == n_trees:
+                break
+            
+            top = totals[active].max(axis=1)
+            low = np.searchsorted(
+                thresholds, np.maximum(top, even_share) / n_trees - BOUND_EPSILON, side='left'
+            )
+            high = np.searchsorted(
+                thresholds, (top + n_trees - stop) / n_trees + BOUND_EPSILON, side='left'
+            )
+            decided = low == high
+            buckets[active[decided]] = low[decided]
+            trees_evaluated[active[decided]] = stop
+            active = active[~decided]
+            if len(active) == 0:
+                break
+        
+        if len(active):
+            top = (totals[active] / n_trees).max(axis=1)
+            buckets[active] = np.searchsorted(thresholds, top, side='left')
+        return buckets, trees_evaluated
+
+
+def round_down_to_float32(threshold):
+    """
+    Largest float32 values not above each float64 threshold.
+    
+    For any float32 x, x <= threshold exactly when x <= the rounded-down
+    threshold, so split decisions don't change.
+    """
+    threshold = np.asarray(threshold, dtype=np.float64)
+    rounded = threshold.astype(np.float32)
+    too_high = rounded.astype(np.float64) > threshold
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
@@ -1,41 +1,260 @@
+"""
+Train the disease risk model from CSV or Parquet exports of any size.
+
+Rows are streamed in chunks: the StandardScaler is fitted incrementally
+over every row (partial_fit), while fixed-size reservoir samples of the
+stream are kept for training and evaluation. Memory therefore stays
+bounded by the chunk and sample sizes, not by the size of the export.
+Writes disease_model.pkl and scaler.pkl, plus disease_model.rfm, the
+compact memory-mappable export that serving prefers.
+
+Usage:
+    python models/create_models.py --data exports.csv [--chunk-size 100000]
+        [--sample-size 500000] [--test-size 50000] [--output-dir models]
+    python models/create_models.py --generate 1000000 --data training_data.csv
+"""
+
+import argparse
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
-import joblib
 
-def generate_training_data():
-    # Generate synthetic data
-    num_samples = 1000
-    X = np.random.rand(num_samples, 10)  # Features
-    y = np.random.randint(0, 2, size=num_samples)  # Binary target
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.model_format import export_model
+from models.risk_predictor import FEATURE_NAMES
 
-    # Create DataFrame
-    data = pd.DataFrame(X, columns=[f'feature_{i}' for i in range(X.shape[1])])
-    data['target'] = y
+TARGET_COLUMN = 'disease_class'
+
+def generate_training_data(num_samples=2000, seed=42):
+    """Synthetic training rows with the documented columns."""
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'age': rng.integers(18, 90, num_samples),
+        'heart_rate': rng.integers(50, 120, num_samples),
+        'blood_pressure_systolic': rng.integers(90, 180, num_samples),
+        'blood_pressure_diastolic': rng.integers(60, 110, num_samples),
+        'bmi': rng.uniform(17, 40, num_samples).round(1),
+        'exercise_frequency': rng.integers(0, 8, num_samples),
+        'smoking': rng.integers(0, 2, num_samples),
+        'symptoms_count': rng.integers(0, 5, num_samples),
+        'family_history_count': rng.integers(0, 4, num_samples),
+    })
+    data[TARGET_COLUMN] = np.where(
+        data['blood_pressure_systolic'] + rng.normal(0, 10, num_samples) > 150,
+        'Cardiovascular Disease',
+        np.where(
+            data['bmi'] + rng.normal(0, 2, num_samples) > 32, 'Diabetes',
+            np.where((data['age'] > 65) & (data['smoking'] == 1), 'Stroke Risk', 'Healthy')
+        )
+    )
     return data
 
-def train_model(data):
-    # Split data into features and target
-    X = data.drop('target', axis=1)
-    y = data['target']
+def write_training_csv(path, num_samples, chunk_size=100000, seed=42):
+    """Write synthetic training data to a CSV, one chunk at a time."""
+    written = 0
+    while written < num_samples:
+        rows = min(chunk_size, num_samples - written)
+        chunk = generate_training_data(rows, seed=seed + written)
+        chunk.to_csv(path, mode='w' if written == 0 else 'a',
+                     header=written == 0, index=False)
+        written += rows
+
+def iter_chunks(path, chunk_size=100000):
+    """
+    Yield (features, labels) arrays from a CSV or Parquet file.
+
+    Only the feature and target columns are read. Parquet needs pyarrow.
+    """
+    path = Path(path)
+    columns = FEATURE_NAMES + [TARGET_COLUMN]
+
+    if path.suffix in ('.parquet', '.pq'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet exports requires pyarrow: pip install pyarrow")
+        frames = (
+            batch.to_pandas()
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns)
+        )
+    else:
+        frames = pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+
+    for frame in frames:
+        yield (frame[FEATURE_NAMES].to_numpy(dtype=np.float64),
+               frame[TARGET_COLUMN].to_numpy(dtype=object))
+
+class ReservoirSample:
+    """
+    Uniform fixed-size sample of a stream of rows (Algorithm R).
+
+    Every row seen so far has the same probability of being in the
+    sample, however long the stream, using capacity rows of memory.
+    """
+
+    def __init__(self, capacity, num_features, seed=0):
+        self.capacity = capacity
+        self.X = np.empty((capacity, num_features), dtype=np.float64)
+        self.y = np.empty(capacity, dtype=object)
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return min(self.seen, self.capacity)
+
+    def add(self, X, y):
+        """Offer a chunk of rows to the sample."""
+        filled = len(self)
+        fill = min(self.capacity - filled, len(X))
+        if fill:
+            self.X[filled:filled + fill] = X[:fill]
+            self.y[filled:filled + fill] = y[:fill]
 
-    # Standardize features
+        if fill < len(X):
+            # Row i (0-based over the whole stream) replaces a random slot
+            # with probability capacity / (i + 1)
+            positions = np.arange(self.seen + fill, self.seen + len(X))
+            slots = self._rng.integers(0, positions + 1)
+            chosen = np.nonzero(slots < self.capacity)[0]
+            slots = slots[chosen]
+            rows = chosen + fill
+            # When several rows pick the same slot the last one wins, as it
+            # would processing rows one by one
+            _, last = np.unique(slots[::-1], return_index=True)
+            last = len(slots) - 1 - last
+            self.X[slots[last]] = X[rows[last]]
+            self.y[slots[last]] = y[rows[last]]
+
+        self.seen += len(X)
+
+    def arrays(self):
+        size = len(self)
+        return self.X[:size], self.y[:size].astype(str)
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def sample_training_data(data_path, chunk_size=100000, sample_size=500000,
+                         test_size=50000, seed=42):
+    """
+    Stream an export once: fit the scaler on every row and keep two
+    reservoir samples, sample_size rows to train on and test_size
+    held-out rows to score with.
+
+    Returns:
+        dict with the fitted scaler, the raw (unscaled) train and test
+        arrays and the row and chunk counts
+    """
+    rng = np.random.default_rng(seed)
     scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    train_sample = ReservoirSample(sample_size, len(FEATURE_NAMES), seed=seed + 1)
+    test_sample = ReservoirSample(test_size, len(FEATURE_NAMES), seed=seed + 2)
+    test_fraction = test_size / (sample_size + test_size)
+    rows = chunks = 0
+
+    for X, y in iter_chunks(data_path, chunk_size):
+        scaler.partial_fit(X)
+        held_out = rng.random(len(X)) < test_fraction
+        train_sample.add(X[~held_out], y[~held_out])
+        test_sample.add(X[held_out], y[held_out])
+        rows += len(X)
+        chunks += 1
+
+    if rows == 0:
+        raise ValueError(f"No training rows in {data_path}")
+
+    X_train, y_train = train_sample.arrays()
+    X_test, y_test = test_sample.arrays()
+    return {
+        "scaler": scaler,
+        "X_train": X_train, "y_train": y_train,
+        "X_test": X_test, "y_test": y_test,
+        "rows": rows, "chunks": chunks,
+    }
+
+def train_streaming(data_path, output_dir, chunk_size=100000, sample_size=500000,
+                    test_size=50000, seed=42):
+    """
+    Train and save the model and scaler from a streamed export.
+
+    The scaler sees every row; the forest is trained on a bounded
+    reservoir sample (see sample_training_data).
+
+    Returns:
+        dict with row counts, test accuracy, wall-clock seconds and
+        peak RSS
+    """
+    start = time.perf_counter()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    data = sample_training_data(data_path, chunk_size, sample_size, test_size, seed)
+    scaler = data['scaler']
+    model = RandomForestClassifier(
+        n_estimators=100,
+        max_depth=15,
+        random_state=seed,
+        n_jobs=-1
+    )
+    model.fit(scaler.transform(data['X_train']), data['y_train'])
+
+    X_test, y_test = data['X_test'], data['y_test']
+    accuracy = model.score(scaler.transform(X_test), y_test) if len(X_test) else None
+
+    joblib.dump(model, output_dir / 'disease_model.pkl')
+    joblib.dump(scaler, output_dir / 'scaler.pkl')
+    export_model(output_dir / 'disease_model.rfm', model, scaler)
+
+    return {
+        "rows": data['rows'],
+        "chunks": data['chunks'],
+        "train_rows": len(data['X_train']),
+        "test_rows": len(X_test),
+        "accuracy": accuracy,
+        "seconds": time.perf_counter() - start,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', help='CSV or Parquet training export')
+    parser.add_argument('--generate', type=int, metavar='ROWS',
+                        help='write ROWS synthetic rows to --data first')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--sample-size', type=int, default=500000)
+    parser.add_argument('--test-size', type=int, default=50000)
+    parser.add_argument('--output-dir', default=Path(__file__).parent)
+    args = parser.parse_args()
 
-    # Train-test split
-    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
+    with tempfile.TemporaryDirectory() as scratch:
+        data_path = args.data or Path(scratch) / 'training_data.csv'
+        if args.generate or not args.data:
+            write_training_csv(data_path, args.generate or 2000, args.chunk_size)
 
-    # Train model
-    model = RandomForestClassifier()
-    model.fit(X_train, y_train)
+        report = train_streaming(
+            data_path, args.output_dir, chunk_size=args.chunk_size,
+            sample_size=args.sample_size, test_size=args.test_size
+        )
 
-    # Save model and scaler
-    joblib.dump(model, 'disease_model.pkl')
-    joblib.dump(scaler, 'scaler.pkl')
+    print(f"Rows streamed: {report['rows']} in {report['chunks']} chunks")
+    print(f"Trained on {report['train_rows']} rows, tested on {report['test_rows']}")
+    if report['accuracy'] is not None:
+        print(f"Test accuracy: {report['accuracy']:.4f}")
+    print(f"Wall clock: {report['seconds']:.1f} s   Peak RSS: {report['peak_rss_mb']:.1f} MB")
+    print(f"✓ Model, scaler and binary export saved to {args.output_dir}")
 
 if __name__ == '__main__':
-    training_data = generate_training_data()
-    train_model(training_data)
+    main()
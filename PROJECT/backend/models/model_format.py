@@ -0,0 +1,127 @@
+import json
+import os
+from pathlib import Path
+import numpy as np
+from models.compiled_forest import CompiledForest
+
+# File layout (little-endian):
+#   magic (8 bytes) | format version (uint32) | header length (uint32)
+#   JSON header | arrays, each starting on an ALIGNMENT-byte boundary
+# The header records every array's dtype, shape and byte offset, so a
+# load is one mmap plus zero-copy views: nothing is unpickled and the
+# pages are shared by every process that maps the file.
+MAGIC = b'RFMODEL\x00'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+BINARY_MODEL_SUFFIX = '.rfm'
+
+FOREST_ARRAYS = ('feature', 'threshold', 'children', 'value', 'value_index', 'roots')
+
+
+class CompiledScaler:
+    """
+    StandardScaler parameters without sklearn.
+
+    transform() does the same float64 arithmetic as
+    StandardScaler.transform, so scaled features are bit-for-bit equal.
+    """
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.n_features_in_ = len(mean)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def is_binary_model(path):
+    return Path(path).suffix == BINARY_MODEL_SUFFIX
+
+
+def export_model(path, model, scaler):
+    """
+    Write a fitted forest and StandardScaler to the compact binary format.
+
+    The file is written next to its destination and renamed into place,
+    so a reader never maps a half-written model.
+    """
+    if not (scaler.with_mean and scaler.with_std):
+        raise ValueError("Only StandardScaler(with_mean=True, with_std=True) can be exported")
+
+    forest = CompiledForest.from_sklearn(model)
+    arrays = {name: getattr(forest, name) for name in FOREST_ARRAYS}
+    arrays['scaler_mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+    arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+
+    header = {
+        "max_depth": forest.max_depth,
+        "n_features": forest.n_features_in_,
+        "classes": forest.classes_.tolist(),
+        "arrays": {},
+    }
+    # Offsets are relative to the end of the header, so they don't depend
+    # on the header's own length
+    offset = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = {
+            "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset
+        }
+        offset = _align(offset + array.nbytes)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    path = Path(path)
+    temp_path = path.with_name(path.name + '.tmp')
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.array([FORMAT_VERSION, len(header_bytes)], dtype='<u4').tobytes())
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + header["arrays"][name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(temp_path, path)
+    return path
+
+
+def load_model(path):
+    """
+    Memory-map a binary model file.
+
+    Returns:
+        (CompiledForest, CompiledScaler) whose arrays are read-only views
+        of the mapped file
+
+    Raises:
+        ValueError: if the file isn't a binary model of a supported version
+    """
+    mapped = np.memmap(path, dtype=np.uint8, mode='r')
+    prefix = len(MAGIC) + 8
+    if len(mapped) < prefix or bytes(mapped[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"Not a binary model file: {path}")
+    version, header_length = np.frombuffer(mapped, dtype='<u4', count=2, offset=len(MAGIC))
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format version {version} in {path}")
+
+    header = json.loads(bytes(mapped[prefix:prefix + header_length]).decode('utf-8'))
+    data_start = _align(prefix + int(header_length))
+    arrays = {
+        name: np.frombuffer(
+            mapped, dtype=np.dtype(spec["dtype"]),
+            count=int(np.prod(spec["shape"])), offset=data_start + spec["offset"]
+        ).reshape(spec["shape"])
+        for name, spec in header["arrays"].items()
+    }
+
+    forest = CompiledForest(
+        **{name: arrays[name] for name in FOREST_ARRAYS},
+        max_depth=header["max_depth"],
+        classes=np.asarray(header["classes"]),
+        n_features=header["n_features"],
+    )
+    return forest, CompiledScaler(arrays['scaler_mean'], arrays['scaler_scale'])
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,388 @@
+import os
+import threading
+import weakref
+from collections import namedtuple
+from pathlib import Path
+import numpy as np
+from models.compiled_forest import CompiledForest
+from models.model_format import BINARY_MODEL_SUFFIX, is_binary_model, load_model
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Read-only view of one loaded model version. The model, scaler and
+# compiled forest are shared by every service in the process and must
+# never be mutated; a new version gets a new handle. For a binary model,
+# model is the compiled forest and sklearn_model (if its pickle exists)
+# loads the sklearn forest for batches sklearn evaluates faster.
+ModelHandle = namedtuple(
+    'ModelHandle',
+    ['model', 'scaler', 'compiled_model', 'signature', 'version', 'sklearn_model'],
+    defaults=(None,)
+)
+
+# Versioned model directory layout
+MODEL_FILE = 'disease_model.pkl'
+SCALER_FILE = 'scaler.pkl'
+# Compact memory-mapped export of model and scaler (see model_format)
+BINARY_MODEL_FILE = 'disease_model' + BINARY_MODEL_SUFFIX
+ACTIVE_FILE = 'ACTIVE'
+
+
+def model_files(model_path, scaler_path):
+    """The files a model is loaded from; a binary model holds its own scaler."""
+    if is_binary_model(model_path):
+        return (model_path,)
+    return (model_path, scaler_path)
+
+
+def model_file(directory, binary=True):
+    """
+    The model file to serve from a directory: the binary export if binary
+    is true (the compiled backend), otherwise the pickle. The binary
+    export is also used when it is the only model there.
+    """
+    directory = Path(directory)
+    binary_path = directory / BINARY_MODEL_FILE
+    pickle_path = directory / MODEL_FILE
+    if binary_path.is_file() and (binary or not pickle_path.is_file()):
+        return binary_path
+    return pickle_path
+
+
+class LazySklearnModel:
+    """The pickled forest exported next to a binary model, unpickled on first use."""
+    
+    def __init__(self, model_path, mmap_mode='r'):
+        self.model_path = Path(model_path)
+        self.mmap_mode = mmap_mode
+        self._model = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import joblib
+                    
+                    logger.info(f"Loading {self.model_path} for large batches")
+                    self._model = joblib.load(self.model_path, mmap_mode=self.mmap_mode)
+        return self._model
+
+
+def file_signature(model_path, scaler_path):
+    """(mtime, size) of the model and scaler files, or None if missing."""
+    try:
+        return tuple(
+            (stat.st_mtime_ns, stat.st_size)
+            for stat in map(os.stat, model_files(model_path, scaler_path))
+        )
+    except OSError:
+        return None
+
+
+class ModelRegistry:
+    """
+    Process-wide registry that loads each model version exactly once.
+    
+    Every RiskPredictor asks the registry for a ModelHandle instead of
+    unpickling the model itself, so the forest and scaler are loaded once
+    per process no matter how many services use them.
+    
+    Binary (.rfm) models are memory-mapped as-is: loading is near-instant
+    and the pages are shared by every process serving the file. Pickled
+    models are loaded with joblib memory-mapping; sklearn copies the tree
+    arrays while unpickling, so their pages are only shared when loaded
+    before the server forks (gunicorn --preload).
+    """
+    
+    def __init__(self, mmap_mode='r'):
+        self.mmap_mode = mmap_mode
+        self._handles = {}
+        self._version_managers = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+    
+    def get(self, model_path, scaler_path, compiled=False, version=None):
+        """
+        Return the shared handle for a model/scaler pair, loading it on
+        first use.
+        
+        Raises:
+            FileNotFoundError: if the model or scaler file doesn't exist
+        """
+        key = self._key(model_path, scaler_path)
+        handle = self._handles.get(key)
+        if handle is not None and (handle.compiled_model is not None or not compiled):
+            return handle
+        
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is None:
+                handle = self._load(model_path, scaler_path, version)
+            if compiled and handle.compiled_model is None:
+                handle = handle._replace(
+                    compiled_model=CompiledForest.from_sklearn(handle.model)
+                )
+            self._handles[key] = handle
+            return handle
+    
+    def refresh(self, model_path, scaler_path, compiled=False):
+        """
+        Return the current handle, reloading first if the files changed.
+        
+        A failed reload (e.g. a file caught mid-write) is logged and the
+        previous handle keeps being served.
+        """
+        key = self._key(model_path, scaler_path)
+        handle = self._handles.get(key)
+        signature = file_signature(model_path, scaler_path)
+        if handle is not None and (signature is None or signature == handle.signature):
+            return handle
+        
+        with self._lock:
+            current = self._handles.get(key)
+            if current is not None and current is not handle:
+                # Another thread already reloaded
+                return current
+            try:
+                handle = self._load(model_path, scaler_path,
+                                    current.version if current else None)
+            except Exception as e:
+                logger.warning(f"Model reload failed, keeping current model: {str(e)}")
+                return current
+            if compiled and handle.compiled_model is None:
+                handle = handle._replace(
+                    compiled_model=CompiledForest.from_sklearn(handle.model)
+                )
+            self._handles[key] = handle
+            logger.info(f"Reloaded model from {model_path}")
+            return handle
+    
+    def register(self, model_path, scaler_path, model, scaler, compiled=False):
+        """Publish a freshly trained model/scaler pair and return its handle."""
+        handle = ModelHandle(
+            model=model,
+            scaler=scaler,
+            compiled_model=CompiledForest.from_sklearn(model) if compiled else None,
+            signature=file_signature(model_path, scaler_path),
+            version=None,
+        )
+        with self._lock:
+            self._handles[self._key(model_path, scaler_path)] = handle
+        return handle
+    
+    def release(self, model_path, scaler_path):
+        """
+        Forget a loaded model. Requests still holding its handle keep it
+        alive until they finish.
+        """
+        with self._lock:
+            self._handles.pop(self._key(model_path, scaler_path), None)
+    
+    def versions(self, model_dir):
+        """Return the shared version manager for a versioned model directory."""
+        key = str(Path(model_dir).resolve())
+        with self._lock:
+            manager = self._version_managers.get(key)
+            if manager is None:
+                manager = ModelVersionManager(model_dir, self)
+                self._version_managers[key] = manager
+            return manager
+    
+    def get_stats(self):
+        """Number of loaded model versions and total loads from disk."""
+        return {"loaded_models": len(self._handles), "loads": self.loads}
+    
+    def _key(self, model_path, scaler_path):
+        return tuple(str(Path(path).resolve()) for path in model_files(model_path, scaler_path))
+    
+    def _load(self, model_path, scaler_path, version=None):
+        # Stat before loading: if a file changes mid-load, the stale
+        # signature makes the next refresh load it again
+        signature = file_signature(model_path, scaler_path)
+        if is_binary_model(model_path):
+            forest, scaler = load_model(model_path)
+            self.loads += 1
+            pickle_path = Path(model_path).with_suffix('.pkl')
+            return ModelHandle(model=forest, scaler=scaler, compiled_model=forest,
+                               signature=signature, version=version,
+                               sklearn_model=(LazySklearnModel(pickle_path, self.mmap_mode)
+                                              if pickle_path.is_file() else None))
+        
+        # joblib (and sklearn, pulled in by unpickling) are imported on the
+        # first load rather than at app import
+        import joblib
+        model = joblib.load(model_path, mmap_mode=self.mmap_mode)
+        scaler = joblib.load(scaler_path, mmap_mode=self.mmap_mode)
+        self.loads += 1
+        return ModelHandle(model=model, scaler=scaler, compiled_model=None,
+                           signature=signature, version=version)
+
+
+class ModelVersionManager:
+    """
+    Hot-swappable active version of a versioned model directory.
+    
+    Layout:
+        <model_dir>/<version>/disease_model.pkl
+        <model_dir>/<version>/scaler.pkl
+        <model_dir>/<version>/disease_model.rfm    optional; served if present
+        <model_dir>/ACTIVE    optional; names the version to serve
+    
+    Without an ACTIVE file the highest-sorting version is served. A swap
+    loads and warms the new version (dummy predictions) before publishing
+    it to every subscribed RiskPredictor with a single reference
+    assignment, so requests already in flight finish on the old version.
+    """
+    
+    WARMUP_ROWS = 8
+    
+    def __init__(self, model_dir, registry):
+        self.model_dir = Path(model_dir)
+        self.registry = registry
+        self.compiled = False
+        self._active = None
+        self._predictors = weakref.WeakSet()
+        self._swap_lock = threading.Lock()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+    
+    @property
+    def active(self):
+        return self._active
+    
+    @property
+    def active_version(self):
+        return self._active.version if self._active else None
+    
+    def list_versions(self):
+        """Names of complete version directories, in sort order."""
+        if not self.model_dir.is_dir():
+            return []
+        return sorted(
+            path.name for path in self.model_dir.iterdir()
+            if (path / BINARY_MODEL_FILE).is_file()
+            or ((path / MODEL_FILE).is_file() and (path / SCALER_FILE).is_file())
+        )
+    
+    def target_version(self):
+        """The version that should be active: ACTIVE if present, else the latest."""
+        pointer = self.model_dir / ACTIVE_FILE
+        if pointer.is_file():
+            name = pointer.read_text().strip()
+            if name:
+                return name
+        versions = self.list_versions()
+        return versions[-1] if versions else None
+    
+    def subscribe(self, predictor):
+        """Register a predictor for swaps and return the handle it should serve."""
+        with self._swap_lock:
+            self._predictors.add(predictor)
+            if predictor.backend == 'compiled':
+                self.compiled = True
+        
+        if self._active is None:
+            target = self.target_version()
+            if target is not None:
+                return self.swap(target)
+        elif self.compiled and self._active.compiled_model is None:
+            return self.swap(self._active.version)
+        return self._active
+    
+    def swap(self, version):
+        """
+        Load, warm and atomically activate a version.
+        
+        Raises:
+            ValueError: if the version doesn't exist in the model directory
+        """
+        if version not in self.list_versions():
+            raise ValueError(f"Unknown model version: {version}")
+        
+        with self._swap_lock:
+            version_dir = self.model_dir / version
+            handle = self.registry.get(
+                model_file(version_dir, binary=self.compiled), version_dir / SCALER_FILE,
+                compiled=self.compiled, version=version
+            )
+            warm_handle(handle, self.WARMUP_ROWS)
+            
+            previous = self._active
+            self._active = handle
+            for predictor in list(self._predictors):
+                predictor._use_handle(handle)
+            
+            if previous is not None and previous.version != version:
+                previous_dir = self.model_dir / previous.version
+                # Whichever of its files the previous version was loaded from
+                for binary in (True, False):
+                    self.registry.release(model_file(previous_dir, binary),
+                                          previous_dir / SCALER_FILE)
+            logger.info(f"Activated model version {version}")
+            return handle
+    
+    def swap_async(self, version):
+        """Warm and swap in a background thread; returns the thread."""
+        if version not in self.list_versions():
+            raise ValueError(f"Unknown model version: {version}")
+        thread = threading.Thread(
+            target=self._swap_logged, args=(version,),
+            name=f'model-swap-{version}', daemon=True
+        )
+        thread.start()
+        return thread
+    
+    def check_for_update(self):
+        """Swap to the target version if it differs from the active one."""
+        target = self.target_version()
+        if target is None or target == self.active_version:
+            return False
+        self.swap(target)
+        return True
+    
+    def start_watching(self, interval):
+        """Poll the directory every interval seconds and swap on changes."""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name='model-watcher', daemon=True
+        )
+        self._watcher.start()
+    
+    def stop_watching(self):
+        self._stop_watching.set()
+    
+    def _watch(self, interval):
+        while not self._stop_watching.wait(interval):
+            try:
+                self.check_for_update()
+            except Exception as e:
+                logger.error(f"Model watch check failed: {str(e)}")
+    
+    def _swap_logged(self, version):
+        try:
+            self.swap(version)
+        except Exception as e:
+            logger.error(f"Model swap to {version} failed: {str(e)}")
+    
+
+
+def warm_handle(handle, rows=8):
+    """Run dummy predictions so the first real request pays no warmup cost."""
+    dummy = np.zeros((rows, handle.model.n_features_in_))
+    scaled = handle.scaler.transform(dummy)
+    handle.model.predict_proba(scaled)
+    handle.model.predict_proba(scaled[:1])
+    if handle.compiled_model is not None:
+        handle.compiled_model.predict_proba(scaled[:1])
+
+
+_registry = ModelRegistry()
+
+
+def get_model_registry():
+    """Return the process-wide model registry."""
+    return _registry
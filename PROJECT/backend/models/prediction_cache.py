@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Thread-safe bounded LRU cache with a per-entry TTL.
+    
+    Keys are canonical feature vectors; values are prediction results.
+    Counters track hits, misses, LRU evictions, TTL expirations and
+    whole-cache invalidations (e.g. after the model files change).
+    """
+    
+    def __init__(self, max_size=10000, ttl_seconds=300):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entry."""
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+    
+    def get_stats(self):
+        """Hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+    
+    def __len__(self):
+        return len(self._entries)
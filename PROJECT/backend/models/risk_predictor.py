@@ -1,21 +1,131 @@
-import joblib
+import threading
+import time
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-import pandas as pd
 from pathlib import Path
+from models.model_format import BINARY_MODEL_SUFFIX, export_model
+from models.model_registry import get_model_registry, model_file, warm_handle
+from models.prediction_cache import PredictionCache
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+RISK_LEVELS = ("LOW", "MODERATE", "HIGH", "CRITICAL")
+RISK_LEVEL_THRESHOLDS = (0.3, 0.5, 0.7)
+HIGH_RISK_THRESHOLD = 0.4
+INFERENCE_BACKENDS = ('sklearn', 'compiled')
+
+# Model inputs, in the order extract_features returns them
+FEATURE_NAMES = [
+    'age', 'heart_rate', 'blood_pressure_systolic',
+    'blood_pressure_diastolic', 'bmi', 'exercise_frequency',
+    'smoking', 'symptoms_count', 'family_history_count'
+]
 
 class RiskPredictor:
-    def __init__(self, model_path=None, scaler_path=None):
-        self.model_path = model_path or Path(__file__).parent / 'disease_model.pkl'
+    # The compiled evaluator wins on small inputs; past this many rows
+    # sklearn's threaded C traversal is faster
+    COMPILED_MAX_ROWS = 64
+    # How often (seconds) a caching predictor re-stats the model files
+    MODEL_CHECK_INTERVAL = 1.0
+    # Trees evaluated between early-exit checks in predict_risk_levels
+    EARLY_EXIT_BLOCK = 20
+    
+    def __init__(self, model_path=None, scaler_path=None, backend='sklearn',
+                 cache_size=0, cache_ttl=300, registry=None, model_dir=None):
+        if backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"Unknown inference backend: {backend}")
+        
+        # The compiled backend serves the compact binary export when one
+        # has been trained; sklearn serves the pickle
+        self.model_path = model_path or model_file(Path(__file__).parent,
+                                                   binary=backend == 'compiled')
         self.scaler_path = scaler_path or Path(__file__).parent / 'scaler.pkl'
+        self.backend = backend
+        self.registry = registry or get_model_registry()
+        self.cache = PredictionCache(cache_size, cache_ttl) if cache_size > 0 else None
+        self._next_model_check = 0.0
+        self._handle = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
         
-        try:
-            self.model = joblib.load(self.model_path)
-            self.scaler = joblib.load(self.scaler_path)
-        except FileNotFoundError:
-            self.model = None
-            self.scaler = None
+        # A versioned model directory is served through the registry's
+        # shared version manager, which hot-swaps every subscribed predictor
+        self.versions = self.registry.versions(model_dir) if model_dir else None
+    
+    @property
+    def model(self):
+        handle = self._current_handle()
+        return handle.model if handle else None
+    
+    @property
+    def scaler(self):
+        handle = self._current_handle()
+        return handle.scaler if handle else None
+    
+    @property
+    def compiled_model(self):
+        handle = self._current_handle()
+        return handle.compiled_model if handle else None
+    
+    @property
+    def version(self):
+        """Name of the model version being served (None if unversioned)."""
+        handle = self._current_handle()
+        return handle.version if handle else None
+    
+    @property
+    def loaded_version(self):
+        """
+        Like version, but never loads the model: the version already
+        loaded, else the version manager's active one, else None.
+        """
+        handle = self._handle
+        if handle is not None:
+            return handle.version
+        return self.versions.active_version if self.versions is not None else None
+    
+    def load(self):
+        """
+        Load the model on first use.
+        
+        Unpickling the forest imports sklearn, which dominates startup
+        time, so construction is cheap and the model is loaded here: on
+        the first prediction, or up front via warmup().
+        
+        Returns:
+            the model handle, or None if no trained model exists
+        """
+        with self._load_lock:
+            if self._loaded:
+                return self._handle
+            
+            if self.versions is not None:
+                handle = self.versions.subscribe(self)
+                # A swap racing with subscribe may already have installed
+                # a newer version on this predictor
+                handle = self._handle or handle
+            else:
+                try:
+                    handle = self.registry.get(
+                        self.model_path, self.scaler_path,
+                        compiled=self.backend == 'compiled'
+                    )
+                except FileNotFoundError:
+                    handle = None
+            self._use_handle(handle)
+            self._loaded = True
+            return handle
+    
+    def warmup(self):
+        """Load the model and run dummy predictions. Returns True if a model is loaded."""
+        handle = self.load()
+        if handle is None:
+            return False
+        warm_handle(handle)
+        return True
+    
+    def _current_handle(self):
+        return self._handle if self._loaded else self.load()
     
     def predict_risk(self, health_data):
         """
@@ -39,108 +149,300 @@ class RiskPredictor:
         if self.model is None:
             raise RuntimeError("Model not trained. Please train the model first.")
         
-        # Feature engineering
-        features = self._extract_features(health_data)
-        
-        # Scale features
-        features_scaled = self.scaler.transform([features])
+        return self._predict([health_data])[0]
+    
+    def predict_risk_batch(self, health_data_list):
+        """
+        Predict disease risk for many patients with a single model call.
         
-        # Get predictions and probabilities
-        risk_prediction = self.model.predict(features_scaled)[0]
-        risk_probabilities = self.model.predict_proba(features_scaled)[0]
+        Args:
+            health_data_list: list of dicts, each with the same keys as
+                the input to predict_risk
         
-        # Map to disease classes
-        diseases = self.model.classes_
-        risk_scores = {
-            disease: float(prob) 
-            for disease, prob in zip(diseases, risk_probabilities)
-        }
+        Returns:
+            list of risk assessment dicts, in input order
+        """
+        if self.model is None:
+            raise RuntimeError("Model not trained. Please train the model first.")
         
-        # Identify high-risk conditions (>40% probability)
-        high_risk_diseases = [
-            disease for disease, score in risk_scores.items() 
-            if score > 0.4
-        ]
+        if not health_data_list:
+            return []
         
-        return {
-            "overall_risk_level": self._calculate_risk_level(risk_scores),
-            "risk_scores": risk_scores,
-            "high_risk_diseases": high_risk_diseases,
-            "primary_concern": max(risk_scores, key=risk_scores.get),
-            "recommendation": self._get_recommendation(high_risk_diseases, health_data)
-        }
+        return self._predict(health_data_list)
     
-    def _extract_features(self, health_data):
-        """Extract and normalize features from health data."""
-        features = [
-            health_data.get('age', 30),
-            health_data.get('heart_rate', 70),
-            health_data.get('blood_pressure_systolic', 120),
-            health_data.get('blood_pressure_diastolic', 80),
-            health_data.get('bmi', 24),
-            health_data.get('exercise_frequency', 3),
-            int(health_data.get('smoking', False)),
-            len(health_data.get('symptoms', [])),
-            len(health_data.get('family_history', [])),
-        ]
-        return features
-    
-    def _calculate_risk_level(self, risk_scores):
-        """Calculate overall risk level."""
-        max_risk = max(risk_scores.values())
-        if max_risk > 0.7:
-            return "CRITICAL"
-        elif max_risk > 0.5:
-            return "HIGH"
-        elif max_risk > 0.3:
-            return "MODERATE"
+    def predict_risk_levels(self, health_data_list):
+        """
+        Overall risk level only, evaluating as few trees as possible.
+        
+        With a compiled forest (compiled backend or a binary model), trees
+        are evaluated in order and each patient stops as soon as the
+        remaining trees can no longer change their risk level; the level
+        is always the one predict_risk would return. Otherwise every tree
+        is evaluated.
+        
+        Returns:
+            list of dicts with overall_risk_level, trees_evaluated and
+            total_trees, in input order
+        """
+        if self.model is None:
+            raise RuntimeError("Model not trained. Please train the model first.")
+        
+        if not health_data_list:
+            return []
+        
+        handle = self._handle
+        matrix = np.array(
+            [self._extract_features(health_data) for health_data in health_data_list],
+            dtype=np.float64
+        )
+        features_scaled = self._scale_features(handle, matrix)
+        
+        if handle.compiled_model is not None:
+            total_trees = handle.compiled_model.n_trees
+            buckets, trees_evaluated = handle.compiled_model.predict_bucket(
+                features_scaled, RISK_LEVEL_THRESHOLDS, self.EARLY_EXIT_BLOCK
+            )
+            risk_levels = [RISK_LEVELS[bucket] for bucket in buckets.tolist()]
+            trees_evaluated = trees_evaluated.tolist()
         else:
-            return "LOW"
+            total_trees = len(handle.model.estimators_)
+            risk_levels = self._calculate_risk_levels(handle.model.predict_proba(features_scaled))
+            trees_evaluated = [total_trees] * len(risk_levels)
+        
+        return [
+            {"overall_risk_level": risk_level, "trees_evaluated": trees,
+             "total_trees": total_trees}
+            for risk_level, trees in zip(risk_levels, trees_evaluated)
+        ]
     
-    def _get_recommendation(self, diseases, health_data):
-        """Generate recommendations based on risks."""
-        if not diseases:
-            return "Maintain healthy lifestyle and regular check-ups."
+    def _predict(self, health_data_list):
+        """Serve cached results where possible and score the rest in one pass."""
+        if self.cache is not None:
+            self._check_model_files()
         
-        recommendations = []
+        # Capture the handle once: if a new version is swapped in meanwhile,
+        # this request still finishes entirely on the version it started with
+        handle = self._handle
         
-        if "Cardiovascular Disease" in diseases:
-            recommendations.append("Consult a cardiologist immediately")
-            recommendations.append("Monitor blood pressure daily")
-            recommendations.append("Reduce salt and saturated fat intake")
+        features = [self._extract_features(health_data) for health_data in health_data_list]
+        results = [None] * len(features)
+        cache_keys = None
         
-        if "Diabetes" in diseases:
-            recommendations.append("Get blood glucose testing")
-            recommendations.append("Monitor dietary intake")
-            recommendations.append("Increase physical activity")
+        if self.cache is not None:
+            cache_keys = [
+                self._cache_key(handle, row, health_data)
+                for row, health_data in zip(features, health_data_list)
+            ]
+            for index, key in enumerate(cache_keys):
+                cached = self.cache.get(key)
+                if cached is not None:
+                    results[index] = _copy_result(cached)
         
-        if "Stroke Risk" in diseases:
-            recommendations.append("Emergency medical evaluation recommended")
-            recommendations.append("Take aspirin if recommended by doctor")
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            # One 2-D feature matrix for every row that still needs scoring
+            matrix = np.array([features[index] for index in missing], dtype=np.float64)
+            features_scaled = self._scale_features(handle, matrix)
+            
+            # The predicted class is the argmax of the probabilities, so one
+            # predict_proba call is all the forest work needed
+            risk_probabilities = self._predict_proba(handle, features_scaled)
+            
+            computed = self._build_results(
+                handle, risk_probabilities, [health_data_list[index] for index in missing]
+            )
+            for index, result in zip(missing, computed):
+                results[index] = result
+                if cache_keys is not None:
+                    self.cache.put(cache_keys[index], _copy_result(result))
+        
+        return results
+    
+    def _cache_key(self, handle, features, health_data):
+        """
+        Canonical cache key: the model features plus the smoking flag,
+        scoped to the model version that produced the result.
+        """
+        return (handle.version, handle.signature, tuple(features),
+                bool(health_data.get('smoking')))
+    
+    def _check_model_files(self):
+        """Pick up a changed model from the registry and drop cached results."""
+        if self.versions is not None:
+            # Version directories are immutable; the version manager swaps
+            return
         
-        if health_data.get('smoking'):
-            recommendations.append("Quit smoking immediately")
+        now = time.monotonic()
+        if now < self._next_model_check:
+            return
+        self._next_model_check = now + self.MODEL_CHECK_INTERVAL
         
-        return recommendations
+        handle = self.registry.refresh(
+            self.model_path, self.scaler_path, compiled=self.backend == 'compiled'
+        )
+        if handle is not None and handle is not self._handle:
+            self._use_handle(handle)
+            logger.info("Model files changed; switched to reloaded model")
+    
+    def _use_handle(self, handle):
+        """Atomically switch to a registry handle (None if no model)."""
+        if (self.backend == 'sklearn' and handle is not None
+                and handle.model is handle.compiled_model):
+            logger.warning("INFERENCE_BACKEND is sklearn but only a binary model was found; "
+                           "serving it with the compiled evaluator")
+        previous = self._handle
+        self._handle = handle
+        if self.cache is not None and previous is not None and handle is not previous:
+            # Keys are version-scoped, so this only frees memory
+            self.cache.clear()
+    
+    def _scale_features(self, handle, features):
+        """Standardize a 2-D feature matrix."""
+        if handle.compiled_model is not None:
+            # Same arithmetic as StandardScaler.transform, minus its input
+            # validation overhead
+            return (features - handle.scaler.mean_) / handle.scaler.scale_
+        return handle.scaler.transform(features)
     
-    def train_model(self, X_train, y_train, X_test, y_test):
-        """Train the risk prediction model."""
-        self.scaler = StandardScaler()
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+    def _predict_proba(self, handle, features_scaled):
+        """Class probabilities from the configured inference backend."""
+        if (handle.compiled_model is not None
+                and len(features_scaled) <= self.COMPILED_MAX_ROWS):
+            return handle.compiled_model.predict_proba(features_scaled)
+        if handle.sklearn_model is not None:
+            # A binary model: large batches go to the pickled forest
+            return handle.sklearn_model.get().predict_proba(features_scaled)
+        return handle.model.predict_proba(features_scaled)
+    
+    def _build_results(self, handle, risk_probabilities, health_data_list):
+        """Spread a probability matrix back out into per-patient results."""
+        diseases = handle.model.classes_.tolist()
+        risk_levels = self._calculate_risk_levels(risk_probabilities)
+        primary_concerns = risk_probabilities.argmax(axis=1).tolist()
+        high_risk_flags = (risk_probabilities > HIGH_RISK_THRESHOLD).tolist()
         
-        self.model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=15,
+        results = []
+        for health_data, probabilities, flags, primary, risk_level in zip(
+            health_data_list, risk_probabilities.tolist(), high_risk_flags,
+            primary_concerns, risk_levels
+        ):
+            high_risk_diseases = [
+                disease for disease, flagged in zip(diseases, flags) if flagged
+            ]
+            results.append({
+                "overall_risk_level": risk_level,
+                "risk_scores": dict(zip(diseases, probabilities)),
+                "high_risk_diseases": high_risk_diseases,
+                "primary_concern": diseases[primary],
+                "recommendation": self._get_recommendation(high_risk_diseases, health_data)
+            })
+        return results
+    
+    def _extract_features(self, health_data):
+        """Extract and normalize features from health data."""
+        return extract_features(health_data)
+    
+    def _calculate_risk_levels(self, risk_probabilities):
+        """Calculate overall risk level from each row's highest probability."""
+        buckets = np.searchsorted(
+            RISK_LEVEL_THRESHOLDS, risk_probabilities.max(axis=1), side='left'
+        )
+        return [RISK_LEVELS[bucket] for bucket in buckets.tolist()]
+    
+    def _get_recommendation(self, diseases, health_data):
+        """Generate recommendations based on risks."""
+        return get_recommendation(diseases, bool(health_data.get('smoking')))
+    
+    def train_model(self, X_train, y_train, X_test, y_test, n_estimators=100,
+                    max_depth=15, max_features='sqrt'):
+        """
+        Train the risk prediction model.
+        
+        The forest defaults can be tuned with models/sweep_models.py,
+        which reports what each setting costs in serving latency.
+        """
+        # Imported here so serving never pays for sklearn's import
+        import joblib
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+        
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+        
+        model = RandomForestClassifier(
+            n_estimators=n_estimators,
+            max_depth=max_depth,
+            max_features=max_features,
             random_state=42,
             n_jobs=-1
         )
         
-        self.model.fit(X_train_scaled, y_train)
+        model.fit(X_train_scaled, y_train)
         
-        # Save models
-        joblib.dump(self.model, self.model_path)
-        joblib.dump(self.scaler, self.scaler_path)
+        # Save models: the pickles for sklearn tooling, plus the compact
+        # binary export that serving memory-maps
+        pickle_path = Path(self.model_path).with_suffix('.pkl')
+        joblib.dump(model, pickle_path)
+        joblib.dump(scaler, self.scaler_path)
+        export_model(pickle_path.with_suffix(BINARY_MODEL_SUFFIX), model, scaler)
+        self._use_handle(self.registry.register(
+            self.model_path, self.scaler_path, model, scaler,
+            compiled=self.backend == 'compiled'
+        ))
+        self._loaded = True
         
-        score = self.model.score(X_test_scaled, y_test)
-        return {"accuracy": score, "model_saved": True}
\ No newline at end of file
+        score = model.score(X_test_scaled, y_test)
+        return {"accuracy": score, "model_saved": True}
+
+
+def extract_features(health_data):
+    """Model features from a health data dict, in FEATURE_NAMES order."""
+    return [
+        health_data.get('age', 30),
+        health_data.get('heart_rate', 70),
+        health_data.get('blood_pressure_systolic', 120),
+        health_data.get('blood_pressure_diastolic', 80),
+        health_data.get('bmi', 24),
+        health_data.get('exercise_frequency', 3),
+        int(health_data.get('smoking', False)),
+        len(health_data.get('symptoms', [])),
+        len(health_data.get('family_history', [])),
+    ]
+
+
+def get_recommendation(diseases, smoking):
+    """Generate recommendations based on risks."""
+    if not diseases:
+        return "Maintain healthy lifestyle and regular check-ups."
+    
+    recommendations = []
+    
+    if "Cardiovascular Disease" in diseases:
+        recommendations.append("Consult a cardiologist immediately")
+        recommendations.append("Monitor blood pressure daily")
+        recommendations.append("Reduce salt and saturated fat intake")
+    
+    if "Diabetes" in diseases:
+        recommendations.append("Get blood glucose testing")
+        recommendations.append("Monitor dietary intake")
+        recommendations.append("Increase physical activity")
+    
+    if "Stroke Risk" in diseases:
+        recommendations.append("Emergency medical evaluation recommended")
+        recommendations.append("Take aspirin if recommended by doctor")
+    
+    if smoking:
+        recommendations.append("Quit smoking immediately")
+    
+    return recommendations
+
+
+def _copy_result(result):
+    """Copy a prediction result so callers can't mutate a cached entry."""
+    copied = dict(result)
+    copied['risk_scores'] = dict(result['risk_scores'])
+    copied['high_risk_diseases'] = list(result['high_risk_diseases'])
+    if isinstance(result['recommendation'], list):
+        copied['recommendation'] = list(result['recommendation'])
+    return copied
\ No newline at end of file
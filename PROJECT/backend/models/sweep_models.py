@@ -0,0 +1,236 @@
+"""
+Hyperparameter sweep that weighs accuracy against serving cost.
+
+Fits every combination of forest size, depth and max_features in a
+process pool, then measures each candidate one at a time on an otherwise
+idle process: test accuracy, model file size, load time, single-row
+latency (sklearn and the compiled evaluator) and batch latency. The
+smallest model whose accuracy is within --tolerance of the best is saved
+as disease_model.pkl, alongside a JSON report of every candidate.
+
+Usage:
+    python models/sweep_models.py --data exports.csv [--output-dir models]
+        [--n-estimators 25 50 100 200] [--max-depth 8 12 15 none]
+        [--max-features sqrt 0.5] [--tolerance 0.005] [--workers 4]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.compiled_forest import CompiledForest
+from models.create_models import sample_training_data, write_training_csv
+from models.model_format import export_model
+
+# Training data for pool workers, set once per process by _init_worker
+_worker_data = {}
+
+def parse_optional(value, cast):
+    """Parse a CLI grid value, where 'none' means None (no limit)."""
+    return None if value.lower() == 'none' else cast(value)
+
+def parse_max_features(value):
+    if value.lower() == 'none':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+def _init_worker(X_train, y_train, X_test, y_test):
+    _worker_data.update(X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test)
+
+def _fit_candidate(params, model_path, seed):
+    """Fit and save one candidate in a pool worker."""
+    start = time.perf_counter()
+    model = RandomForestClassifier(**params, random_state=seed, n_jobs=1)
+    model.fit(_worker_data['X_train'], _worker_data['y_train'])
+    fit_seconds = time.perf_counter() - start
+    accuracy = model.score(_worker_data['X_test'], _worker_data['y_test'])
+
+    # Saved with the same threading as RiskPredictor.train_model serves with
+    model.n_jobs = -1
+    joblib.dump(model, model_path)
+    return {
+        "params": params,
+        "model_path": str(model_path),
+        "accuracy": accuracy,
+        "fit_seconds": fit_seconds,
+        "model_bytes": os.path.getsize(model_path),
+        "total_nodes": int(sum(tree.tree_.node_count for tree in model.estimators_)),
+    }
+
+def _latency_us(func, rows, repeats):
+    """Return (p50, p99) latency of func over single rows, in microseconds."""
+    samples = []
+    for index in range(repeats):
+        row = rows[index % len(rows)][None, :]
+        start = time.perf_counter()
+        func(row)
+        samples.append(time.perf_counter() - start)
+    values = np.asarray(samples) * 1e6
+    return float(np.percentile(values, 50)), float(np.percentile(values, 99))
+
+def measure_candidate(model_path, X_test_scaled, repeats=200, batch_size=1000):
+    """Load time and inference latency of a saved candidate."""
+    start = time.perf_counter()
+    model = joblib.load(model_path)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    rows = X_test_scaled[:max(batch_size, 1)]
+    model.predict_proba(rows[:1])  # warm up
+    single_p50, single_p99 = _latency_us(model.predict_proba, rows, repeats)
+    compiled = CompiledForest.from_sklearn(model)
+    compiled_p50, compiled_p99 = _latency_us(compiled.predict_proba, rows, repeats)
+
+    batch_samples = []
+    for _ in range(5):
+        start = time.perf_counter()
+        model.predict_proba(rows)
+        batch_samples.append(time.perf_counter() - start)
+
+    return {
+        "load_ms": load_ms,
+        "single_row_p50_us": single_p50,
+        "single_row_p99_us": single_p99,
+        "compiled_single_row_p50_us": compiled_p50,
+        "compiled_single_row_p99_us": compiled_p99,
+        "batch_rows": len(rows),
+        "batch_ms": float(np.median(batch_samples)) * 1000,
+    }
+
+def select_candidate(candidates, tolerance):
+    """
+    Smallest candidate whose accuracy is within tolerance of the best.
+
+    Ties on file size go to the lower single-row latency.
+    """
+    best_accuracy = max(candidate['accuracy'] for candidate in candidates)
+    eligible = [
+        candidate for candidate in candidates
+        if candidate['accuracy'] >= best_accuracy - tolerance
+    ]
+    return min(eligible, key=lambda candidate: (
+        candidate['model_bytes'], candidate.get('single_row_p50_us', 0)
+    ))
+
+def run_sweep(data, output_dir, grid, tolerance=0.005, workers=None, seed=42,
+              repeats=200, batch_size=1000):
+    """
+    Sweep the grid and save the selected model and scaler into output_dir.
+
+    Args:
+        data: dict from create_models.sample_training_data
+        grid: dict of RandomForestClassifier parameter name -> values
+
+    Returns:
+        report dict with every candidate and the selected one
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    scaler = data['scaler']
+    X_train = scaler.transform(data['X_train'])
+    X_test = scaler.transform(data['X_test'])
+    if len(X_test) == 0:
+        raise ValueError("The sweep needs held-out rows to score candidates")
+
+    names = list(grid)
+    param_sets = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+    with tempfile.TemporaryDirectory() as scratch:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(X_train, data['y_train'], X_test, data['y_test'])
+        ) as pool:
+            futures = [
+                pool.submit(_fit_candidate, params, Path(scratch) / f'candidate_{index}.pkl', seed)
+                for index, params in enumerate(param_sets)
+            ]
+            candidates = [future.result() for future in futures]
+
+        # Latency is measured after the pool has exited, one candidate at
+        # a time, so fits running in parallel don't skew the figures
+        for candidate in candidates:
+            candidate.update(measure_candidate(
+                candidate['model_path'], X_test, repeats, batch_size
+            ))
+
+        selected = select_candidate(candidates, tolerance)
+        shutil.copyfile(selected['model_path'], output_dir / 'disease_model.pkl')
+        joblib.dump(scaler, output_dir / 'scaler.pkl')
+        export_model(output_dir / 'disease_model.rfm',
+                     joblib.load(selected['model_path']), scaler)
+
+    for candidate in candidates:
+        del candidate['model_path']
+    report = {
+        "tolerance": tolerance,
+        "best_accuracy": max(candidate['accuracy'] for candidate in candidates),
+        "selected": selected,
+        "candidates": candidates,
+    }
+    with open(output_dir / 'sweep_report.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def print_report(report):
+    header = (f"{'n_estimators':>12} {'max_depth':>9} {'max_features':>12} {'accuracy':>8} "
+              f"{'size KB':>9} {'load ms':>8} {'1-row us':>9} {'compiled us':>11} {'batch ms':>9}")
+    print(header)
+    for candidate in sorted(report['candidates'], key=lambda c: c['model_bytes']):
+        params = candidate['params']
+        marker = '  <- selected' if candidate is report['selected'] else ''
+        print(f"{params['n_estimators']:>12} {str(params['max_depth']):>9} "
+              f"{str(params['max_features']):>12} {candidate['accuracy']:8.4f} "
+              f"{candidate['model_bytes'] / 1024:9.0f} {candidate['load_ms']:8.1f} "
+              f"{candidate['single_row_p50_us']:9.0f} {candidate['compiled_single_row_p50_us']:11.0f} "
+              f"{candidate['batch_ms']:9.1f}{marker}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', help='CSV or Parquet training export (synthetic if omitted)')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--sample-size', type=int, default=100000)
+    parser.add_argument('--test-size', type=int, default=20000)
+    parser.add_argument('--n-estimators', type=int, nargs='+', default=[25, 50, 100, 200])
+    parser.add_argument('--max-depth', nargs='+', default=['8', '12', '15', 'none'])
+    parser.add_argument('--max-features', nargs='+', default=['sqrt', '0.5'])
+    parser.add_argument('--tolerance', type=float, default=0.005,
+                        help='accuracy the selected model may give up versus the best')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output-dir', default=Path(__file__).parent)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        data_path = args.data
+        if not data_path:
+            data_path = Path(scratch) / 'training_data.csv'
+            write_training_csv(data_path, 20000, args.chunk_size)
+        data = sample_training_data(data_path, args.chunk_size, args.sample_size, args.test_size)
+
+    grid = {
+        'n_estimators': args.n_estimators,
+        'max_depth': [parse_optional(value, int) for value in args.max_depth],
+        'max_features': [parse_max_features(value) for value in args.max_features],
+    }
+    report = run_sweep(data, args.output_dir, grid, args.tolerance, args.workers)
+    print_report(report)
+    print(f"\n✓ Selected model saved to {args.output_dir} "
+          f"(best accuracy {report['best_accuracy']:.4f}, tolerance {args.tolerance})")
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +0,0 @@
-from .logger import setup_logger
-
-__all__ = ['setup_logger']
\ No newline at end of file
@@ -0,0 +1,71 @@
+from flask import Blueprint, request, jsonify
+from config import Config
+from models.model_registry import get_model_registry
+from utils.auth import admin_authorized
+from utils.logger import setup_logger
+
+bp = Blueprint('admin', __name__, url_prefix='/api/admin')
+logger = setup_logger(__name__)
+
+def _version_manager():
+    if not Config.MODEL_DIR:
+        return None
+    return get_model_registry().versions(Config.MODEL_DIR)
+
+@bp.route('/models', methods=['GET'])
+def list_model_versions():
+    """List available model versions and the active one."""
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    
+    manager = _version_manager()
+    if manager is None:
+        return jsonify({"error": "Versioned model directory not configured"}), 404
+    
+    return jsonify({
+        "active_version": manager.active_version,
+        "target_version": manager.target_version(),
+        "versions": manager.list_versions()
+    }), 200
+
+@bp.route('/models/swap', methods=['POST'])
+def swap_model_version():
+    """
+    Warm a model version and swap it in without dropping requests.
+    
+    Request body:
+    {
+        "version": "2026-10-01",
+        "wait": false
+    }
+    
+    By default the swap runs in the background and 202 is returned;
+    with "wait": true the response is sent once the version is active.
+    """
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    
+    manager = _version_manager()
+    if manager is None:
+        return jsonify({"error": "Versioned model directory not configured"}), 404
+    
+    try:
+        data = request.get_json() or {}
+        version = data.get('version')
+        if not version:
+            return jsonify({"error": "Missing version"}), 400
+        
+        if data.get('wait'):
+            manager.swap(version)
+            logger.info(f"Model swapped to version {version}")
+            return jsonify({"status": "active", "active_version": manager.active_version}), 200
+        
+        manager.swap_async(version)
+        logger.info(f"Model swap to version {version} started")
+        return jsonify({"status": "swapping", "version": version}), 202
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error swapping model: {str(e)}")
+        return jsonify({"error": "Model swap failed"}), 500
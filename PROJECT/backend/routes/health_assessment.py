@@ -1,4 +1,8 @@
-from flask import Blueprint, request, jsonify
+import json
+from datetime import datetime
+from itertools import islice
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from config import Config
 from services.prediction_service import PredictionService
 from utils.data_validator import validate_health_data
 from utils.logger import setup_logger
@@ -47,16 +51,165 @@ def assess_health():
         logger.error(f"Error in health assessment: {str(e)}")
         return jsonify({"error": "Assessment failed"}), 500
 
+@bp.route('/assess/batch', methods=['POST'])
+def assess_health_batch():
+    """
+    Assess health risk for many patients in one request.
+    
+    Request body:
+    {
+        "assessments": [
+            {"age": 45, "heart_rate": 78, "blood_pressure_systolic": 125, ...},
+            {"age": 62, "heart_rate": 91, "blood_pressure_systolic": 148, ...}
+        ]
+    }
+    """
+    try:
+        data = request.get_json()
+        assessments = data.get('assessments') if isinstance(data, dict) else None
+        
+        if not isinstance(assessments, list) or not assessments:
+            return jsonify({
+                "error": "Invalid data",
+                "details": ["assessments must be a non-empty list"]
+            }), 400
+        
+        if len(assessments) > Config.MAX_BATCH_SIZE:
+            return jsonify({
+                "error": "Invalid data",
+                "details": [f"Batch size must not exceed {Config.MAX_BATCH_SIZE}"]
+            }), 400
+        
+        # Validate every entry up front so a bad row doesn't waste a model call
+        errors = {}
+        for index, health_data in enumerate(assessments):
+            if not isinstance(health_data, dict):
+                errors[index] = ["Assessment must be an object"]
+                continue
+            is_valid, item_errors = validate_health_data(health_data)
+            if not is_valid:
+                errors[index] = item_errors
+        
+        if errors:
+            logger.warning(f"Invalid batch health data in {len(errors)} entries")
+            return jsonify({"error": "Invalid data", "details": errors}), 400
+        
+        results = prediction_service.assess_risk_batch(assessments)
+        
+        logger.info(f"Batch health assessment completed - {len(results)} patients")
+        return jsonify({"results": results, "count": len(results)}), 200
+        
+    except Exception as e:
+        logger.error(f"Error in batch health assessment: {str(e)}")
+        return jsonify({"error": "Assessment failed"}), 500
+
+@bp.route('/assess/risk-level', methods=['POST'])
+def assess_risk_level():
+    """
+    Triage: overall risk level only, with early-exit tree evaluation.
+    
+    Takes the same body as /assess. The result isn't stored in history.
+    """
+    try:
+        data = request.get_json()
+        
+        is_valid, errors = validate_health_data(data)
+        if not is_valid:
+            logger.warning(f"Invalid health data: {errors}")
+            return jsonify({"error": "Invalid data", "details": errors}), 400
+        
+        return jsonify(prediction_service.assess_risk_level(data)), 200
+        
+    except Exception as e:
+        logger.error(f"Error in risk level assessment: {str(e)}")
+        return jsonify({"error": "Assessment failed"}), 500
+
+def _parse_cursor(value):
+    """A history cursor: epoch seconds or an ISO 8601 timestamp."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def _ndjson(rows):
+    for cursor, assessment in rows:
+        yield json.dumps({"cursor": cursor, "assessment": assessment}) + '\n'
+
 @bp.route('/history/<user_id>', methods=['GET'])
 def get_assessment_history(user_id):
-    """Get historical assessments for a user."""
+    """
+    Get historical assessments for a user, oldest first.
+    
+    Query parameters:
+        limit: page size, 1 to HISTORY_MAX_PAGE_SIZE (default
+            HISTORY_PAGE_SIZE); when streaming, at least 1 and caps the
+            number of assessments streamed
+        before / after: cursor (epoch seconds) or ISO timestamp; returns
+            the latest assessments before it or the earliest after it
+        format: "ndjson" streams every matching assessment instead
+    """
     try:
-        history = prediction_service.get_user_history(user_id)
-        return jsonify({"assessments": history}), 200
+        before = _parse_cursor(request.args.get('before'))
+        after = _parse_cursor(request.args.get('after'))
+    except ValueError:
+        return jsonify({"error": "before and after must be epoch seconds or ISO timestamps"}), 400
+    
+    streaming = (request.args.get('format') == 'ndjson'
+                 or request.accept_mimetypes.best == 'application/x-ndjson')
+    limit = request.args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if streaming and limit < 1:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+        if not streaming and not 1 <= limit <= Config.HISTORY_MAX_PAGE_SIZE:
+            return jsonify({"error": f"limit must be between 1 and {Config.HISTORY_MAX_PAGE_SIZE}"}), 400
+    
+    try:
+        if streaming:
+            rows = prediction_service.iter_user_history(user_id, before, after)
+            if limit is not None:
+                rows = islice(rows, limit)
+            return Response(stream_with_context(_ndjson(rows)), mimetype='application/x-ndjson')
+        
+        page = prediction_service.get_history_page(
+            user_id, Config.HISTORY_PAGE_SIZE if limit is None else limit, before, after
+        )
+        return jsonify(page), 200
     except Exception as e:
         logger.error(f"Error fetching history: {str(e)}")
         return jsonify({"error": "Failed to fetch history"}), 500
 
+@bp.route('/trends/<user_id>', methods=['GET'])
+def get_assessment_trends(user_id):
+    """
+    Get longitudinal trends for a user.
+    
+    Query parameters:
+        window: days to aggregate over (default TREND_WINDOW_DAYS)
+    """
+    window = request.args.get('window', Config.TREND_WINDOW_DAYS, type=int)
+    try:
+        return jsonify(prediction_service.get_trends(user_id, window)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error fetching trends: {str(e)}")
+        return jsonify({"error": "Failed to fetch trends"}), 500
+
+@bp.route('/metrics', methods=['GET'])
+def get_inference_metrics():
+    """Get inference metrics (backend, micro-batching statistics)."""
+    try:
+        return jsonify(prediction_service.get_inference_metrics()), 200
+    except Exception as e:
+        logger.error(f"Error fetching metrics: {str(e)}")
+        return jsonify({"error": "Failed to fetch metrics"}), 500
+
 @bp.route('/validate', methods=['POST'])
 def validate_inputs():
     """Validate health data without storing."""
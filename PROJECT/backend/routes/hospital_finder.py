@@ -1,5 +1,9 @@
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from config import Config
 from services.geolocation_service import GeoLocationService
+from services.spatial_index import valid_coordinates
+from utils.auth import admin_authorized
 from utils.logger import setup_logger
 
 bp = Blueprint('hospitals', __name__, url_prefix='/api/hospitals')
@@ -18,8 +22,12 @@ def find_nearby_hospitals():
         "longitude": -74.0060,
         "radius_km": 10,
         "specialty": "cardiology",
-        "urgency": "high"
+        "urgency": "high",
+        "ranking": "distance"
     }
+    
+    ranking "travel_time" orders the nearest hospitals by estimated road
+    travel time (needs ROAD_GRAPH_PATH) and adds travel_time_min to each.
     """
     try:
         data = request.get_json()
@@ -30,13 +38,15 @@ def find_nearby_hospitals():
         radius = data.get('radius_km', 15)
         specialty = data.get('specialty', None)
         urgency = data.get('urgency', 'medium')
+        ranking = data.get('ranking', 'distance')
         
         hospitals = geo_service.find_hospitals(
             latitude=data['latitude'],
             longitude=data['longitude'],
             radius_km=radius,
             specialty=specialty,
-            urgency=urgency
+            urgency=urgency,
+            ranking=ranking
         )
         
         logger.info(f"Found {len(hospitals)} hospitals for location")
@@ -49,10 +59,149 @@ def find_nearby_hospitals():
             }
         }), 200
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error finding hospitals: {str(e)}")
         return jsonify({"error": "Failed to find hospitals"}), 500
 
+def _origin_coordinates(origin):
+    """(latitude, longitude) from {"latitude", "longitude"} or a [lat, lon] pair."""
+    if isinstance(origin, dict):
+        return origin.get('latitude'), origin.get('longitude')
+    if isinstance(origin, (list, tuple)) and len(origin) == 2:
+        return origin[0], origin[1]
+    return None, None
+
+@bp.route('/nearest/batch', methods=['POST'])
+def find_nearest_batch():
+    """
+    Nearest hospitals for many origins, streamed as NDJSON.
+    
+    Request body:
+    {
+        "origins": [{"latitude": 40.7128, "longitude": -74.0060}, [40.73, -73.99]],
+        "count": 5,
+        "specialty": "Emergency"
+    }
+    
+    Each response line is {"index": i, "hospitals": [...]}, in origin order.
+    """
+    try:
+        data = request.get_json()
+        origins = data.get('origins') if isinstance(data, dict) else None
+        
+        if not isinstance(origins, list) or not origins:
+            return jsonify({
+                "error": "Invalid data",
+                "details": ["origins must be a non-empty list"]
+            }), 400
+        
+        if len(origins) > Config.MAX_NEAREST_BATCH_SIZE:
+            return jsonify({
+                "error": "Invalid data",
+                "details": [f"Batch size must not exceed {Config.MAX_NEAREST_BATCH_SIZE}"]
+            }), 400
+        
+        count = data.get('count', 5)
+        if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= 100:
+            return jsonify({
+                "error": "Invalid data",
+                "details": ["count must be an integer between 1 and 100"]
+            }), 400
+        
+        specialty = data.get('specialty', 'Emergency')
+        if specialty is not None and not isinstance(specialty, str):
+            return jsonify({
+                "error": "Invalid data",
+                "details": ["specialty must be a string or null"]
+            }), 400
+        
+        # Validate every origin up front, before any results are streamed
+        latitudes, longitudes, errors = [], [], {}
+        for index, origin in enumerate(origins):
+            latitude, longitude = _origin_coordinates(origin)
+            if not valid_coordinates(latitude, longitude):
+                errors[index] = ["Invalid coordinates"]
+                continue
+            latitudes.append(float(latitude))
+            longitudes.append(float(longitude))
+        
+        if errors:
+            logger.warning(f"Invalid coordinates in {len(errors)} batch origins")
+            return jsonify({"error": "Invalid data", "details": errors}), 400
+        
+        # Resolves the specialty index now, before the response starts
+        results = geo_service.find_nearest_batch(
+            latitudes, longitudes, count=count, specialty=specialty
+        )
+        
+        def lines():
+            for index, hospitals in enumerate(results):
+                yield json.dumps({"index": index, "hospitals": hospitals}) + '\n'
+            logger.info(f"Nearest-hospital batch completed - {len(origins)} origins")
+        
+        return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+        
+    except Exception as e:
+        logger.error(f"Error in nearest-hospital batch: {str(e)}")
+        return jsonify({"error": "Batch search failed"}), 500
+
+@bp.route('/metrics', methods=['GET'])
+def get_hospital_metrics():
+    """Get hospital search metrics (dataset size, geo query cache, road graph)."""
+    return jsonify({
+        "hospitals": len(geo_service.hospital_table),
+        "cache": geo_service.get_cache_stats(),
+        "road_graph": (geo_service.road_graph.get_stats()
+                       if geo_service.road_graph is not None else None)
+    }), 200
+
+@bp.route('/availability', methods=['POST'])
+def update_hospital_availability():
+    """
+    Apply live bed and ICU availability from an internal feed.
+    
+    Request body:
+    {
+        "updates": [
+            {"id": 1, "beds_available": 12, "icu_beds_available": 0,
+             "updated_at": "2026-10-17T09:30:00"}
+        ]
+    }
+    
+    Needs the X-Admin-Token header. Updates are applied together; one
+    malformed update rejects the whole request.
+    """
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    
+    try:
+        data = request.get_json()
+        updates = data.get('updates') if isinstance(data, dict) else None
+        
+        if not isinstance(updates, list) or not updates:
+            return jsonify({
+                "error": "Invalid data",
+                "details": ["updates must be a non-empty list"]
+            }), 400
+        
+        if len(updates) > Config.MAX_AVAILABILITY_BATCH_SIZE:
+            return jsonify({
+                "error": "Invalid data",
+                "details": [f"Batch size must not exceed {Config.MAX_AVAILABILITY_BATCH_SIZE}"]
+            }), 400
+        
+        result = geo_service.update_availability(updates)
+        logger.info(f"Applied {result['applied']} availability updates")
+        return jsonify(result), 200
+        
+    except ValueError as e:
+        return jsonify({"error": "Invalid data", "details": [str(e)]}), 400
+    except Exception as e:
+        logger.error(f"Error updating availability: {str(e)}")
+        return jsonify({"error": "Availability update failed"}), 500
+
 @bp.route('/emergency', methods=['POST'])
 def get_emergency_hospitals():
     """Get nearest emergency hospitals."""
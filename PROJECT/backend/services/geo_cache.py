@@ -0,0 +1,144 @@
+import math
+import threading
+from collections import OrderedDict
+from services.spatial_index import haversine_km
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+DEFAULT_MAX_ROWS = 1000000
+
+def geohash_cell(latitude, longitude, precision):
+    """
+    The geohash cell holding a point.
+    
+    Returns:
+        (geohash, center latitude, center longitude, radius_km), where
+        radius_km is the farthest distance from the center to a corner
+    """
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    value = bits = 0
+    even = True
+    while len(chars) < precision:
+        bounds, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (bounds[0] + bounds[1]) / 2
+        if coordinate >= middle:
+            value = value * 2 + 1
+            bounds[0] = middle
+        else:
+            value *= 2
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            value = bits = 0
+    
+    center_lat = (lat_range[0] + lat_range[1]) / 2
+    center_lon = (lon_range[0] + lon_range[1]) / 2
+    corners = [(lat, lon) for lat in lat_range for lon in lon_range]
+    radius = float(haversine_km(center_lat, center_lon, [lat for lat, _ in corners],
+                                [lon for _, lon in corners]).max())
+    return ''.join(chars), center_lat, center_lon, radius
+
+def radius_bucket(radius_km):
+    """
+    radius_km rounded up to two significant figures (at most 10% more),
+    so nearby radii share cache entries and each decade has at most 90.
+    """
+    if radius_km <= 0:
+        return 0.0
+    step = 10.0 ** (math.floor(math.log10(radius_km)) - 1)
+    # Rounding first keeps float noise (1.5 / 0.1 > 15) from adding a step
+    bucket = round(math.ceil(round(radius_km / step, 9)) * step, 12)
+    return bucket if bucket >= radius_km else round(bucket + step, 12)
+
+
+class GeoQueryCache:
+    """
+    Thread-safe bounded LRU cache of hospital candidates per location cell.
+    
+    Keys are (geohash cell, radius bucket, specialty). A value is the set
+    of hospital rows that any point in the cell could match: everything
+    within the bucket's radius plus the cell's own radius of the cell
+    center. Callers
+    still compute exact distances from their own point, so clustered
+    traffic shares one spatial index query per cell without getting
+    anyone else's results. Entries remember the dataset they came from
+    (any object standing for the hospitals' positions) and are ignored
+    once another dataset is loaded.
+    
+    The cache holds at most max_size entries and max_rows candidate rows
+    in total; a candidate set over max_entry_rows (a hundredth of
+    max_rows by default) isn't cached at all, since a wide search would
+    otherwise evict many cells for one entry.
+    """
+    
+    def __init__(self, max_size=10000, precision=6, max_rows=DEFAULT_MAX_ROWS, max_entry_rows=None):
+        self.max_size = max_size
+        self.precision = precision
+        self.max_rows = max_rows
+        self.max_entry_rows = max_rows // 100 if max_entry_rows is None else max_entry_rows
+        self._entries = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.skipped = 0
+    
+    def get(self, key, dataset):
+        """Cached candidate rows for key from dataset, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not dataset:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, dataset, rows):
+        """Store candidate rows, evicting the least recently used entries."""
+        with self._lock:
+            if len(rows) > self.max_entry_rows:
+                self.skipped += 1
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._rows -= len(old[1])
+            self._entries[key] = (dataset, rows)
+            self._rows += len(rows)
+            while len(self._entries) > self.max_size or self._rows > self.max_rows:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._rows -= len(evicted)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop every entry (the hospital dataset changed)."""
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+            self.invalidations += 1
+    
+    def get_stats(self):
+        """Hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "rows": self._rows,
+                "max_rows": self.max_rows,
+                "precision": self.precision,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "skipped": self.skipped,
+                "invalidations": self.invalidations,
+            }
+    
+    def __len__(self):
+        return len(self._entries)
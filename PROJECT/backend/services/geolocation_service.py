@@ -1,104 +1,456 @@
-from geopy.distance import geodesic
-from haversine import haversine, Unit
+import os
+import threading
+import time
+from pathlib import Path
+import numpy as np
+from config import Config
+from services.geo_cache import GeoQueryCache, geohash_cell, radius_bucket
+from services.hospital_data import (HospitalTable, availability_update,
+                                    load_availability_updates, load_hospitals)
+from services.road_graph import RoadGraph, load_road_graph
+from services.spatial_index import SpatialIndex, haversine_km, valid_coordinates
 from utils.logger import setup_logger
-import requests
 
 logger = setup_logger(__name__)
 
+# Sample hospital database - in production set HOSPITALS_PATH
+SAMPLE_HOSPITALS = [
+    {
+        "id": 1,
+        "name": "Central Medical Hospital",
+        "latitude": 40.7128,
+        "longitude": -74.0060,
+        "address": "123 Main St, New York, NY",
+        "phone": "+1-212-555-1234",
+        "specialties": ["Cardiology", "Neurology", "Emergency"],
+        "has_icu": True,
+        "rating": 4.8,
+        "distance": None,
+        "availability": {"beds": None, "icu_beds": None,
+                         "updated_at": None, "received_at": None}
+    },
+    {
+        "id": 2,
+        "name": "City Health Center",
+        "latitude": 40.7185,
+        "longitude": -74.0060,
+        "address": "456 Park Ave, New York, NY",
+        "phone": "+1-212-555-5678",
+        "specialties": ["General Practice", "Cardiology"],
+        "has_icu": False,
+        "rating": 4.5,
+        "distance": None,
+        "availability": {"beds": None, "icu_beds": None,
+                         "updated_at": None, "received_at": None}
+    },
+    {
+        "id": 3,
+        "name": "Emergency Care Clinic",
+        "latitude": 40.7050,
+        "longitude": -74.0080,
+        "address": "789 Broadway, New York, NY",
+        "phone": "+1-212-555-9999",
+        "specialties": ["Emergency", "Trauma", "Cardiology"],
+        "has_icu": True,
+        "rating": 4.6,
+        "distance": None,
+        "availability": {"beds": None, "icu_beds": None,
+                         "updated_at": None, "received_at": None}
+    }
+]
+
+# Hospitals returned by find_hospitals
+MAX_RESULTS = 10
+RANKINGS = ('distance', 'travel_time')
+
+def _top(primary, secondary, count):
+    """
+    Positions of the count smallest (primary, secondary) pairs, in order.
+    
+    argpartition finds the count-th primary value; only rows up to it
+    (ties included) are fully sorted.
+    """
+    if len(primary) > count:
+        kth = primary[np.argpartition(primary, count - 1)[count - 1]]
+        candidates = np.flatnonzero(primary <= kth)
+    else:
+        candidates = np.arange(len(primary))
+    order = np.lexsort((secondary[candidates], primary[candidates]))
+    return candidates[order[:count]]
+
+
+class HospitalSnapshot:
+    """
+    One immutable version of the hospital data: a HospitalTable and the
+    spatial indexes over its coordinates.
+    
+    Queries read GeoLocationService.snapshot once and use only that
+    object, so they never see part of an update and never take a lock.
+    An availability update wraps a new table in a new snapshot that
+    shares this one's indexes (no hospital moved); loading a dataset
+    starts afresh. Indexes are built on first use without a lock: two
+    queries racing to build the same one both get a correct index, and
+    the first one published is kept.
+    """
+    
+    __slots__ = ('table', 'indexes')
+    
+    def __init__(self, table, indexes=None):
+        self.table = table
+        # Spatial indexes by lowercased specialty (None: every hospital)
+        self.indexes = {} if indexes is None else indexes
+    
+    def with_table(self, table):
+        """A snapshot of table, whose rows are this snapshot's hospitals."""
+        return HospitalSnapshot(table, self.indexes)
+    
+    def indexed(self, specialty=None):
+        """
+        (rows, index): index covers the hospitals offering specialty (all
+        of them if None), and its positions map to table rows through
+        rows (None for all).
+        
+        Only specialties some hospital offers are cached, so queries for
+        arbitrary names can't grow the cache.
+        """
+        key = specialty.lower() if specialty else None
+        entry = self.indexes.get(key)
+        if entry is None:
+            table = self.table
+            if key is not None and key not in table.postings:
+                rows = np.empty(0, dtype=np.intp)
+                return rows, SpatialIndex(table.latitudes[rows], table.longitudes[rows])
+            rows = None if key is None else table.rows_with(key)
+            if rows is None:
+                index = SpatialIndex(table.latitudes, table.longitudes)
+            else:
+                index = SpatialIndex(table.latitudes[rows], table.longitudes[rows])
+            # setdefault is atomic, so racing builders agree on one entry
+            entry = self.indexes.setdefault(key, (rows, index))
+        return entry
+
+
 class GeoLocationService:
-    def __init__(self):
-        # Sample hospital database - in production use real API
-        self.hospitals = [
-            {
-                "id": 1,
-                "name": "Central Medical Hospital",
-                "latitude": 40.7128,
-                "longitude": -74.0060,
-                "address": "123 Main St, New York, NY",
-                "phone": "+1-212-555-1234",
-                "specialties": ["Cardiology", "Neurology", "Emergency"],
-                "has_icu": True,
-                "rating": 4.8,
-                "distance": None
-            },
-            {
-                "id": 2,
-                "name": "City Health Center",
-                "latitude": 40.7185,
-                "longitude": -74.0060,
-                "address": "456 Park Ave, New York, NY",
-                "phone": "+1-212-555-5678",
-                "specialties": ["General Practice", "Cardiology"],
-                "has_icu": False,
-                "rating": 4.5,
-                "distance": None
-            },
-            {
-                "id": 3,
-                "name": "Emergency Care Clinic",
-                "latitude": 40.7050,
-                "longitude": -74.0080,
-                "address": "789 Broadway, New York, NY",
-                "phone": "+1-212-555-9999",
-                "specialties": ["Emergency", "Trauma", "Cardiology"],
-                "has_icu": True,
-                "rating": 4.6,
-                "distance": None
-            }
-        ]
+    """
+    Hospital search by location.
+    
+    Hospitals are held as a columnar HospitalTable. Radius and nearest
+    queries go through a SpatialIndex built once per dataset (on the
+    first query, so importing the app stays cheap); candidates are
+    ranked as arrays, and response dicts are built only for the
+    hospitals returned. Specialty-filtered and emergency queries use an
+    index over just that specialty's hospitals (from the table's
+    posting lists), built the first time the specialty is asked for.
+    
+    Radius queries are cached per geohash cell (see GeoQueryCache), so
+    nearby callers reuse one index query and only measure distances.
+    
+    With a RoadGraph loaded, find_hospitals(ranking='travel_time') routes
+    the nearest candidates over the road network and ranks them by
+    estimated travel time instead.
+    
+    The data lives in an immutable HospitalSnapshot. Writers (dataset
+    loads and live availability updates) build a new one and swap it in
+    with a single assignment; queries never lock.
+    """
+    
+    def __init__(self, hospitals=None, cache_size=None, cache_precision=None,
+                 road_graph=None):
+        self._write_lock = threading.Lock()
+        self._feed = None
+        self._stop_feed = threading.Event()
+        cache_size = Config.GEO_CACHE_SIZE if cache_size is None else cache_size
+        self.cache = GeoQueryCache(
+            cache_size, cache_precision or Config.GEO_CACHE_PRECISION, Config.GEO_CACHE_MAX_ROWS
+        ) if cache_size > 0 else None
+        if hospitals is None:
+            hospitals = Config.HOSPITALS_PATH or SAMPLE_HOSPITALS
+        self.load_hospitals(hospitals)
+        self.road_graph = None
+        road_graph = Config.ROAD_GRAPH_PATH if road_graph is None else road_graph
+        if road_graph:
+            self.load_road_graph(road_graph)
+        if Config.AVAILABILITY_FEED_PATH:
+            self.start_availability_feed(Config.AVAILABILITY_FEED_PATH,
+                                         Config.AVAILABILITY_POLL_INTERVAL)
+    
+    @property
+    def snapshot(self):
+        """The current HospitalSnapshot."""
+        return self._snapshot
+    
+    @property
+    def hospital_table(self):
+        """The current HospitalTable."""
+        return self._snapshot.table
+    
+    @property
+    def hospitals(self):
+        """Every hospital as a dict (builds them all; for small datasets)."""
+        return self._snapshot.table.records()
+    
+    def load_hospitals(self, hospitals):
+        """
+        Replace the hospital dataset with a HospitalTable, a file path
+        (CSV, Parquet or JSON) or hospital dicts. Indexes are rebuilt on
+        the next query.
+        """
+        if isinstance(hospitals, HospitalTable):
+            table = hospitals
+        elif isinstance(hospitals, (str, Path)):
+            table = load_hospitals(hospitals)
+        else:
+            table = HospitalTable.from_records(hospitals)
+        with self._write_lock:
+            self._snapshot = HospitalSnapshot(table)
+        if self.cache is not None:
+            self.cache.clear()
+        logger.info(f"Loaded {len(table)} hospitals")
+    
+    def update_availability(self, updates):
+        """
+        Apply live bed and ICU availability reports (dicts with "id" and
+        any of "beds_available", "icu_beds_available" and "updated_at";
+        see hospital_data.availability_update) as one new snapshot.
+        
+        Every report is validated before anything changes. Reports for
+        unknown hospitals are skipped, as are reports whose updated_at is
+        older than the last one applied to their hospital. updated_at is
+        the source's clock and is only compared with other source times;
+        a report without one is taken as current, and the time it was
+        applied here is kept separately (received_at). Queries see all of
+        a call's reports or none.
+        
+        Returns:
+            {"applied": n, "stale": n, "unknown_ids": [...]}
+        
+        Raises:
+            ValueError: if a report is malformed (nothing is applied)
+        """
+        reports = [availability_update(update) for update in updates]
+        now = time.time()
+        with self._write_lock:
+            snapshot = self._snapshot
+            table = snapshot.table
+            latest = {}
+            stale, unknown_ids = 0, []
+            for hospital_id, beds, icu_beds, updated in reports:
+                row = table.row_of_id.get(hospital_id)
+                if row is None:
+                    unknown_ids.append(hospital_id)
+                    continue
+                previous = latest.get(row)
+                last = table.availability_updated[row]
+                if previous is not None and previous[2] is not None:
+                    last = previous[2]
+                # NaN (never timed) compares false, so the report applies
+                if updated is not None and updated < last:
+                    stale += 1
+                    continue
+                if previous is not None:
+                    beds = previous[0] if beds is None else beds
+                    icu_beds = previous[1] if icu_beds is None else icu_beds
+                    updated = previous[2] if updated is None else updated
+                latest[row] = (beds, icu_beds, updated)
+            if latest:
+                self._snapshot = snapshot.with_table(
+                    table.with_availability(list(latest), *zip(*latest.values()), now)
+                )
+        return {
+            "applied": len(reports) - stale - len(unknown_ids),
+            "stale": stale,
+            "unknown_ids": unknown_ids,
+        }
+    
+    def start_availability_feed(self, path, interval):
+        """
+        Poll an availability feed file (see load_availability_updates)
+        every interval seconds and apply it whenever it changes.
+        """
+        if self._feed is not None and self._feed.is_alive():
+            return
+        self._stop_feed.clear()
+        self._feed = threading.Thread(
+            target=self._watch_feed, args=(Path(path), interval),
+            name='availability-feed', daemon=True
+        )
+        self._feed.start()
+    
+    def stop_availability_feed(self):
+        self._stop_feed.set()
+    
+    def _watch_feed(self, path, interval):
+        applied_version = None
+        while True:
+            try:
+                stat = os.stat(path)
+                version = (stat.st_mtime_ns, stat.st_size)
+                if version != applied_version:
+                    applied_version = version
+                    result = self.update_availability(load_availability_updates(path))
+                    logger.info(f"Applied {result['applied']} availability updates from {path}")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Availability feed update failed: {str(e)}")
+            if self._stop_feed.wait(interval):
+                return
+    
+    def load_road_graph(self, road_graph):
+        """
+        Use a RoadGraph, or an edge list file (see load_road_graph), for
+        travel-time ranking. Landmarks are precomputed here, not per query.
+        """
+        if not isinstance(road_graph, RoadGraph):
+            road_graph = load_road_graph(road_graph, landmarks=Config.ROAD_GRAPH_LANDMARKS)
+        self.road_graph = road_graph
+        logger.info(f"Loaded road graph with {len(road_graph)} nodes "
+                    f"and {road_graph.edge_count} edges")
     
     def find_hospitals(self, latitude, longitude, radius_km=15, 
-                       specialty=None, urgency='medium'):
-        """Find hospitals within radius."""
-        user_location = (latitude, longitude)
-        nearby = []
+                       specialty=None, urgency='medium', ranking='distance'):
+        """
+        Find hospitals within radius.
         
-        for hospital in self.hospitals:
-            hospital_location = (hospital['latitude'], hospital['longitude'])
-            distance = haversine(user_location, hospital_location, unit=Unit.KILOMETERS)
-            
-            if distance <= radius_km:
-                hospital_copy = hospital.copy()
-                hospital_copy['distance'] = round(distance, 2)
-                
-                # Filter by specialty if provided
-                if specialty:
-                    if specialty.lower() in [s.lower() for s in hospital['specialties']]:
-                        nearby.append(hospital_copy)
-                else:
-                    nearby.append(hospital_copy)
+        ranking='travel_time' needs a road graph; results then carry
+        travel_time_min (None where the latency budget ran out).
         
-        # Sort by distance and rating
-        nearby.sort(key=lambda x: (x['distance'], -x['rating']))
+        Raises:
+            ValueError: for an unknown ranking, or travel_time without a
+                road graph
+        """
+        if ranking not in RANKINGS:
+            raise ValueError(f"ranking must be one of {', '.join(RANKINGS)}")
+        if ranking == 'travel_time' and self.road_graph is None:
+            raise ValueError("Travel-time ranking needs a road graph (set ROAD_GRAPH_PATH)")
+        if not valid_coordinates(latitude, longitude):
+            logger.warning(f"Invalid coordinates: {latitude}, {longitude}")
+            return []
+        latitude, longitude = float(latitude), float(longitude)
+        snapshot = self._snapshot
+        table = snapshot.table
+        rows, distances = self._within(snapshot, latitude, longitude, radius_km, specialty)
         
-        # For emergencies, prioritize hospitals with ICU
+        # Sort by distance and rating; for emergencies, hospitals with an
+        # ICU that has beds free (or unreported) come first
+        primary = np.round(distances, 2)
         if urgency == 'high':
-            nearby.sort(key=lambda x: (-x['has_icu'], x['distance']))
+            primary = primary + np.where(table.icu_ready(rows), 0.0, 1e5)
+        if ranking == 'travel_time':
+            return self._rank_by_travel_time(latitude, longitude, urgency, table,
+                                             rows, distances, primary)
+        top = _top(primary, -table.ratings[rows], MAX_RESULTS)
         
-        return nearby[:10]  # Return top 10
+        return [table.record(row, distance)
+                for row, distance in zip(rows[top].tolist(), distances[top].tolist())]
+    
+    def _rank_by_travel_time(self, latitude, longitude, urgency, table, rows, distances, primary):
+        """
+        Route the best TRAVEL_TIME_CANDIDATES by distance, nearest first,
+        within TRAVEL_TIME_BUDGET_MS, and rank them by travel time.
+        Hospitals the budget did not reach follow, by distance.
+        """
+        top = _top(primary, -table.ratings[rows], Config.TRAVEL_TIME_CANDIDATES)
+        rows, distances = rows[top], distances[top]
+        seconds = self.road_graph.travel_times(
+            latitude, longitude, table.latitudes[rows], table.longitudes[rows],
+            Config.TRAVEL_TIME_BUDGET_MS
+        )
+        estimated = ~np.isnan(seconds)
+        primary = np.where(estimated, np.round(seconds), 1e9 + distances)
+        if urgency == 'high':
+            primary = primary + np.where(table.icu_ready(rows), 0.0, 1e10)
+        order = np.lexsort((-table.ratings[rows], primary))[:MAX_RESULTS]
+        
+        hospitals = []
+        for position in order.tolist():
+            hospital = table.record(int(rows[position]), distances[position])
+            hospital["travel_time_min"] = (round(float(seconds[position]) / 60, 1)
+                                           if estimated[position] else None)
+            hospitals.append(hospital)
+        return hospitals
+    
+    def _within(self, snapshot, latitude, longitude, radius_km, specialty):
+        """(rows, distances_km) of the snapshot's hospitals within radius_km."""
+        # Only hospitals with the specialty, if given, are searched
+        subset, index = snapshot.indexed(specialty)
+        table = snapshot.table
+        if self.cache is None:
+            rows, distances = index.within(latitude, longitude, radius_km)
+            return (rows if subset is None else subset[rows]), distances
+        
+        cell, center_lat, center_lon, cell_radius = geohash_cell(
+            latitude, longitude, self.cache.precision
+        )
+        # Candidates for the bucket's (larger) radius are filtered below
+        bucket = radius_bucket(radius_km)
+        key = (cell, bucket, specialty.lower() if specialty else None)
+        # Candidates depend only on where hospitals are, so entries stay
+        # valid across availability updates (which share indexes)
+        candidates = self.cache.get(key, snapshot.indexes)
+        if candidates is None:
+            candidates, _ = index.within(center_lat, center_lon, bucket + cell_radius)
+            if subset is not None:
+                candidates = subset[candidates]
+            self.cache.put(key, snapshot.indexes, candidates)
+        
+        distances = haversine_km(latitude, longitude, table.latitudes[candidates],
+                                 table.longitudes[candidates])
+        keep = distances <= radius_km
+        return candidates[keep], distances[keep]
+    
+    def get_cache_stats(self):
+        """Geo query cache counters, or None if caching is disabled."""
+        return self.cache.get_stats() if self.cache is not None else None
     
     def find_emergency_hospitals(self, latitude, longitude, count=5):
         """Find nearest emergency hospitals."""
-        user_location = (latitude, longitude)
-        emergency_hospitals = []
+        if not valid_coordinates(latitude, longitude):
+            logger.warning(f"Invalid coordinates: {latitude}, {longitude}")
+            return []
+        snapshot = self._snapshot
+        table = snapshot.table
+        emergency, index = snapshot.indexed('Emergency')
+        positions, distances = index.nearest(float(latitude), float(longitude), count)
         
-        for hospital in self.hospitals:
-            if 'Emergency' in hospital['specialties']:
-                hospital_location = (hospital['latitude'], hospital['longitude'])
-                distance = haversine(user_location, hospital_location, unit=Unit.KILOMETERS)
-                
-                hospital_copy = hospital.copy()
-                hospital_copy['distance'] = round(distance, 2)
-                emergency_hospitals.append(hospital_copy)
+        return [table.record(row, distance)
+                for row, distance in zip(emergency[positions].tolist(), distances.tolist())]
+    
+    def find_nearest_batch(self, latitudes, longitudes, count=5, specialty='Emergency',
+                           chunk_size=10000):
+        """
+        Nearest hospitals with specialty for many origins.
         
-        # Sort by distance
-        emergency_hospitals.sort(key=lambda x: x['distance'])
+        Origins are answered chunk_size at a time with one spatial index
+        query per chunk, so memory stays bounded however many there are.
+        Coordinates must already be valid. The snapshot and the
+        specialty's index are resolved when this is called, so errors
+        surface here rather than partway through a streamed response,
+        and the whole batch is answered from that snapshot.
         
-        return emergency_hospitals[:count]
+        Returns:
+            iterator of the list of hospital dicts (nearest first) for each
+            origin, in order
+        """
+        snapshot = self._snapshot
+        subset, index = snapshot.indexed(specialty)
+        return self._nearest_chunks(snapshot.table, subset, index,
+                                    np.asarray(latitudes, dtype=np.float64),
+                                    np.asarray(longitudes, dtype=np.float64), count, chunk_size)
+    
+    @staticmethod
+    def _nearest_chunks(table, subset, index, latitudes, longitudes, count, chunk_size):
+        for start in range(0, len(latitudes), chunk_size):
+            positions, distances = index.nearest_many(
+                latitudes[start:start + chunk_size], longitudes[start:start + chunk_size], count
+            )
+            rows = positions if subset is None else subset[positions]
+            for origin_rows, origin_distances in zip(rows.tolist(), distances.tolist()):
+                yield [table.record(row, distance)
+                       for row, distance in zip(origin_rows, origin_distances)]
     
     def get_hospital_details(self, hospital_id):
         """Get detailed information about a hospital."""
-        for hospital in self.hospitals:
-            if hospital['id'] == hospital_id:
-                return hospital
-        return None
\ No newline at end of file
+        table = self._snapshot.table
+        row = table.row_of_id.get(hospital_id)
+        return table.record(row) if row is not None else None
\ No newline at end of file
@@ -0,0 +1,778 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import numpy as np
+from config import Config
+from services.trends import (
+    BUCKET_COLUMNS, TrendAggregates, TrendTotals, bucket_of, current_day, empty_buckets, summarize
+)
+from services.vitals_series import VitalsRecord, VitalsSeries
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+HISTORY_BACKENDS = ('sqlite', 'memory')
+
+def _pack_totals(totals):
+    return np.array([totals.assessments, totals.first_at, totals.last_at, totals.last_critical_at],
+                    dtype=np.float64).tobytes()
+
+def _unpack_totals(payload):
+    values = [None if np.isnan(value) else value for value in np.frombuffer(payload).tolist()]
+    return TrendTotals(int(values[0]), *values[1:])
+
+def _associated(*parts):
+    """Associated data binding a sealed value to its row and column."""
+    return '|'.join(str(part) for part in parts).encode()
+
+class HistoryStore:
+    """
+    Reads shared by the history backends.
+    
+    Assessments are stored compactly as VitalsRecords and rebuilt into
+    dicts only when read. An assessment's cursor is the time it was
+    stored, in epoch seconds. Backends implement _rows(), returning
+    (cursor, record) pairs oldest first; paging and streaming are built
+    on it.
+    """
+    
+    def get(self, user_id, limit=None):
+        """A user's assessments, oldest first (the most recent limit, if given)."""
+        if limit is not None and limit <= 0:
+            return []
+        rows = self._rows(user_id, self.max_per_user if limit is None else limit)
+        return [record.to_dict() for _, record in rows]
+    
+    def page(self, user_id, limit, before=None, after=None):
+        """
+        One page of a user's assessments, oldest first.
+        
+        With after, the earliest assessments stored after that cursor;
+        otherwise the latest ones stored before before (or the latest
+        overall). Both bounds are exclusive.
+        
+        Returns:
+            (list of (cursor, assessment), has_more), where has_more says
+            whether more assessments lie in the paging direction
+        """
+        rows = self._rows(user_id, limit + 1, before, after)
+        has_more = len(rows) > limit
+        if has_more:
+            rows = rows[:limit] if after is not None else rows[1:]
+        return [(cursor, record.to_dict()) for cursor, record in rows], has_more
+    
+    def iter_history(self, user_id, before=None, after=None, chunk_size=500):
+        """
+        Yield (cursor, VitalsRecord) for a user's assessments, oldest first.
+        
+        Rows are fetched chunk_size at a time, so memory stays flat however
+        long the history is.
+        """
+        after = 0.0 if after is None else after
+        while True:
+            rows = self._rows(user_id, chunk_size, before, after)
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            after = rows[-1][0]
+    
+    def trends(self, user_id, window_days):
+        """
+        Trend statistics over a user's last window_days days.
+        
+        Aggregates are updated as each assessment is stored, so a query
+        reads at most window_days day buckets, not the history.
+        
+        Raises:
+            ValueError: if window_days is outside 1..max_trend_days
+        """
+        if not 1 <= window_days <= self.max_trend_days:
+            raise ValueError(f"window_days must be between 1 and {self.max_trend_days}")
+        now = time.time()
+        totals, days, rows = self._trend_state(user_id, current_day(now) - window_days)
+        return summarize(totals, days, rows, window_days, now)
+    
+    def _lower_bound(self, after):
+        """Exclusive lower cursor bound: after, but never past retention."""
+        cutoff = time.time() - self.retention_seconds
+        return cutoff if after is None else max(after, cutoff)
+
+
+class _HistoryShard:
+    """The users hashed to one shard, behind the shard's own lock."""
+    
+    __slots__ = ('lock', 'history', 'trends')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.history = {}
+        self.trends = {}
+
+
+class MemoryHistoryStore(HistoryStore):
+    """
+    In-process assessment history, bounded per user.
+    
+    Each user's assessments are a columnar VitalsSeries. Users are
+    spread over shards by a hash of user_id, each with its own lock, so
+    threaded requests for different users rarely contend and a user's
+    check-then-create and append happen atomically. Not shared between
+    worker processes and lost on restart; meant for tests and
+    single-process development.
+    """
+    
+    def __init__(self, max_per_user=1000, retention_days=365, max_trend_days=90, shards=64):
+        self.max_per_user = max_per_user
+        self.retention_seconds = retention_days * 86400
+        self.max_trend_days = max_trend_days
+        self._shards = [_HistoryShard() for _ in range(shards)]
+    
+    def __len__(self):
+        """Number of users with stored assessments."""
+        return sum(len(shard.history) for shard in self._shards)
+    
+    def _shard(self, user_id):
+        return self._shards[hash(user_id) % len(self._shards)]
+    
+    def add(self, user_id, assessment):
+        record = VitalsRecord.from_assessment(assessment, 0.0)
+        shard = self._shard(user_id)
+        with shard.lock:
+            series = shard.history.get(user_id)
+            if series is None:
+                series = shard.history[user_id] = VitalsSeries(self.max_per_user)
+                shard.trends[user_id] = TrendAggregates(self.max_trend_days)
+            # Cursors must be unique and increasing within a user's series
+            record.created_at = time.time()
+            last = series.last_created_at()
+            if last is not None and record.created_at <= last:
+                record.created_at = float(np.nextafter(last, np.inf))
+            series.append(record)
+            shard.trends[user_id].add(record)
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        pass
+    
+    def get_stats(self):
+        users = assessments = nbytes = 0
+        for shard in self._shards:
+            with shard.lock:
+                users += len(shard.history)
+                assessments += sum(len(series) for series in shard.history.values())
+                nbytes += sum(series.nbytes for series in shard.history.values())
+        return {
+            "backend": "memory",
+            "shards": len(self._shards),
+            "users": users,
+            "assessments": assessments,
+            "bytes": nbytes,
+        }
+    
+    def _rows(self, user_id, limit, before=None, after=None):
+        lower = self._lower_bound(after)
+        shard = self._shard(user_id)
+        with shard.lock:
+            series = shard.history.get(user_id)
+            if series is None:
+                return []
+            records = series.window(limit, lower, before, earliest=after is not None)
+        return [(record.created_at, record) for record in records]
+    
+    def _trend_state(self, user_id, since_day):
+        shard = self._shard(user_id)
+        with shard.lock:
+            aggregates = shard.trends.get(user_id)
+            if aggregates is None:
+                return (TrendTotals(), *empty_buckets())
+            totals = aggregates.totals
+            return (TrendTotals(totals.assessments, totals.first_at, totals.last_at,
+                                totals.last_critical_at),
+                    *aggregates.buckets(since_day))
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """
+    Assessment history in SQLite, shared by every worker process.
+    
+    The database runs in WAL mode so readers never block the writer.
+    add() only compacts the assessment and queues it; a background
+    writer inserts queued rows in batched transactions, off the request
+    path. Queued and written rows are counted per user, and a read waits
+    only until as many of the reading user's rows are written as were
+    queued when it started, so a user always sees their own latest
+    assessment without waiting on everyone else's.
+    Like the memory store, the writer keeps each user's created_at (the
+    cursor) unique and increasing, inside the insert transaction so
+    workers sharing the database can't tie. Rows are indexed by
+    (user_id, created_at), each user keeps at most max_per_user
+    assessments and rows older than retention_days are purged
+    periodically, so both storage and lookup cost stay bounded.
+    
+    With an EncryptionService, history is encrypted at rest (envelope
+    encryption): the writer seals each batch under a data key it reuses
+    for DATA_KEY_MAX_ROWS rows, and stores only the data key wrapped by
+    the master key, in data_keys. An assessment's risk level, vitals,
+    scores and diseases are sealed together in its sealed column, and a
+    user's trend totals and day buckets are sealed too, so the writer
+    opens and reseals the ones a batch touches. Each sealed value is
+    bound to its user, timestamp (or day) and table as associated data.
+    Reads unwrap each data key once and decrypt a page in bulk.
+    """
+    
+    DATA_KEY_MAX_ROWS = 10000
+    
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS assessments ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " user_id TEXT NOT NULL,"
+        " created_at REAL NOT NULL,"
+        " risk_level INTEGER NOT NULL,"
+        " features BLOB NOT NULL,"
+        " scores BLOB NOT NULL,"
+        " diseases TEXT NOT NULL,"
+        " key_id INTEGER,"
+        " sealed BLOB)",
+        "CREATE TABLE IF NOT EXISTS data_keys ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " wrapped BLOB NOT NULL,"
+        " created_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_assessments_user ON assessments (user_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_assessments_created ON assessments (created_at)",
+        "CREATE TABLE IF NOT EXISTS trend_buckets ("
+        " user_id TEXT NOT NULL,"
+        " day INTEGER NOT NULL,"
+        + "".join(f" {column} REAL NOT NULL," for column in BUCKET_COLUMNS)
+        + " key_id INTEGER,"
+        " sealed BLOB,"
+        " PRIMARY KEY (user_id, day)) WITHOUT ROWID",
+        "CREATE TABLE IF NOT EXISTS trend_totals ("
+        " user_id TEXT PRIMARY KEY,"
+        " assessments INTEGER NOT NULL,"
+        " first_at REAL,"
+        " last_at REAL,"
+        " last_critical_at REAL,"
+        " key_id INTEGER,"
+        " sealed BLOB)",
+    )
+    # Columns added since the tables were first created: (table, column, type)
+    ADDED_COLUMNS = (
+        ('assessments', 'key_id', 'INTEGER'),
+        ('assessments', 'sealed', 'BLOB'),
+        ('trend_buckets', 'key_id', 'INTEGER'),
+        ('trend_buckets', 'sealed', 'BLOB'),
+        ('trend_totals', 'key_id', 'INTEGER'),
+        ('trend_totals', 'sealed', 'BLOB'),
+    )
+    
+    def __init__(self, path, max_per_user=1000, retention_days=365, batch_size=500,
+                 flush_interval_ms=50, max_pending=100000, purge_interval=60.0,
+                 max_trend_days=90, encryption=None):
+        self.path = str(path)
+        self.encryption = encryption
+        self.max_per_user = max_per_user
+        self.retention_seconds = retention_days * 86400
+        self.max_trend_days = max_trend_days
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.purge_interval = purge_interval
+        self._max_pending = max_pending
+        self._pid = None
+        self._schema_ready = False
+        self._init_lock = threading.Lock()
+        self._reset()
+        
+        self._stats_lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.purged = 0
+        self.write_errors = 0
+    
+    def __len__(self):
+        """Number of users with stored assessments."""
+        self.flush()
+        return self._connection().execute(
+            "SELECT COUNT(DISTINCT user_id) FROM assessments"
+        ).fetchone()[0]
+    
+    def add(self, user_id, assessment):
+        """Queue an assessment for the background writer."""
+        self._ensure_writer()
+        created_at = time.time()
+        row = VitalsRecord.from_assessment(assessment, created_at).to_row()
+        user_id = str(user_id)
+        with self._written:
+            counts = self._pending.get(user_id)
+            if counts is None:
+                counts = self._pending[user_id] = [0, 0]
+            counts[0] += 1
+        # Outside the lock: this blocks while the writer is max_pending
+        # rows behind, and the writer needs the lock to catch up
+        self._queue.put((user_id, created_at) + row)
+    
+    def flush(self):
+        """Block until every assessment queued by this process is written."""
+        if self._writer is not None and self._pid == os.getpid():
+            self._queue.join()
+    
+    def _flush_user(self, user_id):
+        """Block until the assessments this process queued for user_id are written."""
+        if self._writer is None or self._pid != os.getpid():
+            return
+        user_id = str(user_id)
+        with self._written:
+            counts = self._pending.get(user_id)
+            if counts is None:
+                return
+            # The queue is FIFO, so once as many of the user's rows are
+            # written as were queued now, this thread's own rows are too.
+            # A dropped entry means everything queued was written
+            queued = counts[0]
+            self._written.wait_for(
+                lambda: self._pending.get(user_id) is not counts or counts[1] >= queued
+            )
+    
+    def close(self):
+        """Write out the queue and stop the writer."""
+        if self._writer is not None and self._pid == os.getpid():
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+    
+    def get_stats(self):
+        with self._stats_lock:
+            return {
+                "backend": "sqlite",
+                "pending": self._queue.qsize(),
+                "written": self.written,
+                "batches": self.batches,
+                "purged": self.purged,
+                "write_errors": self.write_errors,
+                "encrypted": self.encryption is not None,
+            }
+    
+    def _rows(self, user_id, limit, before=None, after=None):
+        self._flush_user(user_id)
+        user_id = str(user_id)
+        connection = self._connection()
+        order = "ASC" if after is not None else "DESC"
+        rows = connection.execute(
+            "SELECT created_at, risk_level, features, scores, diseases, key_id, sealed"
+            " FROM assessments WHERE user_id = ? AND created_at > ? AND created_at < ?"
+            f" ORDER BY created_at {order}, id {order} LIMIT ?",
+            (user_id, self._lower_bound(after), float('inf') if before is None else before, limit)
+        ).fetchall()
+        if after is None:
+            rows.reverse()
+        sealed = [(row[5], row[6], _associated(user_id, row[0], 'assessments'))
+                  for row in rows if row[5] is not None]
+        opened = iter(self._open(connection, sealed) if sealed else ())
+        return [(row[0], VitalsRecord.from_payload(row[0], next(opened)) if row[5] is not None
+                 else VitalsRecord.from_row(*row[:5])) for row in rows]
+    
+    def _open(self, connection, sealed):
+        """
+        Plaintexts of (key_id, token, associated data) triples, one bulk
+        decrypt per data key.
+        """
+        if self.encryption is None:
+            raise RuntimeError("History is encrypted; configure HISTORY_ENCRYPTION and its key")
+        by_key = {}
+        for position, (key_id, _, _) in enumerate(sealed):
+            by_key.setdefault(key_id, []).append(position)
+        plain = [None] * len(sealed)
+        for key_id, positions in by_key.items():
+            opened = self.encryption.decrypt_batch(
+                self._data_key(connection, key_id),
+                [sealed[position][1] for position in positions],
+                [sealed[position][2] for position in positions]
+            )
+            for position, value in zip(positions, opened):
+                plain[position] = value
+        return plain
+    
+    def _data_key(self, connection, key_id):
+        wrapped = connection.execute(
+            "SELECT wrapped FROM data_keys WHERE id = ?", (key_id,)
+        ).fetchone()
+        if wrapped is None:
+            raise RuntimeError(f"History data key {key_id} is missing")
+        return self.encryption.unwrap_data_key(wrapped[0])
+    
+    def _trend_state(self, user_id, since_day):
+        self._flush_user(user_id)
+        user_id = str(user_id)
+        totals, buckets = self._stored_trends(self._connection(), [user_id], since_day)
+        if not buckets:
+            return (totals.get(user_id, TrendTotals()), *empty_buckets())
+        days = sorted(day for _, day in buckets)
+        return (totals.get(user_id, TrendTotals()), np.array(days, dtype=np.int64),
+                np.stack([buckets[user_id, day] for day in days]))
+    
+    def _stored_trends(self, connection, user_ids, since_day):
+        """
+        The stored trend state of user_ids, opening sealed rows.
+        
+        Returns:
+            ({user_id: TrendTotals}, {(user_id, day): bucket row}) for the
+            users with any, and their buckets after since_day
+        """
+        totals = {}
+        buckets = {}
+        # Sealed rows, and the user_id (totals) or (user_id, day) each fills
+        sealed = []
+        targets = []
+        for user_id in user_ids:
+            row = connection.execute(
+                "SELECT assessments, first_at, last_at, last_critical_at, key_id, sealed"
+                " FROM trend_totals WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if row is not None and row[4] is not None:
+                sealed.append((row[4], row[5], _associated(user_id, 'trend_totals')))
+                targets.append(user_id)
+            elif row is not None:
+                totals[user_id] = TrendTotals(*row[:4])
+            for row in connection.execute(
+                    f"SELECT day, {', '.join(BUCKET_COLUMNS)}, key_id, sealed FROM trend_buckets"
+                    " WHERE user_id = ? AND day > ?", (user_id, since_day)):
+                if row[-2] is not None:
+                    sealed.append((row[-2], row[-1], _associated(user_id, row[0], 'trend_buckets')))
+                    targets.append((user_id, row[0]))
+                else:
+                    buckets[user_id, row[0]] = np.array(row[1:-2], dtype=np.float64)
+        
+        if sealed:
+            for target, plain in zip(targets, self._open(connection, sealed)):
+                if isinstance(target, tuple):
+                    buckets[target] = np.frombuffer(plain, dtype=np.float64)
+                else:
+                    totals[target] = _unpack_totals(plain)
+        return totals, buckets
+    
+    def _reset(self):
+        """Fresh queue, writer and connections (at startup and after fork)."""
+        self._queue = queue.Queue(maxsize=self._max_pending)
+        # [queued, written] rows per user with rows in flight, guarded by
+        # the _written condition; never held while the queue is full
+        self._pending = {}
+        self._written = threading.Condition()
+        self._writer = None
+        self._local = threading.local()
+        # The writer's current (key_id, data key, rows sealed under it)
+        self._write_key = None
+    
+    def _ensure_writer(self):
+        """Start the writer lazily, so forked server workers each get one."""
+        if self._pid == os.getpid() and self._writer is not None:
+            return
+        with self._init_lock:
+            if self._pid != os.getpid():
+                # Connections and threads don't survive fork
+                self._reset()
+                self._pid = os.getpid()
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run, name='history-writer', daemon=True
+                )
+                self._writer.start()
+    
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            with connection:
+                for statement in self.SCHEMA:
+                    connection.execute(statement)
+                for table, column, kind in self.ADDED_COLUMNS:
+                    columns = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+                    if column not in columns:
+                        # Databases from before encryption; their rows stay readable
+                        connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+            self._schema_ready = True
+        return connection
+    
+    def _connection(self):
+        """This thread's read connection."""
+        self._ensure_writer()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+    
+    def _run(self):
+        connection = self._connect()
+        next_purge = time.monotonic()
+        
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while first is not None and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                                 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+                if batch[-1] is None:
+                    break
+            
+            rows = [row for row in batch if row is not None]
+            try:
+                if rows:
+                    self._write(connection, rows)
+                if time.monotonic() >= next_purge:
+                    self._purge_expired(connection)
+                    next_purge = time.monotonic() + self.purge_interval
+            except sqlite3.Error as e:
+                with self._stats_lock:
+                    self.write_errors += 1
+                logger.error(f"History write of {len(rows)} assessments failed: {str(e)}")
+            finally:
+                # Readers stop waiting even if the write failed
+                self._mark_written(rows)
+                for _ in batch:
+                    self._queue.task_done()
+            
+            if batch[-1] is None:
+                connection.close()
+                return
+    
+    def _mark_written(self, rows):
+        if not rows:
+            return
+        with self._written:
+            for row in rows:
+                counts = self._pending[row[0]]
+                counts[1] += 1
+                if counts[1] == counts[0]:
+                    del self._pending[row[0]]
+            self._written.notify_all()
+    
+    def _write(self, connection, rows):
+        """
+        Insert a batch in one transaction, trim the users it touched and
+        fold it into their trend aggregates.
+        """
+        if self.encryption is not None:
+            self._rotate_write_key(connection, len(rows))
+        
+        # Take the write lock before reading users' latest times
+        connection.execute("BEGIN IMMEDIATE")
+        with connection:
+            rows = self._unique_times(connection, rows)
+            self._insert(connection, rows)
+        with self._stats_lock:
+            self.written += len(rows)
+            self.batches += 1
+    
+    def _unique_times(self, connection, rows):
+        """Rows with created_at moved past each user's latest stored time."""
+        latest = {}
+        unique = []
+        for row in rows:
+            user_id, created_at = row[0], row[1]
+            if user_id not in latest:
+                latest[user_id] = connection.execute(
+                    "SELECT MAX(created_at) FROM assessments WHERE user_id = ?", (user_id,)
+                ).fetchone()[0]
+            last = latest[user_id]
+            if last is not None and created_at <= last:
+                created_at = float(np.nextafter(last, np.inf))
+            latest[user_id] = created_at
+            unique.append((user_id, created_at) + row[2:])
+        return unique
+    
+    def _insert(self, connection, rows):
+        records = [VitalsRecord.from_row(*row[1:]) for row in rows]
+        buckets = {}
+        totals = {}
+        for row, record in zip(rows, records):
+            day, bucket = bucket_of(record)
+            key = (row[0], day)
+            buckets[key] = buckets[key] + bucket if key in buckets else bucket
+            totals.setdefault(row[0], TrendTotals()).add(record)
+        
+        if self.encryption is not None:
+            stored = self._encrypt(rows, records)
+        else:
+            stored = [row + (None, None) for row in rows]
+        connection.executemany(
+            "INSERT INTO assessments"
+            " (user_id, created_at, risk_level, features, scores, diseases, key_id, sealed)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            stored
+        )
+        # Keep each user's newest max_per_user rows; the (user_id,
+        # created_at) index makes this a short range scan per user. Rows
+        # are picked by id, so older rows sharing a timestamp still count
+        connection.executemany(
+            "DELETE FROM assessments WHERE id IN ("
+            " SELECT id FROM assessments WHERE user_id = ?"
+            " ORDER BY created_at DESC, id DESC LIMIT -1 OFFSET ?)",
+            [(user_id, self.max_per_user) for user_id in {row[0] for row in rows}]
+        )
+        if self.encryption is not None:
+            self._reseal_trends(connection, buckets, totals)
+            return
+        connection.executemany(
+            f"INSERT INTO trend_buckets (user_id, day, {', '.join(BUCKET_COLUMNS)})"
+            f" VALUES (?, ?{', ?' * len(BUCKET_COLUMNS)})"
+            " ON CONFLICT (user_id, day) DO UPDATE SET "
+            + ", ".join(f"{column} = {column} + excluded.{column}" for column in BUCKET_COLUMNS),
+            [(user_id, day, *bucket.tolist()) for (user_id, day), bucket in buckets.items()]
+        )
+        connection.executemany(
+            "INSERT INTO trend_totals (user_id, assessments, first_at, last_at, last_critical_at)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (user_id) DO UPDATE SET"
+            " assessments = assessments + excluded.assessments,"
+            " first_at = MIN(first_at, excluded.first_at),"
+            " last_at = MAX(last_at, excluded.last_at),"
+            " last_critical_at = MAX(COALESCE(last_critical_at, excluded.last_critical_at),"
+            " COALESCE(excluded.last_critical_at, last_critical_at))",
+            [(user_id, t.assessments, t.first_at, t.last_at, t.last_critical_at)
+             for user_id, t in totals.items()]
+        )
+    
+    def _rotate_write_key(self, connection, count):
+        """Make sure the writer's data key can seal count more rows."""
+        if self._write_key is None or self._write_key[2] >= self.DATA_KEY_MAX_ROWS:
+            data_key, wrapped = self.encryption.generate_data_key()
+            # Committed on its own, so a failed batch can't roll it back
+            with connection:
+                key_id = connection.execute(
+                    "INSERT INTO data_keys (wrapped, created_at) VALUES (?, ?)",
+                    (wrapped, time.time())
+                ).lastrowid
+            self._write_key = (key_id, data_key, 0)
+        key_id, data_key, sealed = self._write_key
+        self._write_key = (key_id, data_key, sealed + count)
+    
+    def _encrypt(self, rows, records):
+        """
+        Rows to insert with each assessment sealed under the writer's
+        data key; the plaintext columns hold only placeholders.
+        """
+        key_id, data_key, _ = self._write_key
+        sealed = self.encryption.encrypt_batch(
+            data_key, [record.to_payload() for record in records],
+            [_associated(row[0], row[1], 'assessments') for row in rows]
+        )
+        return [(row[0], row[1], 0, b'', b'', '', key_id, token) for row, token in zip(rows, sealed)]
+    
+    def _reseal_trends(self, connection, buckets, totals):
+        """
+        Add a batch's trend sums to the sealed ones it touches and seal
+        them again under the writer's data key. Rows stored in plaintext
+        before encryption was enabled are folded in the same way.
+        """
+        since_day = min(day for _, day in buckets) - 1
+        stored_totals, stored_buckets = self._stored_trends(connection, list(totals), since_day)
+        for key in buckets:
+            if key in stored_buckets:
+                buckets[key] = buckets[key] + stored_buckets[key]
+        for user_id, batch_totals in totals.items():
+            if user_id in stored_totals:
+                totals[user_id] = stored_totals[user_id].merge(batch_totals)
+        
+        key_id, data_key, _ = self._write_key
+        sealed = self.encryption.encrypt_batch(
+            data_key,
+            [bucket.tobytes() for bucket in buckets.values()]
+            + [_pack_totals(user_totals) for user_totals in totals.values()],
+            [_associated(user_id, day, 'trend_buckets') for user_id, day in buckets]
+            + [_associated(user_id, 'trend_totals') for user_id in totals]
+        )
+        connection.executemany(
+            f"INSERT OR REPLACE INTO trend_buckets (user_id, day, {', '.join(BUCKET_COLUMNS)},"
+            f" key_id, sealed) VALUES (?, ?{', 0' * len(BUCKET_COLUMNS)}, ?, ?)",
+            [(user_id, day, key_id, token) for (user_id, day), token in zip(buckets, sealed)]
+        )
+        connection.executemany(
+            "INSERT OR REPLACE INTO trend_totals"
+            " (user_id, assessments, first_at, last_at, last_critical_at, key_id, sealed)"
+            " VALUES (?, 0, NULL, NULL, NULL, ?, ?)",
+            [(user_id, key_id, token) for user_id, token in zip(totals, sealed[len(buckets):])]
+        )
+    
+    def _purge_expired(self, connection):
+        with connection:
+            deleted = connection.execute(
+                "DELETE FROM assessments WHERE created_at < ?",
+                (time.time() - self.retention_seconds,)
+            ).rowcount
+            connection.execute(
+                "DELETE FROM trend_buckets WHERE day <= ?",
+                (current_day() - self.max_trend_days,)
+            )
+        if deleted:
+            with self._stats_lock:
+                self.purged += deleted
+            logger.info(f"Purged {deleted} assessments past retention")
+
+
+def sqlite_path(database_uri):
+    """
+    File path from a sqlite:/// URI.
+    
+    Raises:
+        ValueError: for non-SQLite or in-memory databases
+    """
+    prefix = 'sqlite:///'
+    if not database_uri.startswith(prefix):
+        raise ValueError(
+            f"History store needs a SQLite database URI, got {database_uri}; "
+            "set HISTORY_DATABASE_URL or HISTORY_BACKEND=memory"
+        )
+    path = database_uri[len(prefix):]
+    if path in ('', ':memory:'):
+        raise ValueError("In-memory SQLite can't be shared; use HISTORY_BACKEND=memory")
+    return path
+
+
+def create_history_store(backend=None):
+    """Build the history store configured in Config."""
+    backend = backend or Config.HISTORY_BACKEND
+    if backend not in HISTORY_BACKENDS:
+        raise ValueError(f"Unknown history backend: {backend}")
+    
+    if backend == 'memory':
+        return MemoryHistoryStore(Config.HISTORY_MAX_PER_USER, Config.HISTORY_RETENTION_DAYS,
+                                  Config.TREND_MAX_WINDOW_DAYS)
+    return SQLiteHistoryStore(
+        sqlite_path(Config.HISTORY_DATABASE_URL),
+        max_per_user=Config.HISTORY_MAX_PER_USER,
+        retention_days=Config.HISTORY_RETENTION_DAYS,
+        batch_size=Config.HISTORY_BATCH_SIZE,
+        flush_interval_ms=Config.HISTORY_FLUSH_INTERVAL_MS,
+        max_trend_days=Config.TREND_MAX_WINDOW_DAYS,
+        encryption=create_encryption_service() if Config.HISTORY_ENCRYPTION else None,
+    )
+
+
+def create_encryption_service():
+    """The EncryptionService for history at rest (needs cryptography)."""
+    from utils.encryption import EncryptionService
+    return EncryptionService(Config.ENCRYPTION_KEY_PATH,
+                             max_workers=Config.ENCRYPTION_WORKERS or None,
+                             parallel_threshold=Config.ENCRYPTION_PARALLEL_THRESHOLD)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Return the process-wide history store, shared by every service."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_history_store()
+    return _store
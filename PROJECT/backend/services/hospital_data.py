@@ -0,0 +1,315 @@
+import copy
+import csv
+import json
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+
+# Specialty names separate with ';' in CSV files
+SPECIALTY_SEPARATOR = ';'
+MAX_SPECIALTIES = 64
+
+_TRUE = ('true', '1', 'yes', 'y', 't')
+# Bed counts not reported by any feed yet
+UNKNOWN_BEDS = -1
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE
+    return bool(value) if value == value else False  # NaN from missing cells
+
+def _bed_count(value):
+    """A reported bed count, or UNKNOWN_BEDS if missing."""
+    if value is None or value == '' or (isinstance(value, float) and value != value):
+        return UNKNOWN_BEDS
+    count = int(value)
+    if count < 0:
+        raise ValueError(f"Bed counts cannot be negative, got {value}")
+    return count
+
+def _specialty_list(value):
+    if isinstance(value, str):
+        return [name.strip() for name in value.split(SPECIALTY_SEPARATOR) if name.strip()]
+    if value is None or (isinstance(value, float) and value != value):
+        return []
+    return [str(name) for name in value]
+
+
+class HospitalTable:
+    """
+    Hospitals as parallel NumPy columns.
+    
+    Coordinates, ratings and ICU flags are arrays, and each hospital's
+    specialties are a bit in specialty_mask (one bit per distinct
+    specialty, matched case-insensitively), so filters and distance
+    scoring run over whole columns. Specialty lists are interned per
+    distinct combination, the way VitalsSeries keeps disease names.
+    Result dicts are only built, by record(), for hospitals actually
+    returned.
+    
+    Built once per dataset: row_of_id maps hospital ids to rows, and
+    postings maps each (lowercased) specialty to the rows offering it,
+    so lookups and specialty subsets never scan the table.
+    
+    Live bed and ICU bed counts (UNKNOWN_BEDS until reported) and the
+    times of their last report are the only columns that change; a table
+    is never modified once built, and with_availability() returns a new
+    one sharing everything else. A report's own time (by the feed's
+    clock) and the time this server applied it are kept apart, so
+    reports are only ever ordered by the feed's clock.
+    """
+    
+    def __init__(self, ids, names, latitudes, longitudes, addresses, phones,
+                 specialties, has_icu, ratings, beds_available=None,
+                 icu_beds_available=None, availability_updated=None,
+                 availability_received=None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.names = list(names)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.addresses = list(addresses)
+        self.phones = list(phones)
+        self.has_icu = np.asarray(has_icu, dtype=bool)
+        self.ratings = np.asarray(ratings, dtype=np.float64)
+        count = len(self.ids)
+        self.beds_available = (np.full(count, UNKNOWN_BEDS, dtype=np.int32)
+                               if beds_available is None
+                               else np.asarray(beds_available, dtype=np.int32))
+        self.icu_beds_available = (np.full(count, UNKNOWN_BEDS, dtype=np.int32)
+                                   if icu_beds_available is None
+                                   else np.asarray(icu_beds_available, dtype=np.int32))
+        # Epoch seconds of the last timed availability report, by its
+        # source's clock, and of the last report applied here; NaN if none
+        self.availability_updated = (np.full(count, np.nan) if availability_updated is None
+                                     else np.asarray(availability_updated, dtype=np.float64))
+        self.availability_received = (np.full(count, np.nan) if availability_received is None
+                                      else np.asarray(availability_received, dtype=np.float64))
+        
+        # Bit per lowercased specialty name
+        self.specialty_bits = {}
+        self.specialty_sets = []
+        set_ids = {}
+        self.specialty_set = np.empty(len(self.ids), dtype=np.int32)
+        for row, names_of_row in enumerate(specialties):
+            names_of_row = tuple(names_of_row)
+            set_id = set_ids.get(names_of_row)
+            if set_id is None:
+                set_id = set_ids[names_of_row] = len(self.specialty_sets)
+                self.specialty_sets.append(names_of_row)
+                for name in names_of_row:
+                    self.specialty_bits.setdefault(name.lower(), len(self.specialty_bits))
+            self.specialty_set[row] = set_id
+        if len(self.specialty_bits) > MAX_SPECIALTIES:
+            raise ValueError(f"At most {MAX_SPECIALTIES} distinct specialties are supported, "
+                             f"got {len(self.specialty_bits)}")
+        set_masks = np.array([self.mask_of(names) for names in self.specialty_sets], dtype=np.uint64)
+        self.specialty_mask = set_masks[self.specialty_set]
+        
+        self.row_of_id = dict(zip(self.ids.tolist(), range(len(self.ids))))
+        self.postings = {
+            name: np.flatnonzero(self.specialty_mask & np.uint64(1 << bit))
+            for name, bit in self.specialty_bits.items()
+        }
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    @classmethod
+    def from_records(cls, hospitals):
+        """Build from hospital dicts (as in the API responses)."""
+        hospitals = list(hospitals)
+        availability = [h.get('availability') if isinstance(h.get('availability'), dict) else {}
+                        for h in hospitals]
+        return cls(
+            [h['id'] for h in hospitals],
+            [h['name'] for h in hospitals],
+            [h['latitude'] for h in hospitals],
+            [h['longitude'] for h in hospitals],
+            [h.get('address', '') for h in hospitals],
+            [h.get('phone', '') for h in hospitals],
+            [_specialty_list(h.get('specialties')) for h in hospitals],
+            [_as_bool(h.get('has_icu', False)) for h in hospitals],
+            [float(h.get('rating') or 0.0) for h in hospitals],
+            [_bed_count(a.get('beds')) for a in availability],
+            [_bed_count(a.get('icu_beds')) for a in availability],
+            [parse_time(a['updated_at']) if a.get('updated_at') else np.nan
+             for a in availability],
+            [parse_time(a['received_at']) if a.get('received_at') else np.nan
+             for a in availability],
+        )
+    
+    def mask_of(self, specialties):
+        """Bitmask of specialty names; 0 if none of them is known."""
+        mask = 0
+        for name in specialties:
+            bit = self.specialty_bits.get(name.lower())
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+    
+    def icu_ready(self, rows):
+        """
+        Whether each row's hospital can take an ICU patient: it has an
+        ICU with beds free, or no ICU bed count has been reported.
+        """
+        return self.has_icu[rows] & (self.icu_beds_available[rows] != 0)
+    
+    def with_availability(self, rows, beds_available, icu_beds_available, updated, received):
+        """
+        A copy of this table with new availability for rows, received
+        (applied) at epoch seconds received.
+        
+        Only the availability columns are copied; names, coordinates,
+        specialties and lookups are shared, so row numbers (and spatial
+        indexes over them) stay valid. Counts and updated times of None
+        leave a row's current value.
+        """
+        table = copy.copy(self)
+        table.beds_available = self.beds_available.copy()
+        table.icu_beds_available = self.icu_beds_available.copy()
+        table.availability_updated = self.availability_updated.copy()
+        table.availability_received = self.availability_received.copy()
+        for row, beds, icu_beds, timestamp in zip(rows, beds_available,
+                                                  icu_beds_available, updated):
+            if beds is not None:
+                table.beds_available[row] = beds
+            if icu_beds is not None:
+                table.icu_beds_available[row] = icu_beds
+            if timestamp is not None:
+                table.availability_updated[row] = timestamp
+            table.availability_received[row] = received
+        return table
+    
+    def rows_with(self, specialty):
+        """Rows whose hospital offers specialty, in row order."""
+        return self.postings.get(specialty.lower(), np.empty(0, dtype=np.intp))
+    
+    def record(self, row, distance=None):
+        """A hospital as the API returns it."""
+        return {
+            "id": int(self.ids[row]),
+            "name": self.names[row],
+            "latitude": float(self.latitudes[row]),
+            "longitude": float(self.longitudes[row]),
+            "address": self.addresses[row],
+            "phone": self.phones[row],
+            "specialties": list(self.specialty_sets[self.specialty_set[row]]),
+            "has_icu": bool(self.has_icu[row]),
+            "rating": float(self.ratings[row]),
+            "distance": None if distance is None else round(float(distance), 2),
+            "availability": self.availability(row),
+        }
+    
+    def availability(self, row):
+        """Live bed counts of a row (None where never reported)."""
+        beds, icu_beds = int(self.beds_available[row]), int(self.icu_beds_available[row])
+        return {
+            "beds": None if beds == UNKNOWN_BEDS else beds,
+            "icu_beds": None if icu_beds == UNKNOWN_BEDS else icu_beds,
+            "updated_at": _isoformat(float(self.availability_updated[row])),
+            "received_at": _isoformat(float(self.availability_received[row])),
+        }
+    
+    def records(self):
+        return [self.record(row) for row in range(len(self))]
+
+
+def load_hospitals(path):
+    """
+    Read a hospital dataset into a HospitalTable.
+    
+    JSON files hold a list of hospital objects (or {"hospitals": [...]});
+    CSV and Parquet files have one column per field, with CSV specialties
+    separated by ';'. Parquet needs pyarrow.
+    """
+    path = Path(path)
+    if path.suffix == '.json':
+        with open(path) as f:
+            data = json.load(f)
+        return HospitalTable.from_records(data['hospitals'] if isinstance(data, dict) else data)
+    
+    import pandas as pd
+    
+    if path.suffix in ('.parquet', '.pq'):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Reading Parquet hospital data requires pyarrow: pip install pyarrow")
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_csv(path, dtype={'address': str, 'phone': str, 'specialties': str},
+                            keep_default_na=False)
+    
+    count = len(frame)
+    
+    def column(name, default):
+        return frame[name].tolist() if name in frame else [default] * count
+    
+    return HospitalTable(
+        frame['id'].to_numpy(dtype=np.int64),
+        frame['name'].astype(str).tolist(),
+        frame['latitude'].to_numpy(dtype=np.float64),
+        frame['longitude'].to_numpy(dtype=np.float64),
+        column('address', ''),
+        column('phone', ''),
+        [_specialty_list(value) for value in column('specialties', '')],
+        [_as_bool(value) for value in column('has_icu', False)],
+        (frame['rating'].replace('', 0).to_numpy(dtype=np.float64)
+         if 'rating' in frame else np.zeros(count)),
+        [_bed_count(value) for value in column('beds_available', None)],
+        [_bed_count(value) for value in column('icu_beds_available', None)],
+    )
+
+
+def parse_time(value):
+    """Epoch seconds from epoch seconds or an ISO 8601 string."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def _isoformat(timestamp):
+    """ISO 8601 local time of epoch seconds, or None for NaN."""
+    return None if timestamp != timestamp else datetime.fromtimestamp(timestamp).isoformat()
+
+
+def availability_update(update):
+    """
+    Validate one availability report: a dict with the hospital "id" and
+    any of "beds_available", "icu_beds_available" and "updated_at"
+    (epoch seconds or ISO 8601).
+    
+    Returns:
+        (hospital_id, beds or None, icu_beds or None, updated_at or None)
+    
+    Raises:
+        ValueError: if the id is missing or a value is malformed
+    """
+    if not isinstance(update, dict) or 'id' not in update:
+        raise ValueError("Each update needs a hospital id")
+    try:
+        beds, icu_beds = (_bed_count(update.get(field))
+                          for field in ('beds_available', 'icu_beds_available'))
+        updated = update.get('updated_at')
+        return (int(update['id']),
+                None if beds == UNKNOWN_BEDS else beds,
+                None if icu_beds == UNKNOWN_BEDS else icu_beds,
+                None if updated in (None, '') else parse_time(updated))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid update for hospital {update.get('id')}: {e}")
+
+
+def load_availability_updates(path):
+    """
+    Read availability reports from a feed file: JSON (a list of updates,
+    or {"updates": [...]}), newline-delimited JSON (.ndjson) or CSV with
+    the columns id, beds_available, icu_beds_available, updated_at.
+    """
+    path = Path(path)
+    with open(path) as f:
+        if path.suffix == '.json':
+            data = json.load(f)
+            return data['updates'] if isinstance(data, dict) else data
+        if path.suffix == '.ndjson':
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
\ No newline at end of file
@@ -1,4 +1,7 @@
+from config import Config
 from models.risk_predictor import RiskPredictor
+from services.history_store import get_history_store
+from services.request_coalescer import RequestCoalescer
 from utils.logger import setup_logger
 from datetime import datetime
 import json
@@ -6,29 +9,82 @@ import json
 logger = setup_logger(__name__)
 
 class PredictionService:
-    def __init__(self):
-        self.predictor = RiskPredictor()
-        self.assessment_history = {}
+    def __init__(self, history_store=None):
+        self.predictor = RiskPredictor(
+            backend=Config.INFERENCE_BACKEND,
+            cache_size=Config.PREDICTION_CACHE_SIZE,
+            cache_ttl=Config.PREDICTION_CACHE_TTL,
+            model_dir=Config.MODEL_DIR
+        )
+        if self.predictor.versions is not None and Config.MODEL_WATCH_INTERVAL > 0:
+            self.predictor.versions.start_watching(Config.MODEL_WATCH_INTERVAL)
+        # Empty stores are falsy (len), so test for None explicitly
+        self.assessment_history = (
+            history_store if history_store is not None else get_history_store()
+        )
+        
+        self.coalescer = None
+        if Config.COALESCE_WINDOW_MS > 0:
+            self.coalescer = RequestCoalescer(
+                self.predictor.predict_risk_batch,
+                window_ms=Config.COALESCE_WINDOW_MS,
+                max_batch_size=Config.COALESCE_MAX_BATCH
+            )
+    
+    def warmup(self):
+        """Load the model and run dummy predictions before serving traffic."""
+        if self.predictor.warmup():
+            logger.info("Prediction model loaded and warmed up")
+        else:
+            logger.warning("No trained model found; skipping warmup")
     
     def assess_risk(self, health_data):
         """Perform risk assessment."""
         try:
-            result = self.predictor.predict_risk(health_data)
+            if self.coalescer is not None:
+                result = self.coalescer.submit(health_data)
+            else:
+                result = self.predictor.predict_risk(health_data)
             result['timestamp'] = datetime.now().isoformat()
             result['health_inputs'] = health_data
             
             # Store in history
-            user_id = health_data.get('user_id', 'anonymous')
-            if user_id not in self.assessment_history:
-                self.assessment_history[user_id] = []
-            
-            self.assessment_history[user_id].append(result)
+            self._store_assessment(health_data, result)
             
             return result
         except Exception as e:
             logger.error(f"Risk assessment error: {str(e)}")
             raise
     
+    def assess_risk_batch(self, health_data_list):
+        """Perform risk assessment for many patients in one model call."""
+        try:
+            results = self.predictor.predict_risk_batch(health_data_list)
+            timestamp = datetime.now().isoformat()
+            
+            for health_data, result in zip(health_data_list, results):
+                result['timestamp'] = timestamp
+                result['health_inputs'] = health_data
+                self._store_assessment(health_data, result)
+            
+            return results
+        except Exception as e:
+            logger.error(f"Batch risk assessment error: {str(e)}")
+            raise
+    
+    def assess_risk_level(self, health_data):
+        """Overall risk level only, with early-exit tree evaluation (not stored)."""
+        try:
+            return self.predictor.predict_risk_levels([health_data])[0]
+        except Exception as e:
+            logger.error(f"Risk level assessment error: {str(e)}")
+            raise
+    
+    def _store_assessment(self, health_data, result):
+        """Append an assessment result to the user's history."""
+        user_id = health_data.get('user_id', 'anonymous')
+        self.assessment_history.add(user_id, result)
+    
     def generate_precautions(self, diseases, age, lifestyle, conditions):
         """Generate personalized precautions."""
         precautions = {
@@ -87,9 +143,51 @@ class PredictionService:
         
         return precautions
     
+    def get_inference_metrics(self):
+        """Get runtime metrics for the inference path."""
+        return {
+            "backend": self.predictor.backend,
+            "model_version": self.predictor.loaded_version,
+            "coalescer": self.coalescer.get_metrics() if self.coalescer else None,
+            "cache": self.predictor.cache.get_stats() if self.predictor.cache else None,
+            "registry": self.predictor.registry.get_stats()
+        }
+    
     def get_user_history(self, user_id):
         """Get user's assessment history."""
-        return self.assessment_history.get(user_id, [])
+        return self.assessment_history.get(user_id)
+    
+    def get_history_page(self, user_id, limit, before=None, after=None):
+        """
+        One page of a user's history, oldest first.
+        
+        Pass the returned cursors back as before (older assessments) or
+        after (newer ones) to fetch the neighbouring pages.
+        """
+        items, has_more = self.assessment_history.page(user_id, limit, before, after)
+        return {
+            "assessments": [assessment for _, assessment in items],
+            "has_more": has_more,
+            "cursors": {
+                "before": items[0][0] if items else before,
+                "after": items[-1][0] if items else after
+            }
+        }
+    
+    def iter_user_history(self, user_id, before=None, after=None):
+        """Yield (cursor, assessment) for a user's history, oldest first."""
+        for cursor, record in self.assessment_history.iter_history(user_id, before, after):
+            yield cursor, record.to_dict()
+    
+    def get_trends(self, user_id, window_days):
+        """
+        Trend statistics over a user's last window_days days.
+        
+        Served from per-day aggregates updated on every stored assessment,
+        so the cost doesn't grow with the length of the history.
+        """
+        trends = self.assessment_history.trends(user_id, window_days)
+        return {"user_id": user_id, **trends}
     
     def get_lifestyle_tips(self):
         """Get general lifestyle improvement tips."""
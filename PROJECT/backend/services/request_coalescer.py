@@ -0,0 +1,120 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class RequestCoalescer:
+    """
+    Coalesce concurrent prediction requests into micro-batches.
+    
+    Callers block in submit() while a single worker thread collects
+    requests for up to window_ms (measured from the oldest queued request)
+    or until max_batch_size is reached, runs one vectorized batch call and
+    hands every caller its own result.
+    """
+    
+    def __init__(self, predict_batch, window_ms=2.0, max_batch_size=64):
+        self.predict_batch = predict_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        
+        self._metrics_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._largest_batch = 0
+        self._batch_size_histogram = {}
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+    
+    def submit(self, item):
+        """Queue one request and block until its result is ready."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future.result()
+    
+    def get_metrics(self):
+        """Batch size and queue wait statistics since startup."""
+        with self._metrics_lock:
+            batches = self._batches
+            return {
+                "batches": batches,
+                "requests": self._requests,
+                "mean_batch_size": self._requests / batches if batches else 0.0,
+                "max_batch_size": self._largest_batch,
+                "batch_size_histogram": dict(self._batch_size_histogram),
+                "mean_queue_wait_ms": (
+                    self._total_wait / self._requests * 1000 if self._requests else 0.0
+                ),
+                "max_queue_wait_ms": self._max_wait * 1000,
+            }
+    
+    def _ensure_worker(self):
+        """Start the worker lazily, so forked server workers each get one."""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name='request-coalescer', daemon=True
+                )
+                self._worker.start()
+    
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            deadline = first[2] + self.window
+            
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            self._dispatch(batch)
+    
+    def _dispatch(self, batch):
+        started = time.perf_counter()
+        items = [item for item, _, _ in batch]
+        
+        try:
+            results = self.predict_batch(items)
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+        except Exception as e:
+            # Don't fail every caller for one bad request: retry singly so
+            # each caller gets its own result or its own error
+            logger.warning(f"Coalesced batch of {len(batch)} failed, retrying singly: {str(e)}")
+            for item, future, _ in batch:
+                try:
+                    future.set_result(self.predict_batch([item])[0])
+                except Exception as item_error:
+                    future.set_exception(item_error)
+        
+        self._record(batch, started)
+    
+    def _record(self, batch, started):
+        size = len(batch)
+        # Power-of-two buckets: "1", "2-3", "4-7", ...
+        low = 1 << (size.bit_length() - 1)
+        bucket = str(low) if low == 1 else f"{low}-{2 * low - 1}"
+        waits = [started - enqueued for _, _, enqueued in batch]
+        
+        with self._metrics_lock:
+            self._batches += 1
+            self._requests += size
+            self._largest_batch = max(self._largest_batch, size)
+            self._batch_size_histogram[bucket] = self._batch_size_histogram.get(bucket, 0) + 1
+            self._total_wait += sum(waits)
+            self._max_wait = max(self._max_wait, max(waits))
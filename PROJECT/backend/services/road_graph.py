@@ -0,0 +1,231 @@
+import heapq
+import time
+from pathlib import Path
+import numpy as np
+from services.spatial_index import SpatialIndex, haversine_km
+
+# Edge speed when an edge list has lengths but no speeds
+DEFAULT_SPEED_KPH = 40.0
+# Speed assumed between a location and its nearest road node
+ACCESS_SPEED_KPH = 20.0
+DEFAULT_LANDMARKS = 8
+# A* checks its deadline every this many settled nodes
+_DEADLINE_CHECK = 64
+
+
+class RoadGraph:
+    """
+    Directed road network for travel-time estimates, searched with ALT
+    (A*, landmarks and the triangle inequality).
+    
+    At build time a few landmark nodes spread over the network are
+    picked, and exact travel times from and to each of them are
+    precomputed for every node (with SciPy's Dijkstra, in C). For any
+    node v and target t, d(L, t) - d(L, v) and d(v, L) - d(t, L) are
+    lower bounds on d(v, t), so A* is steered almost straight to the
+    target and settles a small fraction of the nodes plain Dijkstra
+    would. Locations snap to the nearest node of the largest strongly
+    connected component, so every query has a route.
+    
+    Edge costs are seconds; sources and targets are node positions.
+    """
+    
+    def __init__(self, node_latitudes, node_longitudes, sources, targets, seconds,
+                 landmarks=DEFAULT_LANDMARKS):
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import connected_components, dijkstra
+        
+        self.latitudes = np.asarray(node_latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(node_longitudes, dtype=np.float64)
+        node_count = len(self.latitudes)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        # csgraph ignores zero weights, and csr_matrix would add up parallel
+        # edges; drop loops and keep the fastest of each parallel edge
+        seconds = np.maximum(np.asarray(seconds, dtype=np.float64), 1e-3)
+        keep = sources != targets
+        sources, targets, seconds = sources[keep], targets[keep], seconds[keep]
+        order = np.lexsort((seconds, targets, sources))
+        sources, targets, seconds = sources[order], targets[order], seconds[order]
+        first = np.ones(len(sources), dtype=bool)
+        first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+        sources, targets, seconds = sources[first], targets[first], seconds[first]
+        if not len(sources):
+            raise ValueError("Road graph has no edges")
+        self.edge_count = len(sources)
+        
+        # Adjacency in CSR form, as lists: A* runs in Python
+        offsets = np.searchsorted(sources, np.arange(node_count + 1))
+        self._offsets = offsets.tolist()
+        self._heads = targets.tolist()
+        self._weights = seconds.tolist()
+        
+        graph = csr_matrix((seconds, (sources, targets)), shape=(node_count, node_count))
+        _, labels = connected_components(graph, directed=True, connection='strong')
+        self.component = np.flatnonzero(labels == np.bincount(labels).argmax())
+        self._snap = SpatialIndex(self.latitudes[self.component], self.longitudes[self.component])
+        
+        self.landmarks = self._pick_landmarks(min(landmarks, len(self.component)))
+        # Per node, seconds from and to each landmark
+        self._from_landmarks = dijkstra(graph, indices=self.landmarks).T.tolist()
+        self._to_landmarks = dijkstra(graph.T.tocsr(), indices=self.landmarks).T.tolist()
+    
+    def __len__(self):
+        return len(self.latitudes)
+    
+    def _pick_landmarks(self, count):
+        """
+        Farthest-point landmarks: the component node farthest from its
+        centre, then repeatedly the node farthest from those picked.
+        Landmarks on the edge of the map give the tightest bounds.
+        """
+        latitudes = self.latitudes[self.component]
+        longitudes = self.longitudes[self.component]
+        nearest = haversine_km(latitudes.mean(), longitudes.mean(), latitudes, longitudes)
+        picked = []
+        for _ in range(count):
+            position = int(np.argmax(nearest))
+            picked.append(position)
+            nearest = np.minimum(nearest, haversine_km(latitudes[position], longitudes[position],
+                                                       latitudes, longitudes))
+        return self.component[picked]
+    
+    def snap(self, latitudes, longitudes):
+        """(nodes, distances_km) of the routable node nearest each location."""
+        positions, distances = self._snap.nearest_many(latitudes, longitudes, 1)
+        return self.component[positions[:, 0]], distances[:, 0]
+    
+    def travel_times(self, latitude, longitude, latitudes, longitudes, budget_ms):
+        """
+        Estimated travel times from a location to destinations.
+        
+        Destinations are routed in the order given (put the likeliest
+        first) until budget_ms has passed; each estimate is the road time
+        plus the distance to and from the road network at
+        ACCESS_SPEED_KPH.
+        
+        Returns:
+            seconds per destination, NaN where the budget ran out first
+        """
+        deadline = time.perf_counter() + budget_ms / 1000
+        nodes, access_km = self.snap(np.append(latitude, latitudes),
+                                     np.append(longitude, longitudes))
+        source = int(nodes[0])
+        seconds = np.full(len(nodes) - 1, np.nan)
+        routes = {}
+        for position, target in enumerate(nodes[1:].tolist()):
+            route = routes.get(target)
+            if route is None:
+                if time.perf_counter() > deadline:
+                    break
+                route = routes[target] = self.route_seconds(source, target, deadline)
+                if route is None:
+                    break
+            seconds[position] = route
+        return seconds + (access_km[0] + access_km[1:]) / ACCESS_SPEED_KPH * 3600
+    
+    def route_seconds(self, source, target, deadline=None):
+        """
+        Fastest road time from node source to node target, or None if
+        deadline (a time.perf_counter() value) passes first.
+        """
+        offsets, heads, weights = self._offsets, self._heads, self._weights
+        from_landmarks, to_landmarks = self._from_landmarks, self._to_landmarks
+        from_target, to_target = from_landmarks[target], to_landmarks[target]
+        
+        def heuristic(node):
+            bound = 0.0
+            for from_node, to_node, target_from, target_to in zip(
+                    from_landmarks[node], to_landmarks[node], from_target, to_target):
+                bound = max(bound, target_from - from_node, to_node - target_to)
+            return bound
+        
+        inf = float('inf')
+        best = {source: 0.0}
+        estimates = {}
+        heap = [(heuristic(source), 0.0, source)]
+        settled = 0
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                return cost
+            if cost > best[node]:
+                continue
+            settled += 1
+            if deadline is not None and settled % _DEADLINE_CHECK == 0 \
+                    and time.perf_counter() > deadline:
+                return None
+            for edge in range(offsets[node], offsets[node + 1]):
+                head = heads[edge]
+                head_cost = cost + weights[edge]
+                if head_cost < best.get(head, inf):
+                    estimate = estimates.get(head)
+                    if estimate is None:
+                        estimate = estimates[head] = heuristic(head)
+                    if estimate == inf:
+                        continue  # target unreachable from head
+                    best[head] = head_cost
+                    heapq.heappush(heap, (head_cost + estimate, head_cost, head))
+        return None
+    
+    def get_stats(self):
+        return {
+            "nodes": len(self),
+            "edges": self.edge_count,
+            "routable_nodes": len(self.component),
+            "landmarks": len(self.landmarks),
+        }
+
+
+def load_road_graph(path, landmarks=DEFAULT_LANDMARKS):
+    """
+    Read a road network edge list (CSV, or Parquet with pyarrow) into a
+    RoadGraph.
+    
+    Each row is a road segment with the columns source, target,
+    source_lat, source_lon, target_lat, target_lon and either seconds or
+    length_m (with an optional speed_kph, default DEFAULT_SPEED_KPH).
+    Segments are two-way unless an optional oneway column is true.
+    Node ids may be any integers.
+    """
+    import pandas as pd
+    
+    path = Path(path)
+    if path.suffix in ('.parquet', '.pq'):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Reading Parquet road graphs requires pyarrow: pip install pyarrow")
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_csv(path)
+    
+    if 'seconds' in frame:
+        seconds = frame['seconds'].to_numpy(dtype=np.float64)
+    elif 'length_m' in frame:
+        speed = (frame['speed_kph'].fillna(DEFAULT_SPEED_KPH).to_numpy(dtype=np.float64)
+                 if 'speed_kph' in frame else DEFAULT_SPEED_KPH)
+        seconds = frame['length_m'].to_numpy(dtype=np.float64) / (speed / 3.6)
+    else:
+        raise ValueError(f"{path} needs a seconds or length_m column")
+    
+    ends = np.concatenate((frame['source'].to_numpy(dtype=np.int64),
+                           frame['target'].to_numpy(dtype=np.int64)))
+    node_ids, first, positions = np.unique(ends, return_index=True, return_inverse=True)
+    latitudes = np.concatenate((frame['source_lat'].to_numpy(dtype=np.float64),
+                                frame['target_lat'].to_numpy(dtype=np.float64)))
+    longitudes = np.concatenate((frame['source_lon'].to_numpy(dtype=np.float64),
+                                 frame['target_lon'].to_numpy(dtype=np.float64)))
+    sources, targets = np.split(positions, 2)
+    
+    two_way = np.ones(len(frame), dtype=bool)
+    if 'oneway' in frame:
+        two_way = ~frame['oneway'].astype(str).str.strip().str.lower().isin(
+            ('true', '1', 'yes', 'y', 't')).to_numpy()
+    return RoadGraph(
+        latitudes[first], longitudes[first],
+        np.concatenate((sources, targets[two_way])),
+        np.concatenate((targets, sources[two_way])),
+        np.concatenate((seconds, seconds[two_way])),
+        landmarks=landmarks,
+    )
@@ -0,0 +1,111 @@
+import numpy as np
+
+# Mean Earth radius, as used by the haversine package
+EARTH_RADIUS_KM = 6371.0088
+
+def valid_coordinates(latitude, longitude):
+    """Whether latitude/longitude are finite and in range."""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return False
+    return -90 <= latitude <= 90 and -180 <= longitude <= 180
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Great-circle distances (km) from one point to arrays of points."""
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def unit_vectors(latitudes, longitudes):
+    """Points on the unit sphere, one row of (x, y, z) per coordinate."""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+def chord_length(distance_km):
+    """Straight-line distance on the unit sphere for a great-circle distance."""
+    angle = min(float(distance_km) / EARTH_RADIUS_KM, np.pi)
+    return 2 * np.sin(angle / 2)
+
+
+class SpatialIndex:
+    """
+    KD-tree over hospital coordinates on the unit sphere.
+    
+    Straight-line (chord) distance between unit vectors grows
+    monotonically with great-circle distance, so a Euclidean KD-tree
+    answers radius and nearest queries on the sphere without the
+    distortions of a lat/lon grid (poles, the antimeridian). Built once
+    per dataset; queries only touch nearby candidates, whose exact
+    haversine distances are then computed with NumPy.
+    """
+    
+    def __init__(self, latitudes, longitudes):
+        # sklearn is heavy to import; only pay for it once an index is built
+        from sklearn.neighbors import KDTree
+        
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self._tree = KDTree(unit_vectors(self.latitudes, self.longitudes)) if len(self) else None
+    
+    def __len__(self):
+        return len(self.latitudes)
+    
+    def within(self, latitude, longitude, radius_km):
+        """
+        Points within radius_km of a location.
+        
+        Returns:
+            (indices, distances_km), in no particular order
+        """
+        if self._tree is None or radius_km < 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        point = unit_vectors([latitude], [longitude])
+        candidates = self._tree.query_radius(point, r=chord_length(radius_km))[0]
+        distances = haversine_km(latitude, longitude, self.latitudes[candidates],
+                                 self.longitudes[candidates])
+        keep = distances <= radius_km
+        return candidates[keep], distances[keep]
+    
+    def nearest(self, latitude, longitude, count):
+        """
+        The count points nearest a location.
+        
+        Returns:
+            (indices, distances_km), nearest first
+        """
+        count = min(count, len(self))
+        if self._tree is None or count <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        point = unit_vectors([latitude], [longitude])
+        candidates = self._tree.query(point, k=count, return_distance=False)[0]
+        distances = haversine_km(latitude, longitude, self.latitudes[candidates],
+                                 self.longitudes[candidates])
+        order = np.argsort(distances, kind='stable')
+        return candidates[order], distances[order]
+    
+    def nearest_many(self, latitudes, longitudes, count):
+        """
+        The count points nearest each of many locations, in one tree query.
+        
+        Returns:
+            (indices, distances_km), each of shape (locations, count) with
+            every row nearest first
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        count = min(count, len(self))
+        if self._tree is None or count <= 0:
+            return (np.empty((len(latitudes), 0), dtype=np.intp),
+                    np.empty((len(latitudes), 0)))
+        candidates = self._tree.query(unit_vectors(latitudes, longitudes), k=count,
+                                      return_distance=False)
+        distances = haversine_km(latitudes[:, None], longitudes[:, None],
+                                 self.latitudes[candidates], self.longitudes[candidates])
+        order = np.argsort(distances, axis=1, kind='stable')
+        return (np.take_along_axis(candidates, order, axis=1),
+                np.take_along_axis(distances, order, axis=1))
\ No newline at end of file
@@ -0,0 +1,166 @@
+import time
+from collections import deque
+from datetime import datetime
+import numpy as np
+from models.risk_predictor import FEATURE_NAMES, RISK_LEVELS
+
+SECONDS_PER_DAY = 86400.0
+CRITICAL = RISK_LEVELS.index('CRITICAL')
+
+# Vitals with a rolling mean in trend queries
+TREND_VITALS = (
+    'heart_rate', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'bmi'
+)
+_VITAL_FEATURES = [FEATURE_NAMES.index(name) for name in TREND_VITALS]
+
+# Each user's assessments are summed into one bucket per (UTC) day.
+# offset is the time of day as a fraction of a day; keeping it separate
+# from the day number keeps the regression sums exact enough in float64
+BUCKET_COLUMNS = ('n', 'score', 'offset', 'offset_sq', 'offset_score') + TREND_VITALS
+
+def bucket_of(record):
+    """(day, bucket row) holding one assessment's contribution."""
+    days = record.created_at / SECONDS_PER_DAY
+    day = int(days)
+    offset = days - day
+    score = float(record.scores.max()) if len(record.scores) else 0.0
+    row = np.empty(len(BUCKET_COLUMNS), dtype=np.float64)
+    row[:5] = (1.0, score, offset, offset * offset, offset * score)
+    row[5:] = record.features[_VITAL_FEATURES]
+    return day, row
+
+def empty_buckets():
+    return np.empty(0, dtype=np.int64), np.empty((0, len(BUCKET_COLUMNS)))
+
+def current_day(now=None):
+    return int((time.time() if now is None else now) / SECONDS_PER_DAY)
+
+
+class TrendTotals:
+    """All-time per-user counters kept next to the day buckets."""
+    
+    __slots__ = ('assessments', 'first_at', 'last_at', 'last_critical_at')
+    
+    def __init__(self, assessments=0, first_at=None, last_at=None, last_critical_at=None):
+        self.assessments = assessments
+        self.first_at = first_at
+        self.last_at = last_at
+        self.last_critical_at = last_critical_at
+    
+    def add(self, record):
+        self.assessments += 1
+        if self.first_at is None or record.created_at < self.first_at:
+            self.first_at = record.created_at
+        if self.last_at is None or record.created_at > self.last_at:
+            self.last_at = record.created_at
+        if record.level == CRITICAL and (self.last_critical_at is None
+                                         or record.created_at > self.last_critical_at):
+            self.last_critical_at = record.created_at
+    
+    def merge(self, other):
+        """These totals plus other's, as a new TrendTotals."""
+        def first(a, b):
+            return b if a is None else a if b is None else min(a, b)
+        
+        def last(a, b):
+            return b if a is None else a if b is None else max(a, b)
+        
+        return TrendTotals(self.assessments + other.assessments,
+                           first(self.first_at, other.first_at), last(self.last_at, other.last_at),
+                           last(self.last_critical_at, other.last_critical_at))
+
+
+class TrendAggregates:
+    """
+    A user's trend state, updated in O(1) per assessment.
+    
+    Holds the all-time totals and one summed bucket per day for the last
+    max_window_days days, so a trend query reads at most that many rows
+    however long the history is.
+    """
+    
+    def __init__(self, max_window_days):
+        self.max_window_days = max_window_days
+        self.totals = TrendTotals()
+        self._days = deque()
+        self._rows = deque()
+    
+    def add(self, record):
+        self.totals.add(record)
+        day, row = bucket_of(record)
+        if self._days and self._days[-1] == day:
+            self._rows[-1] += row
+        else:
+            self._days.append(day)
+            self._rows.append(row)
+        self._expire(day)
+    
+    def buckets(self, since_day):
+        """(days, rows) of the buckets after since_day."""
+        self._expire(current_day())
+        selected = [index for index, day in enumerate(self._days) if day > since_day]
+        if not selected:
+            return empty_buckets()
+        return (np.array([self._days[index] for index in selected], dtype=np.int64),
+                np.stack([self._rows[index] for index in selected]))
+    
+    def _expire(self, today):
+        while self._days and self._days[0] <= today - self.max_window_days:
+            self._days.popleft()
+            self._rows.popleft()
+
+
+def summarize(totals, days, rows, window_days, now=None):
+    """
+    Trend statistics from the day buckets of the last window_days days.
+    
+    Returns:
+        dict with all-time counts, rolling means of TREND_VITALS, the
+        mean risk score and its least-squares slope (per day), and the
+        time since the last CRITICAL assessment
+    """
+    now = time.time() if now is None else now
+    # Days relative to the window start keep t small, so the sums below
+    # don't cancel catastrophically
+    origin = current_day(now) - window_days
+    count = score = 0.0
+    vitals = np.zeros(len(TREND_VITALS))
+    sum_t = sum_tt = sum_ty = 0.0
+    if len(days):
+        sums = rows.sum(axis=0)
+        count, score = sums[0], sums[1]
+        vitals = sums[5:]
+        # t = (day - origin) + offset, summed per bucket
+        shift = (days - origin).astype(np.float64)
+        sum_t = float(shift @ rows[:, 0] + sums[2])
+        sum_tt = float((shift * shift) @ rows[:, 0] + 2 * shift @ rows[:, 2] + sums[3])
+        sum_ty = float(shift @ rows[:, 1] + sums[4])
+    
+    slope = None
+    denominator = count * sum_tt - sum_t * sum_t
+    if count >= 2 and denominator > 1e-12:
+        slope = float((count * sum_ty - sum_t * score) / denominator)
+    
+    last_critical_at = totals.last_critical_at
+    return {
+        "window_days": window_days,
+        "assessments": totals.assessments,
+        "window_assessments": int(count),
+        "first_assessed_at": _isoformat(totals.first_at),
+        "last_assessed_at": _isoformat(totals.last_at),
+        "rolling_means": {
+            name: float(value / count) if count else None
+            for name, value in zip(TREND_VITALS, vitals.tolist())
+        },
+        "risk_score": {
+            "mean": float(score / count) if count else None,
+            "slope_per_day": slope,
+        },
+        "last_critical_at": _isoformat(last_critical_at),
+        "days_since_critical": (
+            (now - last_critical_at) / SECONDS_PER_DAY if last_critical_at is not None else None
+        ),
+    }
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
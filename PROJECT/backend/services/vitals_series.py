@@ -0,0 +1,224 @@
+import json
+import struct
+from datetime import datetime
+import numpy as np
+from models.risk_predictor import (
+    FEATURE_NAMES, HIGH_RISK_THRESHOLD, RISK_LEVELS, extract_features, get_recommendation
+)
+
+NUM_FEATURES = len(FEATURE_NAMES)
+
+# to_payload(): risk level and the byte lengths of features and scores,
+# then features, scores and the disease names
+_PAYLOAD_HEADER = struct.Struct('<BII')
+
+# Disease name tuples are interned, so every record scored by the same
+# model shares one tuple (and one encoded form in SQLite)
+_disease_sets = {}
+_disease_text = {}
+
+def intern_diseases(diseases):
+    diseases = tuple(diseases)
+    return _disease_sets.setdefault(diseases, diseases)
+
+def _disease_text_for(diseases):
+    text = json.dumps(list(diseases))
+    _disease_text.setdefault(text, diseases)
+    return text
+
+def _diseases_from_text(text):
+    diseases = _disease_text.get(text)
+    if diseases is None:
+        diseases = _disease_text.setdefault(text, intern_diseases(json.loads(text)))
+    return diseases
+
+
+class VitalsRecord:
+    """
+    One stored assessment in compact form.
+    
+    Keeps what the assessment was computed from and what it concluded:
+    the model features, the risk scores and the risk level. Everything
+    else in an assessment (high-risk diseases, primary concern,
+    recommendation) is derived from these, so to_dict() rebuilds it on
+    demand instead of keeping kilobytes of dicts per assessment.
+    """
+    
+    __slots__ = ('created_at', 'features', 'scores', 'diseases', 'level')
+    
+    def __init__(self, created_at, features, scores, diseases, level):
+        self.created_at = created_at
+        self.features = features
+        self.scores = scores
+        self.diseases = diseases
+        self.level = level
+    
+    @classmethod
+    def from_assessment(cls, assessment, created_at):
+        """Compact an assessment result (with its health_inputs)."""
+        risk_scores = assessment.get('risk_scores') or {}
+        return cls(
+            created_at,
+            np.asarray(extract_features(assessment.get('health_inputs') or {}), dtype=np.float64),
+            np.fromiter(risk_scores.values(), dtype=np.float64, count=len(risk_scores)),
+            intern_diseases(risk_scores),
+            RISK_LEVELS.index(assessment['overall_risk_level'])
+        )
+    
+    @classmethod
+    def from_row(cls, created_at, level, features, scores, diseases):
+        """Decode a row written by to_row()."""
+        return cls(created_at, np.frombuffer(features, dtype=np.float64),
+                   np.frombuffer(scores, dtype=np.float64), _diseases_from_text(diseases), level)
+    
+    def to_row(self):
+        """(level, features, scores, diseases) for a SQLite row."""
+        diseases = _disease_text_for(self.diseases)
+        return self.level, self.features.tobytes(), self.scores.tobytes(), diseases
+    
+    @classmethod
+    def from_payload(cls, created_at, payload):
+        """Decode bytes written by to_payload()."""
+        level, features_size, scores_size = _PAYLOAD_HEADER.unpack_from(payload)
+        start = _PAYLOAD_HEADER.size
+        end = start + features_size
+        return cls.from_row(created_at, level, payload[start:end],
+                            payload[end:end + scores_size], payload[end + scores_size:].decode())
+    
+    def to_payload(self):
+        """Everything but created_at as one bytes value, for sealing."""
+        level, features, scores, diseases = self.to_row()
+        return (_PAYLOAD_HEADER.pack(level, len(features), len(scores))
+                + features + scores + diseases.encode())
+    
+    def to_dict(self):
+        """Rebuild the assessment as the history API returns it."""
+        scores = self.scores.tolist()
+        high_risk_diseases = [
+            disease for disease, score in zip(self.diseases, scores)
+            if score > HIGH_RISK_THRESHOLD
+        ]
+        vitals = {
+            name: int(value) if value.is_integer() else value
+            for name, value in zip(FEATURE_NAMES, self.features.tolist())
+        }
+        vitals['smoking'] = bool(vitals['smoking'])
+        return {
+            "timestamp": datetime.fromtimestamp(self.created_at).isoformat(),
+            "overall_risk_level": RISK_LEVELS[self.level],
+            "risk_scores": dict(zip(self.diseases, scores)),
+            "high_risk_diseases": high_risk_diseases,
+            "primary_concern": self.diseases[int(np.argmax(self.scores))] if scores else None,
+            "recommendation": get_recommendation(high_risk_diseases, vitals['smoking']),
+            "vitals": vitals,
+        }
+
+
+class VitalsSeries:
+    """
+    One user's assessments as array columns, oldest first.
+    
+    Rows live in parallel numpy columns (stored time, features, risk
+    scores, risk level), about 115 bytes per row. Columns start
+    small and double up to capacity; once full, each new row overwrites
+    the oldest. Not thread-safe; the owning store locks around it.
+    """
+    
+    INITIAL_ROWS = 8
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._size = 0
+        self._head = 0
+        self.created_at = np.empty(0, dtype=np.float64)
+        self.features = np.empty((0, NUM_FEATURES), dtype=np.float64)
+        self.scores = np.empty((0, 0), dtype=np.float64)
+        self.levels = np.empty(0, dtype=np.uint8)
+        # Index into disease_sets per row; a retrained model can change them
+        self.disease_set = np.empty(0, dtype=np.uint8)
+        self.disease_sets = []
+    
+    def __len__(self):
+        return self._size
+    
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in (
+            self.created_at, self.features, self.scores, self.levels, self.disease_set
+        ))
+    
+    def append(self, record):
+        """Add a record; its created_at must not be older than the last one's."""
+        if record.diseases not in self.disease_sets:
+            self.disease_sets.append(record.diseases)
+        if self._size == len(self.created_at) and self._size < self.capacity:
+            self._resize(min(self.capacity, max(self.INITIAL_ROWS, 2 * self._size)),
+                         self.scores.shape[1])
+        if len(record.scores) > self.scores.shape[1]:
+            self._resize(len(self.created_at), len(record.scores))
+        
+        if self._size == self.capacity:
+            row = self._head
+            self._head = (self._head + 1) % self.capacity
+        else:
+            row = (self._head + self._size) % len(self.created_at)
+            self._size += 1
+        
+        self.created_at[row] = record.created_at
+        self.features[row] = record.features
+        self.scores[row] = np.nan
+        self.scores[row, :len(record.scores)] = record.scores
+        self.levels[row] = record.level
+        self.disease_set[row] = self.disease_sets.index(record.diseases)
+    
+    def last_created_at(self):
+        if not self._size:
+            return None
+        return float(self.created_at[(self._head + self._size - 1) % len(self.created_at)])
+    
+    def window(self, limit, after, before=None, earliest=False):
+        """
+        Up to limit records stored between after and before (exclusive),
+        oldest first: the earliest such records if earliest is set,
+        otherwise the latest.
+        """
+        rows = self._rows()
+        times = self.created_at[rows]
+        start = int(np.searchsorted(times, after, side='right'))
+        stop = len(rows) if before is None else int(np.searchsorted(times, before, side='left'))
+        rows = rows[start:stop]
+        rows = rows[:limit] if earliest else rows[max(len(rows) - limit, 0):]
+        return [self._record(row) for row in rows.tolist()]
+    
+    def _rows(self):
+        """Physical row indices in logical (oldest first) order."""
+        if not self._size:
+            return np.empty(0, dtype=np.intp)
+        return (self._head + np.arange(self._size)) % len(self.created_at)
+    
+    def _record(self, row):
+        diseases = self.disease_sets[self.disease_set[row]]
+        return VitalsRecord(
+            float(self.created_at[row]), self.features[row].copy(),
+            self.scores[row, :len(diseases)].copy(), diseases, int(self.levels[row])
+        )
+    
+    def _resize(self, rows, score_width):
+        """Reallocate every column, moving the oldest row to index 0."""
+        order = self._rows()
+        created_at = np.empty(rows, dtype=np.float64)
+        features = np.empty((rows, NUM_FEATURES), dtype=np.float64)
+        scores = np.full((rows, score_width), np.nan, dtype=np.float64)
+        levels = np.empty(rows, dtype=np.uint8)
+        disease_set = np.empty(rows, dtype=np.uint8)
+        
+        size = len(order)
+        created_at[:size] = self.created_at[order]
+        features[:size] = self.features[order]
+        scores[:size, :self.scores.shape[1]] = self.scores[order]
+        levels[:size] = self.levels[order]
+        disease_set[:size] = self.disease_set[order]
+        
+        self.created_at, self.features, self.scores = created_at, features, scores
+        self.levels, self.disease_set = levels, disease_set
+        self._head = 0
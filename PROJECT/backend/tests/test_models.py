@@ -1,12 +1,90 @@
 import unittest
 import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
 from pathlib import Path
+from unittest.mock import patch
+
+import joblib
+import numpy as np
+import pandas as pd
 
 # Add backend to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from models.compiled_forest import CompiledForest, round_down_to_float32
+from models.create_models import (
+    FEATURE_NAMES, ReservoirSample, sample_training_data, train_streaming,
+    write_training_csv
+)
+from models.model_format import CompiledScaler, load_model
+from models.model_registry import ACTIVE_FILE, ModelRegistry, model_file
+from models.prediction_cache import PredictionCache
+from models.risk_predictor import RiskPredictor
+from models.sweep_models import run_sweep, select_candidate
 from utils.data_validator import validate_health_data
 
+
+def make_training_data(num_samples=1500, seed=0):
+    """Synthetic features (in _extract_features order) and disease labels."""
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(18, 90, num_samples),     # age
+        rng.integers(50, 120, num_samples),    # heart_rate
+        rng.integers(90, 180, num_samples),    # blood_pressure_systolic
+        rng.integers(60, 110, num_samples),    # blood_pressure_diastolic
+        rng.uniform(17, 40, num_samples),      # bmi
+        rng.integers(0, 8, num_samples),       # exercise_frequency
+        rng.integers(0, 2, num_samples),       # smoking
+        rng.integers(0, 5, num_samples),       # symptoms count
+        rng.integers(0, 4, num_samples),       # family history count
+    ]).astype(float)
+    y = np.where(
+        X[:, 2] + rng.normal(0, 10, num_samples) > 150, 'Cardiovascular Disease',
+        np.where(
+            X[:, 4] + rng.normal(0, 2, num_samples) > 32, 'Diabetes',
+            np.where((X[:, 0] > 65) & (X[:, 6] == 1), 'Stroke Risk', 'Healthy')
+        )
+    )
+    return X, y
+
+
+def make_patients(count, seed=1):
+    """Random health-data dicts shaped like /api/health/assess payloads."""
+    rng = np.random.default_rng(seed)
+    symptoms = ['chest pain', 'fatigue', 'dizziness', 'headache']
+    return [
+        {
+            'age': int(rng.integers(18, 90)),
+            'heart_rate': int(rng.integers(50, 120)),
+            'blood_pressure_systolic': int(rng.integers(90, 180)),
+            'blood_pressure_diastolic': int(rng.integers(60, 110)),
+            'bmi': round(float(rng.uniform(17, 40)), 1),
+            'exercise_frequency': int(rng.integers(0, 8)),
+            'smoking': bool(rng.integers(0, 2)),
+            'symptoms': symptoms[:int(rng.integers(0, 5))],
+            'family_history': ['diabetes'] * int(rng.integers(0, 3)),
+        }
+        for _ in range(count)
+    ]
+
+
+def train_predictor(directory):
+    """Train a RiskPredictor on synthetic data, saving into directory."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    predictor = RiskPredictor(
+        model_path=directory / 'disease_model.pkl',
+        scaler_path=directory / 'scaler.pkl'
+    )
+    X, y = make_training_data()
+    predictor.train_model(X[:1200], y[:1200], X[1200:], y[1200:])
+    return predictor
+
+
 class TestDataValidator(unittest.TestCase):
     """Test data validation."""
     
@@ -78,5 +156,666 @@ class TestDataValidator(unittest.TestCase):
         is_valid, errors = validate_health_data(data)
         self.assertFalse(is_valid)
 
+class TestRiskPredictorBatch(unittest.TestCase):
+    """Test vectorized batch prediction."""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        cls.predictor = train_predictor(cls.model_dir)
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+    
+    def test_batch_matches_single_predictions(self):
+        """Test batch results equal per-patient predict_risk results."""
+        patients = make_patients(50)
+        batch = self.predictor.predict_risk_batch(patients)
+        
+        self.assertEqual(len(batch), len(patients))
+        for patient, result in zip(patients, batch):
+            single = self.predictor.predict_risk(patient)
+            self.assertEqual(result['overall_risk_level'], single['overall_risk_level'])
+            self.assertEqual(result['primary_concern'], single['primary_concern'])
+            self.assertEqual(result['high_risk_diseases'], single['high_risk_diseases'])
+            self.assertEqual(result['recommendation'], single['recommendation'])
+            for disease, score in single['risk_scores'].items():
+                self.assertAlmostEqual(result['risk_scores'][disease], score)
+    
+    def test_single_prediction_uses_one_forest_pass(self):
+        """Test predict_risk derives the class from predict_proba alone."""
+        patient = make_patients(1)[0]
+        features = self.predictor.scaler.transform(
+            [self.predictor._extract_features(patient)]
+        )
+        expected_class = self.predictor.model.predict(features)[0]
+        
+        with patch.object(self.predictor.model, 'predict',
+                          side_effect=AssertionError("predict() called")):
+            result = self.predictor.predict_risk(patient)
+        
+        self.assertEqual(result['primary_concern'], expected_class)
+    
+    def test_risk_level_thresholds(self):
+        """Test risk level buckets use strict greater-than boundaries."""
+        probabilities = np.array([
+            [0.3, 0.3, 0.2, 0.2],
+            [0.31, 0.29, 0.2, 0.2],
+            [0.5, 0.3, 0.1, 0.1],
+            [0.7, 0.1, 0.1, 0.1],
+            [0.71, 0.09, 0.1, 0.1],
+        ])
+        self.assertEqual(
+            self.predictor._calculate_risk_levels(probabilities),
+            ['LOW', 'MODERATE', 'MODERATE', 'HIGH', 'CRITICAL']
+        )
+    
+    def test_batch_empty(self):
+        """Test empty batch returns no results."""
+        self.assertEqual(self.predictor.predict_risk_batch([]), [])
+    
+    def test_batch_requires_trained_model(self):
+        """Test batch prediction without a model raises."""
+        predictor = RiskPredictor(
+            model_path=Path(self.model_dir) / 'missing.pkl',
+            scaler_path=Path(self.model_dir) / 'missing_scaler.pkl'
+        )
+        with self.assertRaises(RuntimeError):
+            predictor.predict_risk_batch(make_patients(2))
+
+class TestCompiledForest(unittest.TestCase):
+    """Test the flat-array forest evaluator."""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        cls.predictor = train_predictor(cls.model_dir)
+        cls.compiled = CompiledForest.from_sklearn(cls.predictor.model)
+        X, _ = make_training_data(num_samples=500, seed=7)
+        cls.X_scaled = cls.predictor.scaler.transform(X)
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+    
+    def test_probabilities_match_sklearn_exactly(self):
+        """Test compiled probabilities are bit-for-bit equal to sklearn's."""
+        np.testing.assert_array_equal(
+            self.compiled.predict_proba(self.X_scaled),
+            self.predictor.model.predict_proba(self.X_scaled)
+        )
+    
+    def test_single_row_matches_sklearn_exactly(self):
+        """Test the single-row fast path against sklearn."""
+        for row in self.X_scaled[:50]:
+            np.testing.assert_array_equal(
+                self.compiled.predict_proba(row[np.newaxis]),
+                self.predictor.model.predict_proba(row[np.newaxis])
+            )
+    
+    def test_predict_matches_sklearn(self):
+        """Test compiled class labels match sklearn."""
+        np.testing.assert_array_equal(
+            self.compiled.predict(self.X_scaled),
+            self.predictor.model.predict(self.X_scaled)
+        )
+    
+    def test_compiled_backend_predictions(self):
+        """Test RiskPredictor results are unchanged by the compiled backend."""
+        compiled_predictor = RiskPredictor(
+            model_path=self.predictor.model_path,
+            scaler_path=self.predictor.scaler_path,
+            backend='compiled'
+        )
+        self.assertIsNotNone(compiled_predictor.compiled_model)
+        
+        for patient in make_patients(20, seed=3):
+            self.assertEqual(
+                compiled_predictor.predict_risk(patient),
+                self.predictor.predict_risk(patient)
+            )
+    
+    def test_unknown_backend_rejected(self):
+        """Test an unknown inference backend raises ValueError."""
+        with self.assertRaises(ValueError):
+            RiskPredictor(backend='onnx')
+
+class TestBinaryModelFormat(unittest.TestCase):
+    """Test the compact memory-mapped model export."""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = Path(tempfile.mkdtemp())
+        cls.predictor = train_predictor(cls.model_dir)
+        cls.binary_path = cls.model_dir / 'disease_model.rfm'
+        X, _ = make_training_data(num_samples=500, seed=7)
+        cls.X = X
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+    
+    def test_training_writes_binary_export(self):
+        """Test train_model exports the binary format next to the pickle."""
+        self.assertTrue(self.binary_path.exists())
+        self.assertLess(self.binary_path.stat().st_size,
+                        self.predictor.model_path.stat().st_size)
+    
+    def test_predictions_bit_for_bit_equal(self):
+        """Test mapped model and scaler reproduce sklearn exactly."""
+        forest, scaler = load_model(self.binary_path)
+        X_scaled = self.predictor.scaler.transform(self.X)
+        
+        np.testing.assert_array_equal(scaler.transform(self.X), X_scaled)
+        np.testing.assert_array_equal(
+            forest.predict_proba(X_scaled), self.predictor.model.predict_proba(X_scaled)
+        )
+        for row in X_scaled[:20]:
+            np.testing.assert_array_equal(
+                forest.predict_proba(row[np.newaxis]),
+                self.predictor.model.predict_proba(row[np.newaxis])
+            )
+        np.testing.assert_array_equal(forest.classes_, self.predictor.model.classes_)
+    
+    def test_arrays_are_compact_read_only_maps(self):
+        """Test arrays are float32/int32 views of the mapped file."""
+        forest, scaler = load_model(self.binary_path)
+        self.assertEqual(forest.threshold.dtype, np.float32)
+        self.assertEqual(forest.children.dtype, np.int32)
+        self.assertEqual(forest.feature.dtype, np.int32)
+        for array in (forest.threshold, forest.children, forest.value, scaler.mean_):
+            self.assertFalse(array.flags.writeable)
+            while array.base is not None and not isinstance(array, np.memmap):
+                array = array.base
+            self.assertIsInstance(array, np.memmap)
+    
+    def test_rounded_thresholds_keep_split_decisions(self):
+        """Test x <= threshold is unchanged by rounding thresholds to float32."""
+        rng = np.random.default_rng(0)
+        thresholds = rng.normal(0, 3, 5000)
+        rounded = round_down_to_float32(thresholds)
+        x = thresholds.astype(np.float32)
+        for candidates in (x, np.nextafter(x, np.float32(np.inf)),
+                           np.nextafter(x, np.float32(-np.inf))):
+            np.testing.assert_array_equal(candidates <= thresholds, candidates <= rounded)
+    
+    def test_predictor_serves_binary_model(self):
+        """Test RiskPredictor results match when serving the binary file."""
+        registry = ModelRegistry()
+        binary_predictor = RiskPredictor(
+            model_path=self.binary_path, scaler_path=self.predictor.scaler_path,
+            registry=registry
+        )
+        self.assertIsInstance(binary_predictor.scaler, CompiledScaler)
+        self.assertIsInstance(binary_predictor.model, CompiledForest)
+        
+        patients = make_patients(20, seed=3)
+        for patient in patients:
+            self.assertEqual(binary_predictor.predict_risk(patient),
+                             self.predictor.predict_risk(patient))
+        self.assertEqual(binary_predictor.predict_risk_batch(patients),
+                         self.predictor.predict_risk_batch(patients))
+        self.assertEqual(registry.loads, 1)
+    
+    def test_backend_picks_model_file(self):
+        """Test only the compiled backend prefers the binary export."""
+        self.assertEqual(model_file(self.model_dir, binary=True), self.binary_path)
+        self.assertEqual(model_file(self.model_dir, binary=False), self.predictor.model_path)
+        with tempfile.TemporaryDirectory() as directory:
+            only_binary = Path(directory) / 'disease_model.rfm'
+            shutil.copy(self.binary_path, only_binary)
+            self.assertEqual(model_file(directory, binary=False), only_binary)
+    
+    def test_large_batches_use_pickled_forest(self):
+        """Test batches past COMPILED_MAX_ROWS go to sklearn next to a binary model."""
+        binary_predictor = RiskPredictor(
+            model_path=self.binary_path, scaler_path=self.predictor.scaler_path,
+            backend='compiled', registry=ModelRegistry()
+        )
+        patients = make_patients(RiskPredictor.COMPILED_MAX_ROWS + 1, seed=4)
+        lazy = binary_predictor.load().sklearn_model
+        
+        self.assertIsNone(lazy._model)
+        self.assertEqual(binary_predictor.predict_risk_batch(patients),
+                         self.predictor.predict_risk_batch(patients))
+        self.assertIsNotNone(lazy._model)
+    
+    def test_invalid_file_rejected(self):
+        """Test a file that isn't a binary model raises ValueError."""
+        with self.assertRaises(ValueError):
+            load_model(self.predictor.model_path)
+
+class TestEarlyExit(unittest.TestCase):
+    """Test early-exit risk-level classification."""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        cls.predictor = train_predictor(cls.model_dir)
+        cls.compiled = CompiledForest.from_sklearn(cls.predictor.model)
+        X, _ = make_training_data(num_samples=1000, seed=11)
+        cls.X_scaled = cls.predictor.scaler.transform(X)
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+    
+    def test_buckets_match_full_evaluation(self):
+        """Test early exit never changes the bucket."""
+        thresholds = (0.3, 0.5, 0.7)
+        expected = np.searchsorted(
+            thresholds, self.predictor.model.predict_proba(self.X_scaled).max(axis=1), side='left'
+        )
+        for block_size in (1, 7, 20, 100):
+            buckets, trees = self.compiled.predict_bucket(self.X_scaled, thresholds, block_size)
+            np.testing.assert_array_equal(buckets, expected)
+            self.assertTrue(np.all(trees <= self.compiled.n_trees))
+        
+        buckets, trees = self.compiled.predict_bucket(self.X_scaled, thresholds, 1)
+        self.assertLess(trees.mean(), self.compiled.n_trees)
+    
+    def test_single_row_matches_full_evaluation(self):
+        """Test the single-row path of early exit."""
+        for row in self.X_scaled[:30]:
+            buckets, _ = self.compiled.predict_bucket(row[np.newaxis], (0.3, 0.5, 0.7), 5)
+            expected = np.searchsorted(
+                (0.3, 0.5, 0.7), self.predictor.model.predict_proba(row[np.newaxis]).max(), side='left'
+            )
+            self.assertEqual(buckets[0], expected)
+    
+    def test_predict_risk_levels(self):
+        """Test risk levels match predict_risk and report trees evaluated."""
+        predictor = RiskPredictor(
+            model_path=self.predictor.model_path, scaler_path=self.predictor.scaler_path,
+            backend='compiled', registry=ModelRegistry()
+        )
+        patients = make_patients(50, seed=4)
+        results = predictor.predict_risk_levels(patients)
+        
+        self.assertEqual(
+            [result['overall_risk_level'] for result in results],
+            [result['overall_risk_level'] for result in predictor.predict_risk_batch(patients)]
+        )
+        for result in results:
+            self.assertEqual(result['total_trees'], 100)
+            self.assertLessEqual(result['trees_evaluated'], 100)
+    
+    def test_sklearn_backend_evaluates_every_tree(self):
+        """Test the sklearn backend falls back to a full evaluation."""
+        results = self.predictor.predict_risk_levels(make_patients(5))
+        self.assertTrue(all(result['trees_evaluated'] == 100 for result in results))
+        self.assertEqual(self.predictor.predict_risk_levels([]), [])
+
+class TestPredictionCache(unittest.TestCase):
+    """Test the LRU/TTL prediction cache."""
+    
+    def test_hit_and_miss_counters(self):
+        """Test hits and misses are counted."""
+        cache = PredictionCache(max_size=10)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        
+        stats = cache.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+    
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted first."""
+        cache = PredictionCache(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+    
+    def test_ttl_expiry(self):
+        """Test entries expire after the TTL."""
+        cache = PredictionCache(max_size=10, ttl_seconds=0.01)
+        cache.put('a', 1)
+        time.sleep(0.02)
+        
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get_stats()['expirations'], 1)
+
+
+class TestRiskPredictorCache(unittest.TestCase):
+    """Test prediction caching in RiskPredictor."""
+    
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        trained = train_predictor(self.model_dir)
+        self.predictor = RiskPredictor(
+            model_path=trained.model_path,
+            scaler_path=trained.scaler_path,
+            cache_size=100
+        )
+        self.predictor.MODEL_CHECK_INTERVAL = 0
+    
+    def tearDown(self):
+        shutil.rmtree(self.model_dir, ignore_errors=True)
+    
+    def test_repeat_prediction_skips_inference(self):
+        """Test a repeated payload is served from the cache."""
+        patient = make_patients(1)[0]
+        first = self.predictor.predict_risk(patient)
+        
+        with patch.object(self.predictor, '_predict_proba',
+                          side_effect=AssertionError("inference ran")):
+            second = self.predictor.predict_risk(dict(patient))
+        
+        self.assertEqual(first, second)
+        self.assertEqual(self.predictor.cache.get_stats()['hits'], 1)
+    
+    def test_cached_result_is_not_shared(self):
+        """Test mutating a returned result doesn't corrupt the cache."""
+        patient = make_patients(1)[0]
+        first = self.predictor.predict_risk(patient)
+        first['timestamp'] = 'now'
+        first['risk_scores'].clear()
+        
+        second = self.predictor.predict_risk(patient)
+        self.assertNotIn('timestamp', second)
+        self.assertTrue(second['risk_scores'])
+    
+    def test_batch_uses_cache_for_repeats(self):
+        """Test batch prediction only scores uncached rows."""
+        patients = make_patients(10)
+        self.predictor.predict_risk_batch(patients[:5])
+        results = self.predictor.predict_risk_batch(patients)
+        
+        self.assertEqual(len(results), 10)
+        self.assertEqual(self.predictor.cache.get_stats()['hits'], 5)
+        self.assertEqual(results[7], self.predictor.predict_risk(patients[7]))
+    
+    def test_model_file_change_invalidates_cache(self):
+        """Test touching the model file drops cached results."""
+        patient = make_patients(1)[0]
+        self.predictor.predict_risk(patient)
+        
+        stat = os.stat(self.predictor.model_path)
+        os.utime(self.predictor.model_path,
+                 ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.predictor.predict_risk(patient)
+        
+        stats = self.predictor.cache.get_stats()
+        self.assertEqual(stats['invalidations'], 1)
+        self.assertEqual(stats['hits'], 0)
+
+class TestModelRegistry(unittest.TestCase):
+    """Test the shared model registry."""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        cls.trained = train_predictor(cls.model_dir)
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+    
+    def _predictor(self, registry, **kwargs):
+        return RiskPredictor(
+            model_path=self.trained.model_path,
+            scaler_path=self.trained.scaler_path,
+            registry=registry,
+            **kwargs
+        )
+    
+    def test_model_loaded_once_per_process(self):
+        """Test predictors for the same files share one loaded model."""
+        registry = ModelRegistry()
+        first = self._predictor(registry)
+        second = self._predictor(registry, backend='compiled')
+        
+        self.assertIs(first.model, second.model)
+        self.assertIs(first.scaler, second.scaler)
+        self.assertIsNotNone(second.compiled_model)
+        self.assertEqual(registry.loads, 1)
+    
+    def test_model_loaded_lazily(self):
+        """Test the model is loaded on first use, not at construction."""
+        registry = ModelRegistry()
+        predictor = self._predictor(registry)
+        self.assertEqual(registry.loads, 0)
+        
+        self.assertTrue(predictor.warmup())
+        self.assertEqual(registry.loads, 1)
+        self.assertIn('overall_risk_level', predictor.predict_risk(make_patients(1)[0]))
+        self.assertEqual(registry.loads, 1)
+    
+    def test_warmup_without_model(self):
+        """Test warmup reports a missing model instead of raising."""
+        predictor = RiskPredictor(
+            model_path=Path(self.model_dir) / 'missing.pkl',
+            scaler_path=Path(self.model_dir) / 'missing_scaler.pkl',
+            registry=ModelRegistry()
+        )
+        self.assertFalse(predictor.warmup())
+        self.assertIsNone(predictor.model)
+    
+    def test_handle_is_read_only(self):
+        """Test registry handles can't be reassigned."""
+        registry = ModelRegistry()
+        handle = registry.get(self.trained.model_path, self.trained.scaler_path)
+        with self.assertRaises(AttributeError):
+            handle.model = None
+    
+    def test_memory_mapped_predictions_match(self):
+        """Test a memory-mapped load predicts like the trained model."""
+        predictor = self._predictor(ModelRegistry())
+        for patient in make_patients(10):
+            self.assertEqual(
+                predictor.predict_risk(patient),
+                self.trained.predict_risk(patient)
+            )
+    
+    def test_refresh_without_changes_keeps_handle(self):
+        """Test refresh doesn't reload unchanged files."""
+        registry = ModelRegistry()
+        handle = registry.get(self.trained.model_path, self.trained.scaler_path)
+        refreshed = registry.refresh(self.trained.model_path, self.trained.scaler_path)
+        
+        self.assertIs(handle, refreshed)
+        self.assertEqual(registry.loads, 1)
+    
+    def test_missing_files_raise(self):
+        """Test loading missing files raises FileNotFoundError."""
+        with self.assertRaises(FileNotFoundError):
+            ModelRegistry().get(Path(self.model_dir) / 'nope.pkl',
+                                Path(self.model_dir) / 'nope_scaler.pkl')
+
+class TestModelVersions(unittest.TestCase):
+    """Test versioned model directories and hot-swapping."""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = Path(tempfile.mkdtemp())
+        train_predictor(cls.model_dir / 'v1')
+        train_predictor(cls.model_dir / 'v2')
+    
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+    
+    def tearDown(self):
+        (self.model_dir / ACTIVE_FILE).unlink(missing_ok=True)
+    
+    def test_latest_version_served_by_default(self):
+        """Test the highest-sorting version is activated."""
+        predictor = RiskPredictor(model_dir=self.model_dir, registry=ModelRegistry())
+        self.assertEqual(predictor.version, 'v2')
+        self.assertIn('overall_risk_level', predictor.predict_risk(make_patients(1)[0]))
+    
+    def test_active_pointer_selects_version(self):
+        """Test the ACTIVE file pins a version."""
+        (self.model_dir / ACTIVE_FILE).write_text('v1')
+        predictor = RiskPredictor(model_dir=self.model_dir, registry=ModelRegistry())
+        self.assertEqual(predictor.version, 'v1')
+    
+    def test_swap_updates_all_subscribers(self):
+        """Test a swap reaches every predictor sharing the directory."""
+        registry = ModelRegistry()
+        first = RiskPredictor(model_dir=self.model_dir, registry=registry)
+        second = RiskPredictor(model_dir=self.model_dir, registry=registry,
+                               backend='compiled')
+        
+        registry.versions(self.model_dir).swap('v1')
+        
+        self.assertEqual(first.version, 'v1')
+        self.assertEqual(second.version, 'v1')
+        self.assertIsNotNone(second.compiled_model)
+    
+    def test_in_flight_request_finishes_on_old_version(self):
+        """Test a request running during a swap keeps its model version."""
+        registry = ModelRegistry()
+        predictor = RiskPredictor(model_dir=self.model_dir, registry=registry)
+        started, release = threading.Event(), threading.Event()
+        used_versions = []
+        original = predictor._predict_proba
+        
+        def slow_predict_proba(handle, features_scaled):
+            used_versions.append(handle.version)
+            started.set()
+            release.wait(5)
+            return original(handle, features_scaled)
+        
+        predictor._predict_proba = slow_predict_proba
+        request = threading.Thread(
+            target=predictor.predict_risk, args=(make_patients(1)[0],)
+        )
+        request.start()
+        started.wait(5)
+        
+        registry.versions(self.model_dir).swap('v1')
+        release.set()
+        request.join(5)
+        
+        self.assertEqual(used_versions, ['v2'])
+        self.assertEqual(predictor.version, 'v1')
+    
+    def test_unknown_version_rejected(self):
+        """Test swapping to a missing version raises ValueError."""
+        manager = ModelRegistry().versions(self.model_dir)
+        with self.assertRaises(ValueError):
+            manager.swap('../v1')
+    
+    def test_check_for_update_follows_pointer(self):
+        """Test the watcher check swaps when ACTIVE changes."""
+        registry = ModelRegistry()
+        predictor = RiskPredictor(model_dir=self.model_dir, registry=registry)
+        manager = registry.versions(self.model_dir)
+        predictor.load()
+        
+        self.assertFalse(manager.check_for_update())
+        (self.model_dir / ACTIVE_FILE).write_text('v1')
+        self.assertTrue(manager.check_for_update())
+        self.assertEqual(predictor.version, 'v1')
+
+class TestStreamingTraining(unittest.TestCase):
+    """Test the chunked training pipeline."""
+    
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.data_path = self.work_dir / 'training_data.csv'
+        write_training_csv(self.data_path, 3000, chunk_size=700)
+    
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+    
+    def test_reservoir_bounded_and_drawn_from_stream(self):
+        """Test the reservoir keeps at most capacity rows, all from the stream."""
+        sample = ReservoirSample(100, 1, seed=0)
+        for start in range(0, 5000, 300):
+            rows = np.arange(start, min(start + 300, 5000), dtype=float)
+            sample.add(rows[:, None], rows.astype(str))
+        
+        X, y = sample.arrays()
+        self.assertEqual(len(X), 100)
+        self.assertEqual(sample.seen, 5000)
+        self.assertEqual(len(set(X[:, 0])), 100)
+        self.assertTrue(np.all((X[:, 0] >= 0) & (X[:, 0] < 5000)))
+        np.testing.assert_array_equal(y, X[:, 0].astype(str))
+        # A uniform sample isn't stuck on the first rows of the stream
+        self.assertGreater(X[:, 0].mean(), 1000)
+    
+    def test_scaler_fitted_on_every_row(self):
+        """Test the incremental scaler matches one fitted on the whole file."""
+        report = train_streaming(self.data_path, self.work_dir, chunk_size=500,
+                                 sample_size=1000, test_size=200)
+        
+        scaler = joblib.load(self.work_dir / 'scaler.pkl')
+        data = pd.read_csv(self.data_path)[FEATURE_NAMES].to_numpy(dtype=float)
+        np.testing.assert_allclose(scaler.mean_, data.mean(axis=0))
+        np.testing.assert_allclose(scaler.scale_, data.std(axis=0))
+        
+        self.assertEqual(report['rows'], 3000)
+        self.assertEqual(report['chunks'], 6)
+        self.assertEqual(report['train_rows'], 1000)
+        self.assertEqual(report['test_rows'], 200)
+        self.assertGreater(report['peak_rss_mb'], 0)
+    
+    def test_trained_model_serves_predictions(self):
+        """Test the saved model loads into RiskPredictor."""
+        report = train_streaming(self.data_path, self.work_dir, chunk_size=500,
+                                 sample_size=2000, test_size=500)
+        self.assertGreater(report['accuracy'], 0.6)
+        
+        predictor = RiskPredictor(
+            model_path=self.work_dir / 'disease_model.pkl',
+            scaler_path=self.work_dir / 'scaler.pkl',
+            registry=ModelRegistry()
+        )
+        result = predictor.predict_risk(make_patients(1)[0])
+        self.assertIn(result['primary_concern'], predictor.model.classes_.tolist())
+
+class TestHyperparameterSweep(unittest.TestCase):
+    """Test latency-aware model selection."""
+    
+    def test_smallest_model_within_tolerance_selected(self):
+        """Test selection trades a little accuracy for a smaller model."""
+        candidates = [
+            {'accuracy': 0.90, 'model_bytes': 5000, 'single_row_p50_us': 900},
+            {'accuracy': 0.897, 'model_bytes': 1000, 'single_row_p50_us': 300},
+            {'accuracy': 0.80, 'model_bytes': 100, 'single_row_p50_us': 100},
+        ]
+        self.assertIs(select_candidate(candidates, 0.005), candidates[1])
+        self.assertIs(select_candidate(candidates, 0.0), candidates[0])
+    
+    def test_sweep_saves_selected_model(self):
+        """Test a small sweep reports every candidate and saves the pick."""
+        work_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, work_dir, True)
+        write_training_csv(work_dir / 'training_data.csv', 2000)
+        data = sample_training_data(work_dir / 'training_data.csv',
+                                    sample_size=1500, test_size=500)
+        
+        report = run_sweep(
+            data, work_dir / 'out',
+            {'n_estimators': [5, 10], 'max_depth': [4], 'max_features': ['sqrt']},
+            tolerance=1.0, workers=2, repeats=5, batch_size=50
+        )
+        
+        self.assertEqual(len(report['candidates']), 2)
+        for candidate in report['candidates']:
+            for key in ('accuracy', 'model_bytes', 'load_ms', 'single_row_p50_us',
+                        'compiled_single_row_p50_us', 'batch_ms'):
+                self.assertIn(key, candidate)
+        # With an unlimited tolerance the smaller forest wins
+        self.assertEqual(report['selected']['params']['n_estimators'], 5)
+        self.assertTrue((work_dir / 'out' / 'sweep_report.json').exists())
+        
+        predictor = RiskPredictor(
+            model_path=work_dir / 'out' / 'disease_model.pkl',
+            scaler_path=work_dir / 'out' / 'scaler.pkl',
+            registry=ModelRegistry()
+        )
+        self.assertEqual(len(predictor.model.estimators_), 5)
+        self.assertIn('overall_risk_level', predictor.predict_risk(make_patients(1)[0]))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,11 +1,21 @@
+import os
 import unittest
 import sys
 import json
+import subprocess
+import tempfile
 from pathlib import Path
+from unittest.mock import patch
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Keep the suite from writing assessments to the configured database
+os.environ.setdefault('HISTORY_BACKEND', 'memory')
+
 from app import app
+from config import Config
+from routes import health_assessment
+from services.history_store import MemoryHistoryStore
 
 class TestHealthRoutes(unittest.TestCase):
     """Test health assessment routes."""
@@ -22,6 +32,15 @@ class TestHealthRoutes(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.data)
         self.assertEqual(data['status'], 'healthy')
+        self.assertIn('model_version', data)
+    
+    def test_health_check_does_not_load_model(self):
+        """Test the liveness probe answers without loading the model."""
+        predictor = health_assessment.prediction_service.predictor
+        with patch.object(predictor, 'load', side_effect=AssertionError("model loaded")), \
+                patch.object(predictor, '_handle', None), patch.object(predictor, '_loaded', False):
+            response = self.client.get('/health')
+        self.assertEqual(response.status_code, 200)
     
     def test_api_docs(self):
         """Test API documentation endpoint."""
@@ -29,6 +48,263 @@ class TestHealthRoutes(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.data)
         self.assertIn('endpoints', data)
+    
+    def test_inference_metrics(self):
+        """Test inference metrics endpoint."""
+        response = self.client.get('/api/health/metrics')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertIn('backend', data)
+        self.assertIn('coalescer', data)
+    
+    def test_batch_assess_requires_list(self):
+        """Test batch assessment rejects a missing assessments list."""
+        response = self.client.post('/api/health/assess/batch', json={})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_batch_assess_reports_invalid_entries(self):
+        """Test batch assessment reports validation errors by index."""
+        valid = {
+            'age': 45,
+            'heart_rate': 78,
+            'blood_pressure_systolic': 125,
+            'blood_pressure_diastolic': 82,
+            'bmi': 26.5
+        }
+        invalid = dict(valid, age=200)
+        response = self.client.post(
+            '/api/health/assess/batch',
+            json={'assessments': [valid, invalid]}
+        )
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(response.data)
+        self.assertIn('1', data['details'])
+        self.assertNotIn('0', data['details'])
+    
+    def test_risk_level_rejects_invalid_data(self):
+        """Test the early-exit risk level endpoint validates input."""
+        response = self.client.post('/api/health/assess/risk-level', json={'age': 200})
+        self.assertEqual(response.status_code, 400)
+
+def make_assessment(age, risk_level='LOW'):
+    """An assessment result as PredictionService stores it."""
+    return {
+        'overall_risk_level': risk_level,
+        'risk_scores': {'Cardiovascular Disease': 0.2, 'Diabetes': 0.1,
+                        'Healthy': 0.6, 'Stroke Risk': 0.1},
+        'health_inputs': {'age': age, 'heart_rate': 72, 'bmi': 24.5, 'smoking': True,
+                          'symptoms': ['fatigue'], 'user_id': 'user1'},
+    }
+
+
+def ages(assessments):
+    return [assessment['vitals']['age'] for assessment in assessments]
+
+
+class TestHistoryRoutes(unittest.TestCase):
+    """Test paginated and streamed assessment history."""
+    
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.store = MemoryHistoryStore()
+        for index in range(5):
+            self.store.add('user1', make_assessment(index))
+        patcher = patch.object(health_assessment.prediction_service, 'assessment_history', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def _get(self, query=''):
+        response = self.client.get(f'/api/health/history/user1{query}')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+    
+    def test_latest_page(self):
+        """Test the default page holds the latest assessments, oldest first."""
+        data = self._get('?limit=2')
+        self.assertEqual(ages(data['assessments']), [3, 4])
+        self.assertTrue(data['has_more'])
+    
+    def test_cursor_pagination(self):
+        """Test paging back with before and forward with after."""
+        latest = self._get('?limit=2')
+        older = self._get(f"?limit=2&before={latest['cursors']['before']}")
+        self.assertEqual(ages(older['assessments']), [1, 2])
+        oldest = self._get(f"?limit=2&before={older['cursors']['before']}")
+        self.assertEqual(ages(oldest['assessments']), [0])
+        self.assertFalse(oldest['has_more'])
+        
+        newer = self._get(f"?limit=3&after={oldest['cursors']['after']}")
+        self.assertEqual(ages(newer['assessments']), [1, 2, 3])
+        self.assertTrue(newer['has_more'])
+    
+    def test_ndjson_stream(self):
+        """Test the NDJSON mode streams every assessment with its cursor."""
+        response = self.client.get('/api/health/history/user1?format=ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual(ages(line['assessment'] for line in lines), list(range(5)))
+        
+        after = lines[1]['cursor']
+        response = self.client.get(f'/api/health/history/user1?format=ndjson&after={after}&limit=2')
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual(ages(line['assessment'] for line in lines), [2, 3])
+    
+    def test_invalid_parameters(self):
+        """Test bad cursors and page sizes are rejected."""
+        self.assertEqual(self.client.get('/api/health/history/user1?before=yesterday').status_code, 400)
+        self.assertEqual(self.client.get('/api/health/history/user1?limit=0').status_code, 400)
+        for query in ('limit=abc', 'limit=2.5', 'format=ndjson&limit=0',
+                      'format=ndjson&limit=-3', 'format=ndjson&limit=abc'):
+            self.assertEqual(self.client.get(f'/api/health/history/user1?{query}').status_code, 400)
+    
+    def test_trends(self):
+        """Test the trends endpoint and its window bounds."""
+        response = self.client.get('/api/health/trends/user1?window=7')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['user_id'], 'user1')
+        self.assertEqual(data['window_days'], 7)
+        self.assertEqual(data['window_assessments'], 5)
+        self.assertEqual(self.client.get('/api/health/trends/user1?window=0').status_code, 400)
+
+class TestHospitalRoutes(unittest.TestCase):
+    """Test hospital search routes."""
+    
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+    
+    def test_metrics_report_cache(self):
+        """Test repeated nearby searches show up as cache hits."""
+        body = {"latitude": 40.7128, "longitude": -74.0060, "radius_km": 15}
+        for _ in range(2):
+            response = self.client.post('/api/hospitals/nearby', json=body)
+            self.assertEqual(response.status_code, 200)
+        
+        data = json.loads(self.client.get('/api/hospitals/metrics').data)
+        self.assertEqual(data['hospitals'], 3)
+        self.assertGreaterEqual(data['cache']['hits'], 1)
+
+    def test_nearest_batch_streams_ndjson(self):
+        """Test the batch endpoint streams one line per origin, in order."""
+        body = {"origins": [{"latitude": 40.7128, "longitude": -74.0060}, [40.7050, -74.0080]],
+                "count": 2}
+        response = self.client.post('/api/hospitals/nearest/batch', json=body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual([line['index'] for line in lines], [0, 1])
+        self.assertEqual([h['id'] for h in lines[1]['hospitals']], [3, 1])
+        self.assertTrue(all(len(line['hospitals']) == 2 for line in lines))
+    
+    def test_nearest_batch_rejects_bad_origins(self):
+        """Test invalid origins are reported per index before streaming."""
+        response = self.client.post('/api/hospitals/nearest/batch',
+                                    json={"origins": [[40.7, -74.0], [95, 0], "here"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(json.loads(response.data)['details']), {'1', '2'})
+        self.assertEqual(self.client.post('/api/hospitals/nearest/batch',
+                                          json={"origins": []}).status_code, 400)
+        self.assertEqual(self.client.post('/api/hospitals/nearest/batch',
+                                          json={"origins": [[0, 0]], "count": 0}).status_code, 400)
+        for options in ({"specialty": 5}, {"specialty": ["Emergency"]}, {"count": True}):
+            response = self.client.post('/api/hospitals/nearest/batch',
+                                        json={"origins": [[40.7, -74.0]], **options})
+            self.assertEqual(response.status_code, 400)
+    
+    def test_nearby_rejects_unavailable_ranking(self):
+        """Test unknown rankings, or travel time without a road graph, are 400s."""
+        body = {"latitude": 40.7128, "longitude": -74.0060}
+        for ranking in ('fastest', 'travel_time'):
+            response = self.client.post('/api/hospitals/nearby', json={**body, "ranking": ranking})
+            self.assertEqual(response.status_code, 400)
+    
+    def test_availability_update(self):
+        """Test feeds push bed counts that searches then report."""
+        body = {"updates": [{"id": 2, "beds_available": 8, "icu_beds_available": 0}]}
+        with patch.object(Config, 'ADMIN_TOKEN', None):
+            response = self.client.post('/api/hospitals/availability', json=body)
+            self.assertEqual(response.status_code, 403)
+        
+        with patch.object(Config, 'ADMIN_TOKEN', 'secret'):
+            headers = {'X-Admin-Token': 'secret'}
+            response = self.client.post('/api/hospitals/availability', json=body, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data)['applied'], 1)
+            
+            bad = {"updates": [{"id": 2, "beds_available": -1}]}
+            response = self.client.post('/api/hospitals/availability', json=bad, headers=headers)
+            self.assertEqual(response.status_code, 400)
+        
+        response = self.client.post('/api/hospitals/nearby',
+                                    json={"latitude": 40.7185, "longitude": -74.0060})
+        hospital = json.loads(response.data)['hospitals'][0]
+        self.assertEqual((hospital['id'], hospital['availability']['beds']), (2, 8))
+
+class TestAdminRoutes(unittest.TestCase):
+    """Test model administration routes."""
+    
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.headers = {'X-Admin-Token': 'secret'}
+    
+    def test_swap_forbidden_without_token(self):
+        """Test admin routes are disabled when no token is configured."""
+        with patch.object(Config, 'ADMIN_TOKEN', None):
+            response = self.client.post('/api/admin/models/swap',
+                                        json={'version': 'v1'}, headers=self.headers)
+        self.assertEqual(response.status_code, 403)
+    
+    def test_swap_forbidden_with_wrong_token(self):
+        """Test a wrong admin token is rejected."""
+        with patch.object(Config, 'ADMIN_TOKEN', 'secret'):
+            response = self.client.post('/api/admin/models/swap',
+                                        json={'version': 'v1'},
+                                        headers={'X-Admin-Token': 'wrong'})
+        self.assertEqual(response.status_code, 403)
+    
+    def test_swap_requires_model_dir(self):
+        """Test swapping without a versioned model directory."""
+        with patch.object(Config, 'ADMIN_TOKEN', 'secret'), \
+                patch.object(Config, 'MODEL_DIR', None):
+            response = self.client.post('/api/admin/models/swap',
+                                        json={'version': 'v1'}, headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+    
+    def test_swap_unknown_version(self):
+        """Test swapping to a version that doesn't exist."""
+        with tempfile.TemporaryDirectory() as model_dir, \
+                patch.object(Config, 'ADMIN_TOKEN', 'secret'), \
+                patch.object(Config, 'MODEL_DIR', model_dir):
+            listing = self.client.get('/api/admin/models', headers=self.headers)
+            response = self.client.post('/api/admin/models/swap',
+                                        json={'version': 'v1'}, headers=self.headers)
+        
+        self.assertEqual(listing.status_code, 200)
+        self.assertEqual(json.loads(listing.data)['versions'], [])
+        self.assertEqual(response.status_code, 400)
+
+class TestStartup(unittest.TestCase):
+    """Test that importing the app stays cheap."""
+    
+    def test_app_import_skips_heavy_dependencies(self):
+        """Test sklearn, joblib and pandas load lazily, not at app import."""
+        code = (
+            "import sys, app; "
+            "print(sorted(m for m in ('sklearn', 'joblib', 'pandas') "
+            "if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=Path(__file__).parent.parent,
+            capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.strip().splitlines()[-1], '[]')
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
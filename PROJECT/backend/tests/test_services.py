@@ -3,8 +3,18 @@ Comprehensive test suite for backend services.
 Tests prediction_service, geolocation_service, and notification_service.
 """
 
+import os
 import unittest
 import json
+import sqlite3
+import tempfile
+import threading
+import time
+import random
+from datetime import datetime
+import numpy as np
+from haversine import haversine
+from cryptography.exceptions import InvalidTag
 from unittest.mock import Mock, patch, MagicMock
 from pathlib import Path
 import sys
@@ -12,9 +22,18 @@ import sys
 # Add backend to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Keep the suite from writing assessments to the configured database
+os.environ.setdefault('HISTORY_BACKEND', 'memory')
+
 from services.prediction_service import PredictionService
 from services.geolocation_service import GeoLocationService
+from services.geo_cache import GeoQueryCache, geohash_cell, radius_bucket
+from services.road_graph import RoadGraph, load_road_graph
 from services.notification_service import NotificationService
+from services.history_store import MemoryHistoryStore, SQLiteHistoryStore, sqlite_path
+from services.vitals_series import VitalsRecord, VitalsSeries
+from services.request_coalescer import RequestCoalescer
+from utils.encryption import EncryptionService
 
 
 class TestPredictionService(unittest.TestCase):
@@ -22,7 +41,7 @@ class TestPredictionService(unittest.TestCase):
     
     def setUp(self):
         """Set up test fixtures."""
-        self.service = PredictionService()
+        self.service = PredictionService(history_store=MemoryHistoryStore())
     
     def test_service_initialization(self):
         """Test service initializes correctly."""
@@ -232,6 +251,28 @@ class TestPredictionService(unittest.TestCase):
         ))
 
 
+def make_hospitals(count, seed=0):
+    """Random hospitals over the globe, every third an emergency one."""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": index,
+            "name": f"Hospital {index}",
+            "latitude": rng.uniform(-89.9, 89.9),
+            "longitude": rng.uniform(-180, 180),
+            "address": f"{index} Main St",
+            "phone": "+1-555-0100",
+            "specialties": ["Emergency", "Cardiology"] if index % 3 == 0 else ["Cardiology"],
+            "has_icu": index % 2 == 0,
+            "rating": rng.choice([3.5, 4.0, 4.5]),
+            "distance": None,
+            "availability": {"beds": None, "icu_beds": None,
+                             "updated_at": None, "received_at": None}
+        }
+        for index in range(count)
+    ]
+
+
 class TestGeolocationService(unittest.TestCase):
     """Test suite for GeoLocationService."""
     
@@ -363,6 +404,196 @@ class TestGeolocationService(unittest.TestCase):
                 for spec in hospital['specialties']
             ))
     
+    def test_spatial_index_matches_full_scan(self):
+        """Test indexed radius and nearest queries match a full scan."""
+        hospitals = make_hospitals(3000)
+        service = GeoLocationService(hospitals)
+        # Includes points by the antimeridian and a pole
+        for latitude, longitude in [(40.7, -74.0), (-33.9, 179.9), (0.0, -179.95), (89.5, 10.0)]:
+            distances = sorted(
+                (haversine((latitude, longitude), (h['latitude'], h['longitude'])), h['id'])
+                for h in hospitals
+            )
+            radius = distances[20][0]
+            found = service.find_hospitals(latitude, longitude, radius_km=radius)
+            expected = [hospital_id for distance, hospital_id in distances[:10]]
+            self.assertEqual([h['id'] for h in found], expected)
+            
+            emergency = [(d, i) for d, i in distances if i % 3 == 0][:5]
+            found = service.find_emergency_hospitals(latitude, longitude, count=5)
+            self.assertEqual([h['id'] for h in found], [i for _, i in emergency])
+            for hospital, (distance, _) in zip(found, emergency):
+                self.assertAlmostEqual(hospital['distance'], distance, places=2)
+    
+    def test_ranking_matches_sorted_scan(self):
+        """Test top-k selection ranks like sorting every match."""
+        hospitals = make_hospitals(3000, seed=1)
+        for hospital in hospitals[::4]:
+            hospital['specialties'] = hospital['specialties'] + ['Neurology']
+        service = GeoLocationService(hospitals)
+        latitude, longitude, radius = 10.0, 20.0, 3000
+        
+        for specialty, urgency in [(None, 'medium'), (None, 'high'), ('neurology', 'high')]:
+            nearby = []
+            for hospital in hospitals:
+                distance = round(haversine((latitude, longitude),
+                                           (hospital['latitude'], hospital['longitude'])), 2)
+                if distance <= radius and (specialty is None or 'Neurology' in hospital['specialties']):
+                    nearby.append(dict(hospital, distance=distance))
+            nearby.sort(key=lambda x: (x['distance'], -x['rating']))
+            if urgency == 'high':
+                nearby.sort(key=lambda x: (-x['has_icu'], x['distance']))
+            
+            found = service.find_hospitals(latitude, longitude, radius_km=radius,
+                                           specialty=specialty, urgency=urgency)
+            self.assertEqual(found, nearby[:10])
+    
+    def test_load_hospitals_from_files(self):
+        """Test CSV and JSON datasets load into the same table."""
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = Path(directory) / 'hospitals.csv'
+            csv_path.write_text(
+                "id,name,latitude,longitude,address,phone,specialties,has_icu,rating\n"
+                "7,North ER,40.72,-74.0,1 North St,+1-555-0107,Emergency;Trauma,true,4.2\n"
+                "8,South Clinic,40.70,-74.0,,,General Practice,0,\n"
+            )
+            json_path = Path(directory) / 'hospitals.json'
+            json_path.write_text(json.dumps({"hospitals": [
+                {"id": 7, "name": "North ER", "latitude": 40.72, "longitude": -74.0,
+                 "address": "1 North St", "phone": "+1-555-0107",
+                 "specialties": ["Emergency", "Trauma"], "has_icu": True, "rating": 4.2},
+                {"id": 8, "name": "South Clinic", "latitude": 40.70, "longitude": -74.0,
+                 "specialties": ["General Practice"], "has_icu": False},
+            ]}))
+            
+            for path in (csv_path, json_path):
+                service = GeoLocationService(path)
+                self.assertEqual(len(service.hospitals), 2)
+                north = service.get_hospital_details(7)
+                self.assertEqual(north['specialties'], ['Emergency', 'Trauma'])
+                self.assertTrue(north['has_icu'])
+                self.assertEqual(north['rating'], 4.2)
+                south = service.get_hospital_details(8)
+                self.assertEqual((south['address'], south['has_icu'], south['rating']), ('', False, 0.0))
+                found = service.find_hospitals(40.71, -74.0, specialty='TRAUMA')
+                self.assertEqual([h['id'] for h in found], [7])
+                self.assertIsNone(service.get_hospital_details(9))
+    
+    def test_specialty_posting_lists(self):
+        """Test specialty and id lookups come from load-time indexes."""
+        hospitals = make_hospitals(30)
+        hospitals[4]['specialties'] = ['cardiology', 'NEUROLOGY']
+        service = GeoLocationService(hospitals)
+        table = service.hospital_table
+        rows, index = service.snapshot.indexed('Neurology')
+        self.assertEqual(rows.tolist(), [4])
+        self.assertEqual(len(index), 1)
+        self.assertEqual(table.rows_with('emergency').tolist(), list(range(0, 30, 3)))
+        self.assertEqual(len(table.rows_with('cardiology')), 30)
+        self.assertEqual(service.snapshot.indexed('unknown')[0].tolist(), [])
+        self.assertEqual(service.find_hospitals(0, 0, radius_km=1e5, specialty='unknown'), [])
+        for name in ('unknown', 'Unknown-2', 'x' * 100):
+            service.find_hospitals(0, 0, radius_km=10, specialty=name)
+        self.assertEqual(set(service.snapshot.indexes), {'neurology'})
+        self.assertEqual(service.get_hospital_details(4)['specialties'], ['cardiology', 'NEUROLOGY'])
+    
+    def test_nearest_batch_matches_single_queries(self):
+        """Test a batch answers every origin like find_emergency_hospitals."""
+        service = GeoLocationService(make_hospitals(2000, seed=5))
+        rng = random.Random(1)
+        origins = [(rng.uniform(-80, 80), rng.uniform(-180, 180)) for _ in range(50)]
+        results = list(service.find_nearest_batch([lat for lat, _ in origins],
+                                                  [lon for _, lon in origins], count=3, chunk_size=16))
+        self.assertEqual(len(results), len(origins))
+        for (latitude, longitude), hospitals in zip(origins, results):
+            self.assertEqual(hospitals, service.find_emergency_hospitals(latitude, longitude, count=3))
+        
+        cardiology = next(service.find_nearest_batch([0.0], [0.0], count=700, specialty='cardiology'))
+        self.assertEqual(len(cardiology), 700)
+    
+    def test_geohash_cell(self):
+        """Test geohash encoding and the cell's radius."""
+        cell, center_lat, center_lon, radius = geohash_cell(57.64911, 10.40744, 11)
+        self.assertEqual(cell, 'u4pruydqqvj')
+        self.assertAlmostEqual(center_lat, 57.64911, places=4)
+        self.assertLess(radius, 0.001)
+        self.assertEqual(geohash_cell(40.7128, -74.0060, 6)[0], 'dr5reg')
+        self.assertLess(geohash_cell(40.7128, -74.0060, 6)[3], 0.7)
+    
+    def test_cached_queries_match_uncached(self):
+        """Test per-cell cached candidates give each caller exact results."""
+        hospitals = make_hospitals(2000, seed=3)
+        for hospital in hospitals:
+            hospital['latitude'] = 40.7 + (hospital['latitude'] % 1) / 5
+            hospital['longitude'] = -74.0 + (hospital['longitude'] % 1) / 5
+        cached = GeoLocationService(hospitals, cache_size=100, cache_precision=5)
+        uncached = GeoLocationService(hospitals, cache_size=0)
+        self.assertIsNone(uncached.get_cache_stats())
+        
+        rng = random.Random(0)
+        for _ in range(200):
+            latitude, longitude = 40.8 + rng.uniform(-0.05, 0.05), -73.9 + rng.uniform(-0.05, 0.05)
+            for specialty, urgency in [(None, 'medium'), ('emergency', 'high')]:
+                self.assertEqual(
+                    cached.find_hospitals(latitude, longitude, 3, specialty, urgency),
+                    uncached.find_hospitals(latitude, longitude, 3, specialty, urgency)
+                )
+        stats = cached.get_cache_stats()
+        self.assertGreater(stats['hit_rate'], 0.9)
+        self.assertLessEqual(stats['size'], 100)
+    
+    def test_cache_eviction_and_invalidation(self):
+        """Test LRU eviction and that reloading the dataset drops entries."""
+        service = GeoLocationService(cache_size=2)
+        for longitude in (-74.0, -73.9, -73.8):
+            service.find_hospitals(40.7128, longitude)
+        stats = service.get_cache_stats()
+        self.assertEqual((stats['size'], stats['evictions']), (2, 1))
+        
+        service.load_hospitals(make_hospitals(10))
+        after = service.get_cache_stats()
+        self.assertEqual((after['size'], after['invalidations']), (0, stats['invalidations'] + 1))
+        self.assertEqual(service.find_hospitals(40.7128, -73.8), [])
+    
+    def test_cache_bounded_by_rows(self):
+        """Test the cache bounds total candidate rows and skips oversized sets."""
+        cache = GeoQueryCache(max_size=100, max_rows=10, max_entry_rows=6)
+        for key in 'abc':
+            cache.put(key, None, np.arange(4))
+        stats = cache.get_stats()
+        self.assertEqual((stats['size'], stats['rows'], stats['evictions']), (2, 8, 1))
+        cache.put('d', None, np.arange(7))
+        cache.put('b', None, np.arange(1))
+        stats = cache.get_stats()
+        self.assertEqual((stats['size'], stats['rows'], stats['skipped']), (2, 5, 1))
+        self.assertIsNone(cache.get('d', None))
+    
+    def test_nearby_radii_share_cache_entries(self):
+        """Test radii are bucketed in cache keys without changing results."""
+        self.assertEqual([radius_bucket(r) for r in (0, 0.15, 1.5, 10, 10.01, 15.2, 123, 1e5)],
+                         [0.0, 0.15, 1.5, 10.0, 11.0, 16.0, 130.0, 1e5])
+        hospitals = make_hospitals(2000, seed=9)
+        cached = GeoLocationService(hospitals, cache_precision=5)
+        uncached = GeoLocationService(hospitals, cache_size=0)
+        latitude, longitude = hospitals[0]['latitude'], hospitals[0]['longitude']
+        for radius in (1520, 1555, 1590, 1600):
+            found = cached.find_hospitals(latitude, longitude, radius)
+            self.assertTrue(found)
+            self.assertEqual(found, uncached.find_hospitals(latitude, longitude, radius))
+        self.assertEqual(cached.get_cache_stats()['size'], 1)
+    
+    def test_invalid_coordinates_return_no_hospitals(self):
+        """Test out-of-range or non-numeric coordinates find nothing."""
+        self.assertEqual(self.service.find_hospitals(latitude=95, longitude=0), [])
+        self.assertEqual(self.service.find_emergency_hospitals(latitude=0, longitude='east'), [])
+    
+    def test_load_hospitals_rebuilds_index(self):
+        """Test a reloaded dataset is what later queries see."""
+        self.service.find_hospitals(latitude=40.7128, longitude=-74.0060)
+        self.service.load_hospitals(make_hospitals(10))
+        hospitals = self.service.find_emergency_hospitals(latitude=0, longitude=0, count=10)
+        self.assertEqual(sorted(h['id'] for h in hospitals), [0, 3, 6, 9])
+    
     def test_find_emergency_hospitals_sorted(self):
         """Test emergency hospitals are sorted by distance."""
         hospitals = self.service.find_emergency_hospitals(
@@ -392,6 +623,233 @@ class TestGeolocationService(unittest.TestCase):
         self.assertIsNone(hospital)
 
 
+def make_road_grid(side, seed=0):
+    """A side x side street grid near NYC (about 110 m blocks), two-way
+    but with different speeds each way."""
+    rng = random.Random(seed)
+    latitudes, longitudes, sources, targets, seconds = [], [], [], [], []
+    for row in range(side):
+        for column in range(side):
+            latitudes.append(40.70 + row * 0.001)
+            longitudes.append(-74.01 + column * 0.0013)
+            node = row * side + column
+            for neighbour in ((node + 1) if column + 1 < side else None,
+                              (node + side) if row + 1 < side else None):
+                if neighbour is not None:
+                    sources += [node, neighbour]
+                    targets += [neighbour, node]
+                    seconds += [rng.uniform(5, 30), rng.uniform(5, 30)]
+    return latitudes, longitudes, sources, targets, seconds
+
+
+class TestRoadGraph(unittest.TestCase):
+    """Test travel-time estimates over a road graph."""
+    
+    def test_routes_match_dijkstra(self):
+        """Test ALT routes are exact shortest paths."""
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import dijkstra
+        
+        latitudes, longitudes, sources, targets, seconds = make_road_grid(15)
+        graph = RoadGraph(latitudes, longitudes, sources, targets, seconds, landmarks=4)
+        exact = dijkstra(csr_matrix((seconds, (sources, targets)), shape=(225, 225)),
+                         indices=[0, 112])
+        rng = random.Random(1)
+        for index, source in enumerate((0, 112)):
+            for target in rng.sample(range(225), 20):
+                self.assertAlmostEqual(graph.route_seconds(source, target),
+                                       exact[index, target], places=6)
+    
+    def test_load_edge_list(self):
+        """Test CSV edge lists, with lengths, speeds and one-way segments."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'roads.csv'
+            path.write_text(
+                "source,target,source_lat,source_lon,target_lat,target_lon,length_m,speed_kph,oneway\n"
+                "10,20,40.0,-74.0,40.0,-73.99,1000,36,no\n"
+                "20,30,40.0,-73.99,40.01,-73.99,1000,36,yes\n"
+                "30,10,40.01,-73.99,40.0,-74.0,2000,,yes\n"
+            )
+            graph = load_road_graph(path)
+        
+        self.assertEqual(graph.get_stats()['edges'], 4)
+        self.assertAlmostEqual(graph.route_seconds(0, 2), 200)
+        # Back from 30 to 20 goes round through 10, at the default speed
+        self.assertAlmostEqual(graph.route_seconds(2, 1), 180 + 100)
+    
+    def test_travel_times_respect_budget(self):
+        """Test destinations the budget does not reach have no estimate."""
+        graph = RoadGraph(*make_road_grid(30))
+        far = [graph.latitudes[-1]] * 3, [graph.longitudes[-1]] * 3
+        
+        seconds = graph.travel_times(graph.latitudes[0], graph.longitudes[0], *far, budget_ms=1000)
+        self.assertTrue((seconds > 0).all())
+        self.assertTrue(np.isnan(
+            graph.travel_times(graph.latitudes[0], graph.longitudes[0], *far, budget_ms=0)
+        ).all())
+    
+    def test_find_hospitals_by_travel_time(self):
+        """Test the quicker hospital by road ranks first, though farther."""
+        # Hospital 1 is a kilometre north but slow to reach; hospital 2 is
+        # farther east on a fast road
+        graph = RoadGraph([40.0, 40.01, 40.0], [-74.0, -74.0, -73.98],
+                          [0, 1, 0, 2], [1, 0, 2, 0], [600, 600, 120, 120])
+        hospitals = make_hospitals(2)
+        for hospital, (latitude, longitude) in zip(hospitals, ((40.01, -74.0), (40.0, -73.98))):
+            hospital.update(id=hospital['id'] + 1, latitude=latitude, longitude=longitude)
+        service = GeoLocationService(hospitals, road_graph=graph)
+        
+        by_distance = service.find_hospitals(40.0, -74.0, radius_km=5)
+        by_time = service.find_hospitals(40.0, -74.0, radius_km=5, ranking='travel_time')
+        self.assertEqual([h['id'] for h in by_distance], [1, 2])
+        self.assertEqual([h['id'] for h in by_time], [2, 1])
+        self.assertEqual([h['travel_time_min'] for h in by_time], [2.0, 10.0])
+    
+    def test_travel_time_ranking_needs_graph(self):
+        """Test unknown rankings, or travel time without a graph, raise."""
+        service = GeoLocationService()
+        with self.assertRaises(ValueError):
+            service.find_hospitals(40.7128, -74.0060, ranking='travel_time')
+        with self.assertRaises(ValueError):
+            service.find_hospitals(40.7128, -74.0060, ranking='fastest')
+
+
+class TestHospitalAvailability(unittest.TestCase):
+    """Test live bed and ICU availability updates."""
+    
+    def setUp(self):
+        self.service = GeoLocationService(cache_size=0)
+    
+    def test_update_swaps_in_new_snapshot(self):
+        """Test an update leaves the old snapshot alone and shares indexes."""
+        before = self.service.snapshot
+        before.indexed('Emergency')
+        result = self.service.update_availability([
+            {"id": 1, "beds_available": 12, "icu_beds_available": 3, "updated_at": 1e9},
+            {"id": 3, "icu_beds_available": 0},
+        ])
+        after = self.service.snapshot
+        
+        self.assertEqual(result, {"applied": 2, "stale": 0, "unknown_ids": []})
+        self.assertIsNot(after, before)
+        self.assertIs(after.indexes, before.indexes)
+        self.assertIs(after.table.latitudes, before.table.latitudes)
+        self.assertEqual(before.table.record(0)['availability']['beds'], None)
+        availability = self.service.get_hospital_details(1)['availability']
+        self.assertEqual(availability['updated_at'], datetime.fromtimestamp(1e9).isoformat())
+        self.assertEqual((availability['beds'], availability['icu_beds']), (12, 3))
+        self.assertIsNotNone(availability['received_at'])
+        self.assertEqual(self.service.get_hospital_details(3)['availability']['beds'], None)
+    
+    def test_source_and_server_clocks_are_not_mixed(self):
+        """Test untimed reports don't make a lagging feed's timed reports stale."""
+        with patch('services.geolocation_service.time.time', return_value=2e9):
+            self.service.update_availability([{"id": 1, "beds_available": 7}])
+        availability = self.service.get_hospital_details(1)['availability']
+        self.assertIsNone(availability['updated_at'])
+        self.assertEqual(availability['received_at'], datetime.fromtimestamp(2e9).isoformat())
+        
+        result = self.service.update_availability([
+            {"id": 1, "beds_available": 6, "updated_at": 1e9},
+            {"id": 1, "icu_beds_available": 1},
+            {"id": 1, "beds_available": 5, "updated_at": 1e9 - 60},
+        ])
+        self.assertEqual((result['applied'], result['stale']), (2, 1))
+        availability = self.service.get_hospital_details(1)['availability']
+        self.assertEqual((availability['beds'], availability['icu_beds']), (6, 1))
+        self.assertEqual(availability['updated_at'], datetime.fromtimestamp(1e9).isoformat())
+    
+    def test_stale_and_unknown_updates_are_skipped(self):
+        """Test older reports and unknown hospitals change nothing."""
+        self.service.update_availability([{"id": 2, "beds_available": 5, "updated_at": 2000}])
+        result = self.service.update_availability([
+            {"id": 2, "beds_available": 9, "updated_at": 1000},
+            {"id": 99, "beds_available": 1},
+            {"id": 1, "beds_available": 4, "updated_at": "2026-10-17T09:00:00"},
+            {"id": 1, "icu_beds_available": 2, "updated_at": "2026-10-17T09:05:00"},
+        ])
+        
+        self.assertEqual(result, {"applied": 2, "stale": 1, "unknown_ids": [99]})
+        self.assertEqual(self.service.get_hospital_details(2)['availability']['beds'], 5)
+        availability = self.service.get_hospital_details(1)['availability']
+        self.assertEqual((availability['beds'], availability['icu_beds']), (4, 2))
+    
+    def test_malformed_update_applies_nothing(self):
+        """Test one bad report rejects the whole call."""
+        snapshot = self.service.snapshot
+        for bad in ({"beds_available": 3}, {"id": 1, "beds_available": -2},
+                    {"id": 1, "icu_beds_available": "many"}):
+            with self.assertRaises(ValueError):
+                self.service.update_availability([{"id": 2, "beds_available": 1}, bad])
+        self.assertIs(self.service.snapshot, snapshot)
+    
+    def test_full_icu_ranks_after_free_icu(self):
+        """Test high-urgency searches pass over ICUs reported full."""
+        def first(urgency):
+            return self.service.find_hospitals(40.7128, -74.0060, urgency=urgency)[0]['id']
+        
+        self.assertEqual(first('high'), 1)
+        self.service.update_availability([{"id": 1, "icu_beds_available": 0}])
+        self.assertEqual(first('high'), 3)
+        self.assertEqual(first('medium'), 1)
+    
+    def test_readers_never_see_partial_updates(self):
+        """Test concurrent queries see every hospital at one version."""
+        service = GeoLocationService(make_hospitals(500))
+        ids = list(range(500))
+        errors = []
+        done = threading.Event()
+        
+        def read():
+            while not done.is_set():
+                found = service.find_hospitals(0, 0, radius_km=1e5)
+                versions = {(h['availability']['beds'], h['availability']['icu_beds'])
+                            for h in found}
+                if len(versions) > 1 or any(beds != icu for beds, icu in versions):
+                    errors.append(versions)
+        
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for version in range(200):
+            service.update_availability([
+                {"id": hospital_id, "beds_available": version, "icu_beds_available": version}
+                for hospital_id in ids
+            ])
+        done.set()
+        for reader in readers:
+            reader.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(service.get_hospital_details(7)['availability']['beds'], 199)
+    
+    def test_availability_feed_file(self):
+        """Test a polled feed file is applied when it appears."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'availability.ndjson'
+            self.service.start_availability_feed(path, 0.01)
+            try:
+                path.write_text('{"id": 2, "beds_available": 7, "icu_beds_available": 1}\n')
+                for _ in range(200):
+                    if self.service.get_hospital_details(2)['availability']['beds'] == 7:
+                        break
+                    time.sleep(0.01)
+            finally:
+                self.service.stop_availability_feed()
+        
+        self.assertEqual(self.service.get_hospital_details(2)['availability']['icu_beds'], 1)
+    
+    def test_cache_survives_availability_updates(self):
+        """Test cached candidates stay valid when only availability changes."""
+        service = GeoLocationService()
+        service.find_hospitals(40.7128, -74.0060)
+        service.update_availability([{"id": 1, "beds_available": 3}])
+        found = service.find_hospitals(40.7128, -74.0060)
+        
+        self.assertEqual(service.get_cache_stats()['hits'], 1)
+        self.assertEqual(found[0]['availability']['beds'], 3)
+
+
 class TestNotificationService(unittest.TestCase):
     """Test suite for NotificationService."""
     
@@ -503,7 +961,7 @@ class TestServiceIntegration(unittest.TestCase):
     
     def setUp(self):
         """Set up test fixtures."""
-        self.prediction_service = PredictionService()
+        self.prediction_service = PredictionService(history_store=MemoryHistoryStore())
         self.geolocation_service = GeoLocationService()
     
     def test_complete_assessment_workflow(self):
@@ -613,6 +1071,468 @@ class TestServiceErrorHandling(unittest.TestCase):
         self.assertIsInstance(hospitals, list)
 
 
+class TestRequestCoalescer(unittest.TestCase):
+    """Test micro-batching of concurrent requests."""
+    
+    def setUp(self):
+        self.batch_sizes = []
+    
+    def _double_batch(self, items):
+        self.batch_sizes.append(len(items))
+        if 'bad' in items:
+            raise ValueError("bad item")
+        return [item * 2 for item in items]
+    
+    def _submit_concurrently(self, coalescer, items):
+        results = {}
+        errors = {}
+        
+        def worker(item):
+            try:
+                results[item] = coalescer.submit(item)
+            except Exception as e:
+                errors[item] = e
+        
+        threads = [threading.Thread(target=worker, args=(item,)) for item in items]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        return results, errors
+    
+    def test_single_request(self):
+        """Test a lone request is answered after the window."""
+        coalescer = RequestCoalescer(self._double_batch, window_ms=1)
+        self.assertEqual(coalescer.submit(21), 42)
+        self.assertEqual(coalescer.get_metrics()['requests'], 1)
+    
+    def test_concurrent_requests_are_batched(self):
+        """Test concurrent callers share batches and get their own results."""
+        coalescer = RequestCoalescer(self._double_batch, window_ms=50, max_batch_size=64)
+        results, errors = self._submit_concurrently(coalescer, list(range(32)))
+        
+        self.assertEqual(errors, {})
+        self.assertEqual(results, {item: item * 2 for item in range(32)})
+        self.assertLess(len(self.batch_sizes), 32)
+        
+        metrics = coalescer.get_metrics()
+        self.assertEqual(metrics['requests'], 32)
+        self.assertEqual(metrics['batches'], len(self.batch_sizes))
+        self.assertGreater(metrics['max_batch_size'], 1)
+        self.assertGreaterEqual(metrics['max_queue_wait_ms'], 0)
+    
+    def test_max_batch_size_respected(self):
+        """Test no batch exceeds max_batch_size."""
+        coalescer = RequestCoalescer(self._double_batch, window_ms=50, max_batch_size=4)
+        self._submit_concurrently(coalescer, list(range(20)))
+        self.assertLessEqual(max(self.batch_sizes), 4)
+    
+    def test_failing_item_only_fails_its_caller(self):
+        """Test a bad request doesn't fail the rest of its batch."""
+        coalescer = RequestCoalescer(self._double_batch, window_ms=50)
+        results, errors = self._submit_concurrently(coalescer, [1, 2, 'bad', 3])
+        
+        self.assertEqual(results, {1: 2, 2: 4, 3: 6})
+        self.assertIsInstance(errors['bad'], ValueError)
+
+
+def make_assessment(age, risk_level='LOW', healthy=0.6):
+    """An assessment result as PredictionService stores it."""
+    return {
+        'overall_risk_level': risk_level,
+        'risk_scores': {'Cardiovascular Disease': 0.2, 'Diabetes': 0.1,
+                        'Healthy': healthy, 'Stroke Risk': 0.1},
+        'health_inputs': {'age': age, 'heart_rate': 72, 'bmi': 24.5, 'smoking': True,
+                          'symptoms': ['fatigue'], 'user_id': 'user1'},
+    }
+
+
+def ages(assessments):
+    return [assessment['vitals']['age'] for assessment in assessments]
+
+
+class TestHistoryStore(unittest.TestCase):
+    """Test the persistent assessment history store."""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name) / 'history.db'
+        self.stores = []
+    
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        self.temp_dir.cleanup()
+    
+    def _store(self, **kwargs):
+        store = SQLiteHistoryStore(self.db_path, **kwargs)
+        self.stores.append(store)
+        return store
+    
+    def test_no_file_until_first_use(self):
+        """Test the database isn't created at construction."""
+        self._store()
+        self.assertFalse(self.db_path.exists())
+    
+    def test_read_your_writes(self):
+        """Test a queued assessment is visible to the next read."""
+        store = self._store(flush_interval_ms=1000)
+        store.add('user1', make_assessment(1))
+        store.add('user1', make_assessment(2, 'HIGH'))
+        store.add('user2', make_assessment(3))
+        
+        self.assertEqual(ages(store.get('user1')), [1, 2])
+        latest, = store.get('user1', limit=1)
+        self.assertEqual((latest['vitals']['age'], latest['overall_risk_level']), (2, 'HIGH'))
+        self.assertEqual(store.get('missing'), [])
+        self.assertEqual(len(store), 2)
+    
+    def test_reads_wait_only_for_own_writes(self):
+        """Test a read isn't held up by other users' queued assessments."""
+        store = self._store(flush_interval_ms=1)
+        store.add('user1', make_assessment(1))
+        self.assertEqual(ages(store.get('user1')), [1])
+        
+        release = threading.Event()
+        write = store._write
+        
+        def slow_write(connection, rows):
+            release.wait(5)
+            write(connection, rows)
+        
+        with patch.object(store, '_write', slow_write):
+            store.add('user2', make_assessment(2))
+            start = time.monotonic()
+            self.assertEqual(ages(store.get('user1')), [1])
+            self.assertLess(time.monotonic() - start, 1)
+            release.set()
+            self.assertEqual(ages(store.get('user2')), [2])
+    
+    def test_full_queue_does_not_deadlock(self):
+        """Test producers blocked on a full queue don't stall the writer or readers."""
+        store = self._store(batch_size=2, flush_interval_ms=0, max_pending=2)
+        
+        def worker(user):
+            for index in range(100):
+                store.add(user, make_assessment(index))
+                if index % 10 == 0:
+                    store.get(user, limit=1)
+        
+        threads = [threading.Thread(target=worker, args=(f'user{i}',), daemon=True)
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        
+        store.flush()
+        self.assertEqual(store.get_stats()['written'], 800)
+        self.assertEqual(ages(store.get('user3')), list(range(100)))
+    
+    def test_writes_are_batched(self):
+        """Test queued assessments are written in few transactions."""
+        store = self._store(batch_size=100, flush_interval_ms=200)
+        for index in range(250):
+            store.add(f'user{index % 5}', make_assessment(index))
+        store.flush()
+        
+        stats = store.get_stats()
+        self.assertEqual(stats['written'], 250)
+        self.assertLess(stats['batches'], 250)
+        self.assertEqual(stats['pending'], 0)
+    
+    def test_per_user_cap(self):
+        """Test each user keeps only their newest max_per_user assessments."""
+        store = self._store(max_per_user=3, batch_size=2)
+        for index in range(10):
+            store.add('user1', make_assessment(index))
+        store.add('user2', make_assessment(100))
+        store.flush()
+        
+        self.assertEqual(ages(store.get('user1')), [7, 8, 9])
+        self.assertEqual(ages(store.get('user2')), [100])
+        with sqlite3.connect(self.db_path) as connection:
+            rows = connection.execute("SELECT COUNT(*) FROM assessments").fetchone()[0]
+        self.assertEqual(rows, 4)
+    
+    def test_retention_purges_old_rows(self):
+        """Test assessments past retention are hidden and purged."""
+        store = self._store(retention_days=1)
+        store.add('user1', make_assessment(1))
+        store.flush()
+        with sqlite3.connect(self.db_path) as connection:
+            connection.execute("UPDATE assessments SET created_at = created_at - 2 * 86400")
+        self.assertEqual(store.get('user1'), [])
+        
+        store.close()
+        purger = self._store(retention_days=1)
+        purger.add('user2', make_assessment(2))
+        purger.flush()
+        self.assertEqual(purger.get_stats()['purged'], 1)
+    
+    def test_persists_across_instances(self):
+        """Test history survives a restart and is shared between stores."""
+        store = self._store()
+        store.add('user1', make_assessment(1))
+        store.close()
+        
+        self.assertEqual(ages(self._store().get('user1')), [1])
+    
+    def test_wal_mode(self):
+        """Test the database runs in write-ahead-log mode."""
+        store = self._store()
+        store.add('user1', make_assessment(1))
+        store.flush()
+        with sqlite3.connect(self.db_path) as connection:
+            mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, 'wal')
+    
+    def test_concurrent_writers(self):
+        """Test concurrent request threads lose no assessments."""
+        store = self._store()
+        
+        def worker(user):
+            for index in range(50):
+                store.add(user, make_assessment(index))
+        
+        threads = [threading.Thread(target=worker, args=(f'user{i}',)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        for i in range(8):
+            self.assertEqual(ages(store.get(f'user{i}')), list(range(50)))
+    
+    def test_pages_and_stream_by_cursor(self):
+        """Test keyset paging and chunked streaming over SQLite."""
+        store = self._store()
+        for index in range(7):
+            store.add('user1', make_assessment(index))
+        
+        page, has_more = store.page('user1', 3)
+        self.assertEqual(ages(item for _, item in page), [4, 5, 6])
+        self.assertTrue(has_more)
+        page, has_more = store.page('user1', 3, before=page[0][0])
+        self.assertEqual(ages(item for _, item in page), [1, 2, 3])
+        page, has_more = store.page('user1', 3, after=page[-1][0])
+        self.assertEqual(ages(item for _, item in page), [4, 5, 6])
+        self.assertFalse(has_more)
+        
+        streamed = [int(record.features[0]) for _, record in store.iter_history('user1', chunk_size=2)]
+        self.assertEqual(streamed, list(range(7)))
+    
+    def test_tied_timestamps_get_unique_cursors(self):
+        """Test assessments added in the same instant, by two stores, page and trim exactly."""
+        first, second = self._store(max_per_user=5), self._store(max_per_user=5)
+        with patch('services.history_store.time.time', return_value=time.time()):
+            for index in range(8):
+                (first if index % 2 else second).add('user1', make_assessment(index))
+                (first if index % 2 else second).flush()
+        
+        page, has_more = first.page('user1', 2)
+        cursors = [cursor for cursor, _ in page]
+        while has_more:
+            page, has_more = first.page('user1', 2, before=page[0][0])
+            cursors[:0] = [cursor for cursor, _ in page]
+        self.assertEqual(len(set(cursors)), 5)
+        self.assertEqual(cursors, sorted(cursors))
+        streamed = [int(record.features[0]) for _, record in first.iter_history('user1', chunk_size=2)]
+        self.assertEqual(streamed, [3, 4, 5, 6, 7])
+    
+    def test_record_round_trip(self):
+        """Test a compacted assessment rebuilds the stored result."""
+        assessment = make_assessment(45, 'MODERATE')
+        record = VitalsRecord.from_assessment(assessment, 1760000000.5)
+        restored = VitalsRecord.from_row(1760000000.5, *record.to_row()).to_dict()
+        
+        self.assertEqual(restored['overall_risk_level'], 'MODERATE')
+        self.assertEqual(restored['risk_scores'], assessment['risk_scores'])
+        self.assertEqual(restored['primary_concern'], 'Healthy')
+        self.assertEqual(restored['high_risk_diseases'], ['Healthy'])
+        self.assertIn('Quit smoking immediately', restored['recommendation'])
+        self.assertEqual(restored['vitals']['bmi'], 24.5)
+        self.assertEqual(restored['vitals']['symptoms_count'], 1)
+        self.assertIs(restored['vitals']['smoking'], True)
+        self.assertEqual(VitalsRecord.from_payload(1760000000.5, record.to_payload()).to_dict(),
+                         restored)
+    
+    def test_series_wraps_at_capacity(self):
+        """Test the columnar series keeps the newest rows and grows its columns."""
+        series = VitalsSeries(capacity=5)
+        for index in range(12):
+            series.append(VitalsRecord.from_assessment(make_assessment(index), float(index)))
+        wider = make_assessment(12)
+        wider['risk_scores']['Hypertension'] = 0.3
+        series.append(VitalsRecord.from_assessment(wider, 12.0))
+        
+        self.assertEqual(len(series), 5)
+        self.assertEqual(series.created_at.shape, (5,))
+        records = series.window(10, after=0.0)
+        self.assertEqual([record.created_at for record in records], [8.0, 9.0, 10.0, 11.0, 12.0])
+        self.assertEqual(len(records[0].scores), 4)
+        self.assertEqual(records[-1].to_dict()['risk_scores']['Hypertension'], 0.3)
+        self.assertEqual([r.created_at for r in series.window(2, after=8.0, earliest=True)], [9.0, 10.0])
+        self.assertEqual([r.created_at for r in series.window(2, after=0.0, before=12.0)], [10.0, 11.0])
+    
+    def test_memory_store_is_bounded(self):
+        """Test the in-memory backend keeps the newest max_per_user."""
+        store = MemoryHistoryStore(max_per_user=2)
+        self.assertEqual(len(store), 0)
+        for index in range(5):
+            store.add('user1', make_assessment(index))
+        self.assertEqual(ages(store.get('user1')), [3, 4])
+        self.assertEqual(ages(store.get('user1', limit=1)), [4])
+        self.assertEqual(len(store), 1)
+    
+    def test_encrypted_at_rest(self):
+        """Test assessments and trend aggregates are stored sealed and read back in bulk."""
+        encryption = EncryptionService(Path(self.temp_dir.name) / 'master.key',
+                                       max_workers=4, parallel_threshold=1)
+        store = self._store(encryption=encryption, batch_size=2)
+        for index in range(5):
+            store.add('user1', make_assessment(index, 'HIGH'))
+        self.assertEqual(ages(store.get('user1')), list(range(5)))
+        self.assertEqual(store.get('user1')[0]['overall_risk_level'], 'HIGH')
+        self.assertEqual(store.trends('user1', 30)['assessments'], 5)
+        self.assertEqual(store.trends('user1', 30)['window_assessments'], 5)
+        self.assertTrue(store.get_stats()['encrypted'])
+        
+        with sqlite3.connect(self.db_path) as connection:
+            rows = connection.execute(
+                "SELECT risk_level, features, scores, diseases, key_id, sealed FROM assessments"
+            ).fetchall()
+            keys = connection.execute("SELECT COUNT(*) FROM data_keys").fetchone()[0]
+            buckets = connection.execute("SELECT n, heart_rate, sealed FROM trend_buckets").fetchall()
+            totals = connection.execute("SELECT assessments, last_at, sealed FROM trend_totals").fetchall()
+        self.assertEqual(keys, 1)
+        self.assertTrue(all(row[:5] == (0, b'', b'', '', 1) and row[5] for row in rows))
+        self.assertTrue(all(row[:2] == (0, 0) and row[2] for row in buckets))
+        self.assertTrue(all(row[:2] == (0, None) and row[2] for row in totals))
+        
+        # A sealed record moved to another user's row doesn't open
+        with sqlite3.connect(self.db_path) as connection:
+            connection.execute("UPDATE assessments SET user_id = 'user2' WHERE id = 1")
+        with self.assertRaises(InvalidTag):
+            store.get('user2')
+        
+        store.close()
+        with self.assertRaises(RuntimeError):
+            self._store().get('user1')
+        other_key = EncryptionService(Path(self.temp_dir.name) / 'other.key')
+        with self.assertRaises(Exception):
+            self._store(encryption=other_key).get('user1')
+    
+    def test_encryption_reads_plaintext_rows(self):
+        """Test enabling encryption keeps earlier plaintext rows readable."""
+        store = self._store()
+        store.add('user1', make_assessment(1))
+        store.close()
+        
+        encrypted = self._store(encryption=EncryptionService(Path(self.temp_dir.name) / 'master.key'))
+        encrypted.add('user1', make_assessment(2))
+        self.assertEqual(ages(encrypted.get('user1')), [1, 2])
+        self.assertEqual(encrypted.trends('user1', 30)['window_assessments'], 2)
+    
+    def test_trends(self):
+        """Test trend statistics from the incremental day buckets."""
+        now = 1700000000.0
+        clock = [now - 2 * 86400]
+        encrypted = SQLiteHistoryStore(
+            Path(self.temp_dir.name) / 'encrypted.db',
+            encryption=EncryptionService(Path(self.temp_dir.name) / 'master.key')
+        )
+        self.stores.append(encrypted)
+        with patch('time.time', lambda: clock[0]):
+            for store in (MemoryHistoryStore(), self._store(), encrypted):
+                clock[0] = now - 2 * 86400
+                store.add('user1', make_assessment(1, 'CRITICAL', healthy=0.5))
+                clock[0] = now - 86400
+                store.add('user1', make_assessment(2, healthy=0.6))
+                clock[0] = now
+                store.add('user1', make_assessment(3, healthy=0.7))
+                
+                trends = store.trends('user1', 30)
+                self.assertEqual(trends['assessments'], 3)
+                self.assertEqual(trends['window_assessments'], 3)
+                self.assertAlmostEqual(trends['rolling_means']['heart_rate'], 72.0)
+                self.assertAlmostEqual(trends['risk_score']['mean'], 0.6)
+                self.assertAlmostEqual(trends['risk_score']['slope_per_day'], 0.1)
+                self.assertAlmostEqual(trends['days_since_critical'], 2.0)
+                
+                latest = store.trends('user1', 1)
+                self.assertEqual(latest['window_assessments'], 1)
+                self.assertIsNone(latest['risk_score']['slope_per_day'])
+                self.assertEqual(store.trends('user2', 30)['assessments'], 0)
+                with self.assertRaises(ValueError):
+                    store.trends('user1', 0)
+                with self.assertRaises(ValueError):
+                    store.trends('user1', 91)
+    
+    def test_trend_buckets_are_bounded(self):
+        """Test day buckets older than the longest window are dropped."""
+        store = MemoryHistoryStore(max_trend_days=3)
+        clock = [1700000000.0]
+        with patch('time.time', lambda: clock[0]):
+            for day in range(10):
+                clock[0] = 1700000000.0 + day * 86400
+                store.add('user1', make_assessment(day))
+            self.assertEqual(len(store._shard('user1').trends['user1']._days), 3)
+            trends = store.trends('user1', 3)
+        self.assertEqual(trends['assessments'], 10)
+        self.assertEqual(trends['window_assessments'], 3)
+    
+    def test_memory_store_stress(self):
+        """Test 64 threads adding concurrently lose no writes."""
+        store = MemoryHistoryStore(max_per_user=10000)
+        threads, per_thread = 64, 100
+        barrier = threading.Barrier(threads)
+        
+        def writer(index):
+            barrier.wait()
+            for _ in range(per_thread):
+                store.add(f'user{index}', make_assessment(index))
+                store.add('shared', make_assessment(index))
+                store.get(f'user{index % 8}', limit=1)
+        
+        workers = [threading.Thread(target=writer, args=(index,)) for index in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        
+        for index in range(threads):
+            self.assertEqual(ages(store.get(f'user{index}')), [index] * per_thread)
+        shared = store.get('shared')
+        self.assertEqual(len(shared), threads * per_thread)
+        timestamps = [assessment['timestamp'] for assessment in shared]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertEqual(store.trends('shared', 1)['assessments'], threads * per_thread)
+        self.assertEqual(store.get_stats()['assessments'], 2 * threads * per_thread)
+    
+    def test_memory_store_shards_do_not_contend(self):
+        """Test a held shard lock doesn't block users on other shards."""
+        store = MemoryHistoryStore()
+        other = next(f'user{index}' for index in range(1000)
+                     if store._shard(f'user{index}') is not store._shard('user0'))
+        with store._shard('user0').lock:
+            thread = threading.Thread(target=store.add, args=(other, make_assessment(1)))
+            thread.start()
+            thread.join(timeout=5)
+            self.assertFalse(thread.is_alive())
+        self.assertEqual(ages(store.get(other)), [1])
+    
+    def test_sqlite_path(self):
+        """Test database URIs are checked."""
+        self.assertEqual(sqlite_path('sqlite:///healthcare.db'), 'healthcare.db')
+        self.assertEqual(sqlite_path('sqlite:////var/lib/app.db'), '/var/lib/app.db')
+        with self.assertRaises(ValueError):
+            sqlite_path('sqlite:///:memory:')
+        with self.assertRaises(ValueError):
+            sqlite_path('postgresql://localhost/healthcare')
+
+
 def run_tests():
     """Run all tests."""
     # Create test suite
@@ -625,6 +1545,8 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestNotificationService))
     suite.addTests(loader.loadTestsFromTestCase(TestServiceIntegration))
     suite.addTests(loader.loadTestsFromTestCase(TestServiceErrorHandling))
+    suite.addTests(loader.loadTestsFromTestCase(TestRequestCoalescer))
+    suite.addTests(loader.loadTestsFromTestCase(TestHistoryStore))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
@@ -0,0 +1,8 @@
+import hmac
+from flask import request
+from config import Config
+
+def admin_authorized():
+    """Whether the request carries the configured X-Admin-Token header."""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(Config.ADMIN_TOKEN) and hmac.compare_digest(token, Config.ADMIN_TOKEN)
\ No newline at end of file